@@ -0,0 +1,49 @@
+"""
+Assembling a 100k instruction function with forward jumps that outgrow one byte.
+
+The baseline joins `as_bytes()` of every instruction and leaves jump arguments
+where they were, which is only correct while no argument changes its width.
+
+    python benchmarks/bench_assembler.py
+"""
+import sys
+import timeit
+from pathlib import Path
+
+from rigel.assembler import assemble, label_jumps
+from rigel.instruction import make_instruction
+
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bench_cfg import synthetic_instructions  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def large_function(size: int) -> list:
+    instructions = synthetic_instructions(size)
+    end = instructions[-1].offset + 2
+    return [
+        *instructions,
+        make_instruction('LOAD_CONST', 0, None, offset=end),
+        make_instruction('RETURN_VALUE', offset=end + 2),
+    ]
+
+
+def best_of(function, repeat: int = 5) -> float:
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def main():
+    size = 100_000
+    code = assemble(label_jumps(large_function(size)))
+
+    joined = best_of(lambda: b''.join([instruction.as_bytes() for instruction in large_function(size)]))
+    labelled = best_of(lambda: assemble(label_jumps(large_function(size))))
+    build = best_of(lambda: large_function(size))
+
+    print(f'{"as_bytes join":<16}{joined - build:>8.3f} s')
+    print(f'{"assemble":<16}{labelled - build:>8.3f} s  ({len(code)} bytes)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Memory held by one million instructions, as objects and as an `InstructionBuffer`.
+
+    python benchmarks/bench_buffer.py
+"""
+import dis
+import tracemalloc
+
+from rigel.buffer import InstructionBuffer
+from rigel.instruction import convert
+
+
+SOURCE = """
+a = 0
+for _ in range(10):
+    a += 1
+if a == 0:
+    print(a)
+"""
+SIZE = 1_000_000
+
+
+def corpus() -> list[dis.Instruction]:
+    instructions = list(dis.get_instructions(compile(SOURCE, '<corpus>', 'exec')))
+    return instructions * (SIZE // len(instructions))
+
+
+def measure(factory, instructions) -> int:
+    tracemalloc.start()
+    result = factory(instructions)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    instructions = corpus()
+
+    for name, factory in (
+            ('BaseInstruction', lambda items: list(convert(items))),
+            ('InstructionBuffer', InstructionBuffer),
+    ):
+        size = measure(factory, instructions)
+        print(f'{name:<20}{len(instructions):>10} instructions{size / 2 ** 20:>10.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
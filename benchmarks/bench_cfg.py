@@ -0,0 +1,86 @@
+"""
+CFG construction scaling on a synthetic function.
+
+Every statement is ``if a == 0: a = 1`` (six instructions, one branch), so the
+number of split offsets grows with the function size. The instructions are
+built directly, offsets are not limited by the one byte jump argument.
+
+    python benchmarks/bench_cfg.py
+"""
+import dis
+import time
+import tracemalloc
+
+from rigel.cfg import CFGBuilder, LeaderCFGBuilder
+from rigel.instruction import PYTHON_OPCODE_INSTRUCTION_MAP
+
+
+STATEMENT = (
+    ('LOAD_NAME', 0, 'a'),
+    ('LOAD_CONST', 0, 0),
+    ('COMPARE_OP', 2, '=='),
+    ('POP_JUMP_IF_FALSE', None, None),
+    ('LOAD_CONST', 1, 1),
+    ('STORE_NAME', 0, 'a'),
+)
+
+
+def _instruction(opname, arg, argval, offset):
+    opcode = dis.opmap[opname]
+    return PYTHON_OPCODE_INSTRUCTION_MAP[opcode](
+        opname=opname,
+        opcode_=opcode,
+        arg=arg,
+        argval=argval,
+        argrepr='',
+        offset=offset,
+        starts_line=1,
+        is_jump_target=False,
+    )
+
+
+def synthetic_instructions(size: int) -> list:
+    instructions = []
+    offset = 0
+    for _ in range(size // len(STATEMENT)):
+        end = offset + 2 * len(STATEMENT)
+        for opname, arg, argval in STATEMENT:
+            if argval is None:
+                arg, argval = end // 2, end
+            instructions.append(_instruction(opname, arg, argval, offset))
+            offset += 2
+
+    return instructions
+
+
+def measure(builder_class, instructions) -> float:
+    start = time.perf_counter()
+    builder_class().build(instructions)
+    return time.perf_counter() - start
+
+
+def main():
+    print(f'{"builder":<18}{"instructions":>14}{"seconds":>12}{"ns/instruction":>18}')
+
+    for builder_class, sizes in (
+            (CFGBuilder, (2_500, 5_000, 10_000)),
+            (LeaderCFGBuilder, (12_500, 25_000, 50_000, 100_000)),
+    ):
+        for size in sizes:
+            instructions = synthetic_instructions(size)
+            elapsed = measure(builder_class, instructions)
+            print(
+                f'{builder_class.__name__:<18}{len(instructions):>14}'
+                f'{elapsed:>12.4f}{elapsed / len(instructions) * 1e9:>18.0f}'
+            )
+
+    instructions = synthetic_instructions(100_000)
+    tracemalloc.start()
+    cfg = LeaderCFGBuilder().build(instructions)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{len(cfg.blocks)} blocks, {allocated // len(cfg.blocks)} bytes allocated per block')
+
+
+if __name__ == '__main__':
+    main()
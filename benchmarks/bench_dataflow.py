@@ -0,0 +1,43 @@
+"""
+Liveness, reaching definitions and available constants of a generated
+function with thousands of blocks inside nested loops.
+
+    python benchmarks/bench_dataflow.py
+"""
+import timeit
+
+from rigel.code import Code
+from rigel.dataflow import available_constants, liveness, reaching_definitions
+
+
+LOOPS = 500
+
+
+def generated_function() -> str:
+    body = ''.join(
+        f'    for row_{index} in rows:\n'
+        f'        value_{index % 50} = {index}\n'
+        f'        for column in row_{index}:\n'
+        f'            if column:\n'
+        f'                total = total + column + value_{index % 50}\n'
+        for index in range(LOOPS)
+    )
+    return f'def function(rows):\n    total = 0\n{body}    return total\n'
+
+
+def main():
+    module = compile(generated_function(), '<generated>', 'exec')
+    cfg = Code.from_code(module.co_consts[0]).cfg
+    print(f'{len(cfg.blocks)} blocks')
+
+    for name, analysis in (
+            ('liveness', liveness),
+            ('reaching definitions', reaching_definitions),
+            ('available constants', available_constants),
+    ):
+        elapsed = min(timeit.repeat(lambda: analysis(cfg), number=1, repeat=5))  # pylint: disable=cell-var-from-loop
+        print(f'{name:<24}{elapsed * 1e3:>10.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Decoding the installed stdlib: `dis.get_instructions` + `convert` against `decode`.
+
+Only code objects whose opcodes all have an instruction class are measured,
+`convert` cannot handle `EXTENDED_ARG`.
+
+    python benchmarks/bench_decoder.py
+"""
+import dis
+import sysconfig
+import time
+import warnings
+from pathlib import Path
+from types import CodeType
+
+from rigel.decoder import decode
+from rigel.instruction import PYTHON_OPCODE_INSTRUCTION_MAP, convert
+
+
+def code_objects(code: CodeType):
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            yield from code_objects(const)
+
+
+def stdlib_corpus() -> list[CodeType]:
+    corpus = []
+    for path in sorted(Path(sysconfig.get_paths()['stdlib']).rglob('*.py')):
+        try:
+            module = compile(path.read_bytes(), str(path), 'exec')
+        except (SyntaxError, ValueError):
+            continue
+
+        corpus.extend(
+            code for code in code_objects(module)
+            if all(instruction.opcode in PYTHON_OPCODE_INSTRUCTION_MAP for instruction in dis.get_instructions(code))
+        )
+
+    return corpus
+
+
+def measure(function, corpus) -> float:
+    start = time.perf_counter()
+    for code in corpus:
+        function(code)
+    return time.perf_counter() - start
+
+
+def main():
+    warnings.simplefilter('ignore')
+    corpus = stdlib_corpus()
+    instructions = sum(len(code.co_code) // 2 for code in corpus)
+    print(f'{len(corpus)} code objects, {instructions} code units')
+
+    baseline = measure(lambda code: list(convert(dis.get_instructions(code))), corpus)
+    decoded = measure(decode, corpus)
+
+    print(f'{"dis + convert":<16}{baseline:>10.3f} s')
+    print(f'{"decode":<16}{decoded:>10.3f} s')
+    print(f'speedup {baseline / decoded:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Diffing a generated module against an identical compile of it and against a
+compile with one function changed: the old `dir()` based field diff, the
+current `code_diff` and the instruction level `diff_code`.
+
+    python benchmarks/bench_diff.py
+"""
+import timeit
+from inspect import isbuiltin
+
+from rigel.diff import diff_code
+from rigel.utils import code_diff
+
+
+FUNCTIONS = 2000
+
+
+def generated_module(changed: int | None = None) -> str:
+    return '\n'.join(
+        f'def function_{index}(first, second):\n'
+        f'    value = first + second * {index + (index == changed)}\n'
+        f'    return [item for item in range(value)]\n'
+        for index in range(FUNCTIONS)
+    )
+
+
+def dir_code_diff(code_a, code_b):
+    """`code_diff` as it was, every `co_` attribute found with `dir()`."""
+    def fields(code):
+        for name in dir(code):
+            if name.startswith('co_'):
+                value = getattr(code, name)
+                yield name, list(value()) if isbuiltin(value) else value
+
+    fields_a, fields_b = dict(fields(code_a)), dict(fields(code_b))
+    return {key: (value, fields_b[key]) for key, value in fields_a.items() if fields_b[key] != value}
+
+
+def nested_codes(code):
+    yield code
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            yield from nested_codes(const)
+
+
+def main():
+    code = compile(generated_module(), '<generated>', 'exec')
+    same = compile(generated_module(), '<generated>', 'exec')
+    changed = compile(generated_module(changed=FUNCTIONS // 2), '<generated>', 'exec')
+
+    for name, other in (('identical', same), ('one change', changed)):
+        pairs = list(zip(nested_codes(code), nested_codes(other)))
+        for label, function in (
+                ('dir() code_diff', lambda: [dir_code_diff(*pair) for pair in pairs]),  # pylint: disable=cell-var-from-loop
+                ('code_diff', lambda: [code_diff(*pair) for pair in pairs]),  # pylint: disable=cell-var-from-loop
+                ('diff_code', lambda: diff_code(code, other)),  # pylint: disable=cell-var-from-loop
+        ):
+            elapsed = min(timeit.repeat(function, number=1, repeat=5))
+            print(f'{name:<12}{label:<18}{elapsed * 1e3:>10.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Dominator tree and loop forest of a large generated module with nested
+loops, then the cost of a loop depth query.
+
+    python benchmarks/bench_dominators.py
+"""
+import timeit
+
+from rigel.code import Code
+from rigel.dominators import DominatorTree, LoopForest, loop_forest
+
+
+LOOPS = 2000
+
+
+def generated_module() -> str:
+    return ''.join(
+        f'for row_{index} in rows:\n'
+        f'    for column in row_{index}:\n'
+        f'        if column:\n'
+        f'            total = total + column\n'
+        for index in range(LOOPS)
+    )
+
+
+def main():
+    cfg = Code.from_code(compile(generated_module(), '<generated>', 'exec')).cfg
+    print(f'{len(cfg.blocks)} blocks')
+
+    for name, function in (
+            ('dominator tree', lambda: DominatorTree(cfg)),
+            ('loop forest', lambda: LoopForest(cfg)),
+    ):
+        elapsed = min(timeit.repeat(function, number=1, repeat=5))
+        print(f'{name:<20}{elapsed * 1e3:>10.2f} ms')
+
+    forest = loop_forest(cfg)
+    elapsed = min(timeit.repeat(lambda: [forest.depth(block) for block in cfg.blocks], number=1, repeat=5))
+    print(f'{"depth query":<20}{elapsed / len(cfg.blocks) * 1e9:>10.0f} ns')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Time per iteration of loops calling globals and methods, before and after
+`hoist_code` under each assumption.
+
+    python benchmarks/bench_hoisting.py
+"""
+import timeit
+from textwrap import dedent
+
+from rigel.hoisting import Assumption, hoist_code
+
+
+ITEMS = 100_000
+
+SOURCE = dedent('''
+    import math
+
+    class Collector:
+        def __init__(self):
+            self.items = []
+
+        def collect(self, values):
+            for value in values:
+                self.items.append(len(value))
+
+    def lengths(values):
+        total = 0
+        for value in values:
+            total += abs(len(value) - 5)
+        return total
+
+    def roots(values):
+        total = 0.0
+        for value in values:
+            total += math.sqrt(value) * math.pi
+        return total
+''')
+
+
+def main():
+    namespace = {}
+    exec(compile(SOURCE, '<bench_hoisting>', 'exec'), namespace)  # pylint: disable=exec-used
+    strings = ['x' * (index % 10) for index in range(ITEMS)]
+    numbers = list(range(ITEMS))
+
+    loops = {
+        'abs(len())': (namespace['lengths'], lambda function: function(strings)),
+        'math.sqrt * math.pi': (namespace['roots'], lambda function: function(numbers)),
+        'self.items.append': (
+            namespace['Collector'].collect,
+            lambda function: function(namespace['Collector'](), strings),
+        ),
+    }
+
+    print(f'{"loop":<24}{"original":>12}' + ''.join(f'{assumption.value:>12}' for assumption in Assumption))
+    for name, (function, call) in loops.items():
+        variants = [function] + [
+            function.__class__(hoist_code(function.__code__, assumption), function.__globals__)
+            for assumption in Assumption
+        ]
+        timings = [
+            min(timeit.repeat(lambda: call(variant), number=1, repeat=7)) / ITEMS * 1e9  # pylint: disable=cell-var-from-loop
+            for variant in variants
+        ]
+        print(f'{name:<24}' + ''.join(f'{timing:>9.1f} ns' for timing in timings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Cost of re-encoding after inserting one probe, against encoding from scratch.
+
+The incremental cost only follows the number of blocks (layout and splicing),
+the full encoding follows the number of instructions.
+
+    python benchmarks/bench_incremental.py
+"""
+import sys
+import timeit
+from copy import copy
+from pathlib import Path
+
+from rigel.code import Code
+from rigel.instruction import make_instruction
+
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bench_assembler import large_function  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def best_of(function, repeat: int = 5) -> float:
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def main():
+    for size in (1_000, 10_000, 100_000):
+        instructions = large_function(size)
+        code = Code(instructions=[copy(instruction) for instruction in instructions])
+        code.code_object()
+
+        block = code.cfg.blocks[len(code.cfg.blocks) // 2]
+
+        def edit():
+            block.insert(0, make_instruction('LOAD_CONST', 0, 0, starts_line=1))  # pylint: disable=cell-var-from-loop
+            block.insert(1, make_instruction('POP_TOP', starts_line=1))  # pylint: disable=cell-var-from-loop
+            code.code_object()  # pylint: disable=cell-var-from-loop
+
+        incremental = best_of(edit)
+        full = best_of(lambda: Code(instructions=[copy(instruction) for instruction in instructions]).code_object())  # pylint: disable=cell-var-from-loop
+
+        print(f'{size:>8} instructions  incremental {incremental * 1e3:>8.2f} ms  full {full * 1e3:>8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Resident size of many generated modules with and without interning.
+
+Each module is a generated model class: the same accessors and constant
+tables, only the class name differs. All code objects are kept alive, as a
+worker holding the imported modules would.
+
+    python benchmarks/bench_interning.py
+"""
+import tracemalloc
+
+from rigel.interning import Interner
+
+
+MODULES = 300
+
+MODEL = '''
+FIELDS = {fields!r}
+DEFAULTS = {defaults!r}
+
+class Model{index}:
+    def __init__(self, {arguments}):
+{assignments}
+
+{properties}
+'''
+
+
+def generated_module(index: int) -> str:
+    fields = tuple(f'field_{number}' for number in range(20))
+    return MODEL.format(
+        index=index,
+        fields=fields,
+        defaults=tuple(range(len(fields))),
+        arguments=', '.join(fields),
+        assignments='\n'.join(f'        self._{name} = {name}' for name in fields),
+        properties='\n'.join(
+            f'    @property\n    def {name}(self):\n        return self._{name}\n' for name in fields
+        ),
+    )
+
+
+def compiled_size(interner: Interner | None) -> tuple[int, list]:
+    tracemalloc.start()
+    codes = []
+    for index in range(MODULES):
+        code = compile(generated_module(index), f'model_{index}.py', 'exec')
+        codes.append(code if interner is None else interner.intern_code(code))
+
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, codes
+
+
+def main():
+    plain, _ = compiled_size(None)
+    interner = Interner()
+    interned, _ = compiled_size(interner)
+
+    print(f'{"plain":<12}{plain / 2 ** 20:>8.2f} MiB')
+    print(f'{"interned":<12}{interned / 2 ** 20:>8.2f} MiB')
+    print(f'{interner.stats.hits} hits, {interner.stats.bytes_saved / 2 ** 20:.2f} MiB reported saved')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Run time of a module whose work is a top-level loop over prepared rows, as
+compiled and after `lift_module_loops`.
+
+    python benchmarks/bench_lifting.py
+"""
+import timeit
+
+from rigel.lifting import lift_module_loops
+
+
+ROWS = 200_000
+
+SOURCE = '''
+total = 0
+counts = {}
+for number, text, bucket in rows:
+    length = len(text)
+    if bucket:
+        total += number * length
+    counts[bucket] = counts.get(bucket, 0) + 1
+'''
+
+
+def main():
+    code = compile(SOURCE, '<bench_lifting>', 'exec')
+    lifted = lift_module_loops(code)
+    rows = [(index, str(index), index % 7) for index in range(ROWS)]
+
+    timings = {}
+    for name, module in (('module', code), ('lifted', lifted)):
+        timings[name] = min(timeit.repeat(lambda: exec(module, {'rows': rows}), number=1, repeat=15))  # pylint: disable=exec-used,cell-var-from-loop
+        print(f'{name:<10}{timings[name] * 1e3:>10.2f} ms{timings[name] / ROWS * 1e9:>10.1f} ns/row')
+
+    print(f'speedup   {timings["module"] / timings["lifted"]:>10.2f}x')
+
+
+if __name__ == '__main__':
+    main()
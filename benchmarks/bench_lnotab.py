@@ -0,0 +1,42 @@
+"""
+Offset to line lookups on a large module, scanning `co_lines` every time
+against a `LineTable` decoded once.
+
+    python benchmarks/bench_lnotab.py
+"""
+import random
+import timeit
+
+from rigel.lnotab import LineTable, line_table
+
+
+LINES = 20_000
+LOOKUPS = 10_000
+
+
+def scan(code, offset):
+    for start, end, line in code.co_lines():
+        if start <= offset < end:
+            return line
+
+    return None
+
+
+def main():
+    code = compile(''.join(f'value_{index} = {index}\n' for index in range(LINES)), '<generated>', 'exec')
+    offsets = [random.randrange(0, len(code.co_code), 2) for _ in range(LOOKUPS)]
+
+    decode = min(timeit.repeat(lambda: LineTable.from_code(code), number=1, repeat=5))
+    print(f'{"decode":<20}{decode * 1e3:>10.2f} ms for {LINES} lines')
+
+    table = line_table(code)
+    for name, lookup in (
+            ('co_lines scan', lambda: [scan(code, offset) for offset in offsets[:100]]),
+            ('LineTable.line', lambda: [table.line(offset) for offset in offsets[:100]]),
+    ):
+        elapsed = min(timeit.repeat(lookup, number=1, repeat=5))
+        print(f'{name:<20}{elapsed / 100 * 1e6:>10.2f} us/lookup')
+
+
+if __name__ == '__main__':
+    main()
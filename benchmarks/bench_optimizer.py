@@ -0,0 +1,76 @@
+"""
+Loop running the kind of code instrumentation leaves behind, before and after `optimize`.
+
+Probes (a constant expression, a discarded constant and a detour through a
+jump-only block) are spliced into the body of a compiled loop; the peephole
+passes take all of them out again.
+
+    python benchmarks/bench_optimizer.py
+"""
+import statistics
+import timeit
+from copy import copy
+
+from rigel.cfg import Block, For, LeaderCFGBuilder
+from rigel.code import Code
+from rigel.instruction import make_instruction
+from rigel.optimizer import Constants, linearize, optimize
+
+
+LOOP = """
+total = 0
+for index in range(200_000):
+    total += index
+"""
+
+
+def instrumented_loop() -> Code:
+    code = Code.from_code(compile(LOOP, '<bench>', 'exec'))
+    consts = Constants(code.consts)
+    cfg = LeaderCFGBuilder().build([copy(instruction) for instruction in code.instructions])
+
+    body = next(cfg.blocks[position + 1] for position, block in enumerate(cfg.blocks) if isinstance(block, For))
+
+    line = body.instructions[0].starts_line
+    probe = [
+        make_instruction('LOAD_CONST', consts.index(2), 2, starts_line=line),
+        make_instruction('LOAD_CONST', consts.index(3), 3, starts_line=line),
+        make_instruction('BINARY_ADD', starts_line=line),
+        make_instruction('POP_TOP', starts_line=line),
+        make_instruction('LOAD_CONST', consts.index('probe'), 'probe', starts_line=line),
+        make_instruction('POP_TOP', starts_line=line),
+    ]
+    body.instructions = probe + body.instructions
+
+    detour = cfg.add_block(Block(make_instruction('JUMP_ABSOLUTE', starts_line=line)))
+    detour.target = body.target
+    detour.add_exit(body.target)
+    body.remove_exit(body.target)
+    body.target = detour
+    body.add_exit(detour)
+
+    return code.replace(linearize(cfg), co_consts=consts.as_tuple())
+
+
+def bench(code, runs: int = 20) -> list[float]:
+    return timeit.repeat(lambda: exec(code, {}), number=1, repeat=runs)  # pylint: disable=exec-used
+
+
+def report(name: str, timings: list[float]) -> None:
+    print(f'{name:<12} Mean +- std dev: {statistics.mean(timings) * 1e3:.2f} ms +- {statistics.stdev(timings) * 1e3:.2f} ms')
+
+
+def main():
+    instrumented = instrumented_loop()
+    optimized = optimize(instrumented)
+
+    before = bench(instrumented.code_object())
+    after = bench(optimized.code_object())
+
+    report('instrumented', before)
+    report('optimized', after)
+    print(f'optimized: {statistics.mean(before) / statistics.mean(after):.2f}x faster')
+
+
+if __name__ == '__main__':
+    main()
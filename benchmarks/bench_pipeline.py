@@ -0,0 +1,233 @@
+"""
+Throughput of every stage of the rigel pipeline over the installed stdlib.
+
+The corpus is the first `--files` modules of the stdlib in sorted order, so
+runs on the same Python are comparable. Every code object rigel can handle,
+nested ones included, goes through `convert`, `LeaderCFGBuilder.build`,
+`calculate_stack_size`, `assemble_lnotab` and `Code.code_object`, and every
+module through `loader.dump`. Each stage reports instructions per second,
+best of `--repeat`, and its peak traced memory from a separate pass.
+
+    python benchmarks/bench_pipeline.py --output baseline.json
+    python benchmarks/bench_pipeline.py --compare baseline.json
+
+With `--compare` stages that got slower or use more memory than the
+baseline by more than `--threshold` are flagged and the exit code is 1.
+"""
+import argparse
+import dis
+import io
+import json
+import platform
+import sys
+import sysconfig
+import time
+import tracemalloc
+from pathlib import Path
+from types import CodeType
+from typing import Callable
+
+from rigel.cfg import LeaderCFGBuilder, calculate_stack_size
+from rigel.code import Code
+from rigel.compiler import find_sources
+from rigel.exceptions import RigelError
+from rigel.instruction import convert
+from rigel.lnotab import assemble_lnotab
+from rigel.loader import PYTHON_VERSION, dump
+
+
+EXCLUDED = {'test', 'idlelib', 'lib2to3', 'site-packages', 'tkinter', 'turtledemo'}
+
+
+def corpus(files: int) -> list[CodeType]:
+    """Module code objects of the first `files` stdlib sources that compile."""
+    stdlib = Path(sysconfig.get_paths()['stdlib'])
+    sources = [
+        source for source in find_sources([str(stdlib)])
+        if not EXCLUDED & set(Path(source).relative_to(stdlib).parts)
+    ]
+
+    modules = []
+    for source in sources:
+        if len(modules) == files:
+            break
+
+        try:
+            modules.append(compile(Path(source).read_bytes(), source, 'exec', dont_inherit=True))
+        except (SyntaxError, ValueError):
+            continue
+
+    return modules
+
+
+def nested_codes(code: CodeType):
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            yield from nested_codes(const)
+
+
+def supported(code: CodeType) -> bool:
+    """Whether rigel has instruction classes for every opcode of `code`."""
+    try:
+        list(convert(dis.get_instructions(code)))
+        Code.from_code(code)
+    except (KeyError, RigelError):
+        return False
+
+    return True
+
+
+def stages(codes: list[CodeType], modules: list[CodeType]) -> dict[str, tuple[Callable, Callable]]:
+    """Stage name to a setup building its input and the measured function taking it."""
+    def converted():
+        return [list(convert(dis.get_instructions(code))) for code in codes]
+
+    def graphs():
+        return [LeaderCFGBuilder().build(instructions) for instructions in converted()]
+
+    return {
+        'convert': (
+            lambda: [list(dis.get_instructions(code)) for code in codes],
+            lambda listings: [list(convert(listing)) for listing in listings],
+        ),
+        'build': (
+            converted,
+            lambda listings: [LeaderCFGBuilder().build(instructions) for instructions in listings],
+        ),
+        'calculate_stack_size': (
+            graphs,
+            lambda cfgs: [calculate_stack_size(cfg) for cfg in cfgs],
+        ),
+        'assemble_lnotab': (
+            lambda: list(zip(converted(), codes)),
+            lambda pairs: [
+                assemble_lnotab(instructions, code.co_firstlineno, len(code.co_code)) for instructions, code in pairs
+            ],
+        ),
+        'code_object': (
+            lambda: [Code.from_code(code) for code in codes],
+            lambda instances: [instance.code_object() for instance in instances],
+        ),
+        'dump': (
+            lambda: modules,
+            lambda modules_: [dump(module, io.BytesIO(), version=PYTHON_VERSION) for module in modules_],
+        ),
+    }
+
+
+def measure(setup: Callable, function: Callable, repeat: int) -> tuple[float, int]:
+    """Best time of `function` over `repeat` fresh inputs, then its peak traced memory."""
+    best = float('inf')
+    for _ in range(repeat):
+        data = setup()
+        start = time.perf_counter()
+        function(data)
+        best = min(best, time.perf_counter() - start)
+
+    data = setup()
+    tracemalloc.start()
+    try:
+        function(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return best, peak
+
+
+def run(files: int, repeat: int) -> dict:
+    modules = corpus(files)
+    codes = [code for module in modules for code in nested_codes(module)]
+    handled = [code for code in codes if supported(code)]
+    instructions = sum(len(code.co_code) // 2 for code in handled)
+    module_instructions = sum(len(code.co_code) // 2 for module in modules for code in nested_codes(module))
+
+    results = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'corpus': {
+            'files': len(modules),
+            'code_objects': len(codes),
+            'skipped': len(codes) - len(handled),
+            'instructions': instructions,
+        },
+        'stages': {},
+    }
+
+    for name, (setup, function) in stages(handled, modules).items():
+        seconds, peak = measure(setup, function, repeat)
+        count = module_instructions if name == 'dump' else instructions
+        results['stages'][name] = {
+            'seconds': seconds,
+            'instructions_per_second': count / seconds if seconds else 0.0,
+            'peak_bytes': peak,
+        }
+
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Regressions of `results` against `baseline`, one line each."""
+    regressions = []
+    for name, stage in results['stages'].items():
+        before = baseline['stages'].get(name)
+        if before is None:
+            continue
+
+        if stage['instructions_per_second'] < before['instructions_per_second'] * (1 - threshold):
+            regressions.append(
+                f'{name}: {stage["instructions_per_second"]:,.0f} instructions/s, '
+                f'baseline {before["instructions_per_second"]:,.0f}'
+            )
+
+        if stage['peak_bytes'] > before['peak_bytes'] * (1 + threshold):
+            regressions.append(f'{name}: peak {stage["peak_bytes"]:,} bytes, baseline {before["peak_bytes"]:,}')
+
+    return regressions
+
+
+def report(results: dict, baseline: dict | None) -> None:
+    corpus_ = results['corpus']
+    print(
+        f'{corpus_["files"]} files, {corpus_["code_objects"]} code objects '
+        f'({corpus_["skipped"]} skipped), {corpus_["instructions"]:,} instructions'
+    )
+
+    for name, stage in results['stages'].items():
+        line = f'{name:<24}{stage["instructions_per_second"]:>14,.0f} instructions/s{stage["peak_bytes"]:>14,} B peak'
+        if baseline and name in baseline['stages']:
+            change = stage['instructions_per_second'] / baseline['stages'][name]['instructions_per_second'] - 1
+            line += f'{change:>+10.1%}'
+
+        print(line)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0].strip())
+    parser.add_argument('--files', type=int, default=200, help='stdlib modules in the corpus')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs of every stage, the best is kept')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative change flagged as a regression')
+    args = parser.parse_args(argv)
+
+    results = run(args.files, args.repeat)
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+
+    report(results, baseline)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + '\n')
+
+    if baseline is None:
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f'REGRESSION {regression}', file=sys.stderr)
+
+    return int(bool(regressions))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
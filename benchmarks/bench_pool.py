@@ -0,0 +1,44 @@
+"""
+Pooling of constants and names when code objects are built from instruction
+listings alone, over the modules of the stdlib corpus.
+
+    python benchmarks/bench_pool.py
+"""
+import dis
+import sys
+import timeit
+from pathlib import Path
+
+from rigel.code import Code
+from rigel.instruction import convert
+from rigel.pool import Pool
+
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bench_pipeline import corpus, supported  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def main():
+    modules = [module for module in corpus(200) if supported(module)]
+    listings = [list(convert(dis.get_instructions(module))) for module in modules]
+    instructions = sum(map(len, listings))
+    consts = [const for module in modules for const in module.co_consts]
+    print(f'{len(modules)} modules, {instructions:,} instructions, {len(consts):,} constants')
+
+    graphs = [Code(instructions=listing).cfg for listing in listings]
+    elapsed = min(timeit.repeat(lambda: [cfg.co_consts for cfg in graphs], number=100, repeat=5)) / 100
+    print(f'{"co_consts":<20}{elapsed / len(graphs) * 1e9:>10.0f} ns per access')
+
+    elapsed = min(timeit.repeat(lambda: Pool(consts), number=10, repeat=5)) / 10
+    print(f'{"Pool":<20}{elapsed / len(consts) * 1e9:>10.0f} ns per constant')
+
+    elapsed = float('inf')
+    for _ in range(5):
+        fresh = [list(convert(dis.get_instructions(module))) for module in modules]
+        elapsed = min(elapsed, timeit.timeit(lambda: [Code(instructions=listing).code_object() for listing in fresh], number=1))  # pylint: disable=cell-var-from-loop
+    print(f'{"code_object":<20}{instructions / elapsed:>10,.0f} instructions/s')
+
+
+if __name__ == '__main__':
+    main()
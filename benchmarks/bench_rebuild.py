@@ -0,0 +1,48 @@
+"""
+Rebuilding a generated module with thousands of functions.
+
+Every function holds a list comprehension, so there are two levels of nested
+code. The last run reuses the memo of a previous one, as a compiler building
+the same generated module again would.
+
+    python benchmarks/bench_rebuild.py
+"""
+import os
+import time
+
+from rigel.code import rebuild
+
+
+FUNCTIONS = 4000
+
+
+def generated_module() -> str:
+    return '\n'.join(
+        f'def function_{index}(first, second):\n'
+        f'    value = first + second * {index}\n'
+        f'    return [item for item in range(value)]\n'
+        for index in range(FUNCTIONS)
+    )
+
+
+def measure(source: str, **kwargs) -> float:
+    code = compile(source, '<generated>', 'exec')
+    start = time.perf_counter()
+    rebuild(code, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    source = generated_module()
+    jobs = os.cpu_count() or 1
+
+    print(f'{"jobs=1":<16}{measure(source):>8.3f} s')
+    print(f'{f"jobs={jobs}":<16}{measure(source, jobs=jobs):>8.3f} s')
+
+    memo = {}
+    measure(source, memo=memo)
+    print(f'{"warm memo":<16}{measure(source, memo=memo):>8.3f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Per-instruction stack effect cost: `dis.stack_effect`, the instruction method
+and a lookup in the precomputed tables, then a whole stack size computation.
+
+    python benchmarks/bench_stack.py
+"""
+import dis
+import sys
+import timeit
+from pathlib import Path
+
+from rigel.cfg import LeaderCFGBuilder, calculate_stack_size
+from rigel.stack import STACK_EFFECTS
+
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bench_assembler import large_function  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def best_of(function, repeat: int = 7) -> float:
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def table_effect(instruction) -> int:
+    effect = STACK_EFFECTS[instruction.opcode]
+    return effect if effect.__class__ is int else effect(instruction.arg)
+
+
+def main():
+    instructions = large_function(100_000)
+
+    for name, effect in (
+            ('dis.stack_effect', lambda instruction: dis.stack_effect(
+                instruction.opcode, instruction.arg if instruction.opcode >= dis.HAVE_ARGUMENT else None, jump=False,
+            )),
+            ('stack_effect()', lambda instruction: sum(instruction.stack_effect(jump=False))),
+            ('table lookup', table_effect),
+    ):
+        elapsed = best_of(lambda: [effect(instruction) for instruction in instructions])  # pylint: disable=cell-var-from-loop
+        print(f'{name:<20}{elapsed / len(instructions) * 1e9:>8.0f} ns/instruction')
+
+    cfg = LeaderCFGBuilder().build(instructions)
+    elapsed = best_of(lambda: calculate_stack_size(cfg))
+    print(f'{"stack size":<20}{elapsed:>8.3f} s for {len(instructions)} instructions')
+
+
+if __name__ == '__main__':
+    main()
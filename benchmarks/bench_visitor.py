@@ -0,0 +1,60 @@
+"""
+Instruction dispatch cost: the opcode table against a per-instruction `getattr`.
+
+    python benchmarks/bench_visitor.py
+"""
+import sys
+import timeit
+from pathlib import Path
+
+from rigel.cfg import LeaderCFGBuilder
+from rigel.visitor import InstructionVisitor
+
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bench_cfg import synthetic_instructions  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def _keep_block(_, __, block):
+    return block
+
+
+class TableVisitor(InstructionVisitor):
+    visit_load_name = _keep_block
+    visit_load_const = _keep_block
+    visit_compare_op = _keep_block
+    visit_pop_jump_if_false = _keep_block
+    visit_store_name = _keep_block
+
+
+class GetattrVisitor(TableVisitor):
+    def visit(self, instruction, block):
+        return getattr(self, f'visit_{instruction.opname.lower()}', self._unknown_instruction)(instruction, block)
+
+
+class GetattrCFGBuilder(LeaderCFGBuilder):
+    def visit(self, instruction, block):
+        block = self._block_for(instruction, block)
+        return getattr(self, f'visit_{instruction.opname.lower()}', self._unknown_instruction)(instruction, block)
+
+
+def best_of(function, repeat: int = 7) -> float:
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def main():
+    instructions = synthetic_instructions(100_000)
+
+    for visitor_class in (GetattrVisitor, TableVisitor):
+        visit = visitor_class().visit
+        elapsed = best_of(lambda: [visit(instruction, None) for instruction in instructions])  # pylint: disable=cell-var-from-loop
+        print(f'{visitor_class.__name__:<20}{elapsed / len(instructions) * 1e9:>8.0f} ns/instruction')
+
+    for builder_class in (GetattrCFGBuilder, LeaderCFGBuilder):
+        elapsed = best_of(lambda: builder_class().build(instructions))  # pylint: disable=cell-var-from-loop
+        print(f'{builder_class.__name__:<20}{elapsed:>8.3f} s for {len(instructions)} instructions')
+
+
+if __name__ == '__main__':
+    main()
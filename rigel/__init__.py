@@ -1,8 +1,27 @@
-from .code import make_code_object
-from .loader import dump
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from rigel.code import make_code_object
+    from rigel.loader import dump
 
 
 __all__ = (
     'make_code_object',
     'dump',
 )
+
+_LAZY = {
+    'make_code_object': 'rigel.code',
+    'dump': 'rigel.loader',
+}
+
+
+def __getattr__(name: str):
+    """Import the module behind a public name on first access, `import rigel` stays cheap."""
+    if name not in _LAZY:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = globals()[name] = getattr(import_module(_LAZY[name]), name)
+    return value
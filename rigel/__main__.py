@@ -0,0 +1,49 @@
+import argparse
+import sys
+from collections import Counter
+
+from rigel.compiler import Status, compile_paths
+
+
+def _compile(args: argparse.Namespace) -> int:
+    counter: Counter = Counter()
+
+    for result in compile_paths(args.paths, jobs=args.jobs, force=args.force):
+        counter[result.status] += 1
+
+        if result.status is Status.FAILED:
+            print(f'{result.path}: {result.error}', file=sys.stderr)
+        elif result.status is Status.COMPILED and not args.quiet:
+            print(f'Compiling {result.path!r}...')
+
+    print(', '.join(f'{counter[status]} {status.value}' for status in Status))
+
+    return int(bool(counter[Status.FAILED]))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='rigel')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    compile_ = commands.add_parser(
+        'compile', help='rebuild source trees into __pycache__ through rigel',
+    )
+    compile_.add_argument('paths', nargs='+', help='files and directories to compile')
+    compile_.add_argument(
+        '-j', '--jobs', type=int, default=1, help='worker processes, 0 uses every core',
+    )
+    compile_.add_argument(
+        '-f', '--force', action='store_true', help='rebuild even if the cache is up to date',
+    )
+    compile_.add_argument(
+        '-q', '--quiet', action='store_true', help='only report failures and the summary',
+    )
+    compile_.set_defaults(handler=_compile)
+
+    args = parser.parse_args(argv)
+
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
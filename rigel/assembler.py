@@ -0,0 +1,181 @@
+"""
+Bytecode assembly from instructions whose jumps name labels instead of offsets.
+
+cpython:
+    https://github.com/python/cpython/blob/3.10/Python/compile.c#L6806
+"""
+import dis
+from functools import cache
+from itertools import accumulate
+from typing import Final, Iterable
+
+from rigel.cfg import has_target
+from rigel.exceptions import AssemblerError
+from rigel.instruction import BaseInstruction, IFlag
+
+
+EXTENDED_ARG: Final = dis.opmap['EXTENDED_ARG']
+
+Jump = tuple[int, BaseInstruction, int, bool]
+
+
+class Label:
+    """A position in an instruction stream, jumps carry it in `argval`."""
+    __slots__ = ('name',)
+
+    def __init__(self, name: str = ''):
+        self.name = name
+
+    def __repr__(self):
+        return f'<Label {self.name or hex(id(self))}>'
+
+
+@cache
+def _is_relative(instruction_class: type[BaseInstruction]) -> bool:
+    return bool(instruction_class.FLAG & IFlag.HAS_JREL)
+
+
+def width(arg: int | None) -> int:
+    """Number of code units, `EXTENDED_ARG` prefixes included, needed to encode `arg`."""
+    if arg is None or arg <= 0xff:
+        return 1
+    if arg <= 0xffff:
+        return 2
+    if arg <= 0xffffff:
+        return 3
+    return 4
+
+
+def label_jumps(instructions: list[BaseInstruction]) -> list[BaseInstruction | Label]:
+    """Replace the offsets in jump `argval`s with labels placed before their targets."""
+    labels = {}
+    for instruction in instructions:
+        if has_target(instruction.__class__):
+            label = labels.setdefault(instruction.argval, Label())
+            instruction.argval = label
+
+    stream = []
+    for instruction in instructions:
+        if instruction.offset in labels:
+            stream.append(labels.pop(instruction.offset))
+        stream.append(instruction)
+
+    if labels:
+        raise AssemblerError(f'Jump to offsets without an instruction: {sorted(labels)}')
+
+    return stream
+
+
+def _resolve_labels(
+        stream: Iterable[BaseInstruction | Label],
+) -> tuple[list[BaseInstruction], list[Jump]]:
+    """Instructions of `stream` and its jumps, `(index, jump, target index, relative)`."""
+    instructions: list[BaseInstruction] = []
+    targets: dict[Label, int] = {}
+    for item in stream:
+        if isinstance(item, Label):
+            targets[item] = len(instructions)
+        else:
+            instructions.append(item)
+
+    jumps: list[Jump] = []
+    for index, instruction in enumerate(instructions):
+        if isinstance(instruction.argval, Label):
+            try:
+                target = targets[instruction.argval]
+            except KeyError:
+                raise AssemblerError(
+                    f'{instruction.argval!r} is not placed in the stream',
+                ) from None
+            jumps.append((index, instruction, target, _is_relative(instruction.__class__)))
+
+    return instructions, jumps
+
+
+def relax_jumps(
+        widths: list[int],
+        jumps: list[Jump],
+        sizes: list[int] | None = None,
+) -> list[int]:
+    """
+    Grow `widths` until every jump fits its argument, return where each item starts.
+
+    Item `i` takes `sizes[i] + widths[i]` code units (only `widths[i]` without
+    `sizes`) and ends with the jump that is `widths[i]` units wide, jumps are
+    `(item, jump, target item, relative)`. Widths only ever grow, so the
+    offset assignment reaches the smallest fixpoint in a few passes. Jumps
+    get their `arg`, a relative jump that ends up going backwards raises
+    `AssemblerError`.
+    """
+    while True:
+        units = widths if sizes is None else map(int.__add__, sizes, widths)
+        starts = list(accumulate(units, initial=0))
+
+        grown = False
+        for index, instruction, target, relative in jumps:
+            arg = starts[target] - starts[index + 1] if relative else starts[target]
+            if arg < 0:
+                raise AssemblerError(
+                    f'Relative jump backwards at {2 * (starts[index + 1] - widths[index])}',
+                )
+
+            instruction.arg = arg
+            if width(arg) > widths[index]:
+                widths[index] = width(arg)
+                grown = True
+
+        if not grown:
+            return starts
+
+
+def encode_instruction(
+        code: bytearray,
+        position: int,
+        opcode_: int,
+        arg: int | None,
+        units: int,
+) -> int:
+    """Write an instruction `units` code units wide at byte `position` of `code`, return its end."""
+    arg = arg or 0
+    for shift in range(8 * (units - 1), 0, -8):
+        code[position] = EXTENDED_ARG
+        code[position + 1] = arg >> shift & 0xff
+        position += 2
+
+    code[position] = opcode_
+    code[position + 1] = arg & 0xff
+    return position + 2
+
+
+def assemble(stream: Iterable[BaseInstruction | Label]) -> bytearray:
+    """
+    Encode `stream` into `co_code`.
+
+    Jump widths start at one code unit and only ever grow (see
+    `relax_jumps`). A jump that ends up wider than its final argument needs
+    keeps a zero `EXTENDED_ARG` rather than moving everything after it again.
+
+    Each instruction gets its final `offset`, jumps get `arg` and the target
+    offset back in `argval`.
+    """
+    instructions, jumps = _resolve_labels(stream)
+
+    widths = [width(instruction.arg) for instruction in instructions]
+    for index, *_ in jumps:
+        widths[index] = 1
+
+    starts = relax_jumps(widths, jumps)
+
+    code = bytearray(2 * starts[-1])
+    for instruction, start, units in zip(instructions, starts, widths):
+        position = instruction.offset = 2 * start
+        if units == 1:
+            code[position] = instruction.opcode
+            code[position + 1] = instruction.arg or 0
+        else:
+            encode_instruction(code, position, instruction.opcode, instruction.arg, units)
+
+    for _, instruction, target, _ in jumps:
+        instruction.argval = 2 * starts[target]
+
+    return code
@@ -0,0 +1,160 @@
+import dis
+from array import array
+from typing import Any, Iterable, Iterator
+
+from rigel.instruction import PYTHON_OPCODE_INSTRUCTION_MAP, BaseInstruction
+from rigel.pool import Pool
+
+
+NO_ARG = -1
+
+
+def _column(name: str, none: Any = ...) -> property:
+    """Property reading and writing item `self.position` of the buffer column `name`."""
+    def getter(self):
+        value = getattr(self.buffer, name)[self.position]
+        return None if value == none else value
+
+    def setter(self, value):
+        getattr(self.buffer, name)[self.position] = none if value is None else value
+
+    return property(getter, setter)
+
+
+def _interned(name: str) -> property:
+    """Property resolving item `self.position` of the buffer column `name` through the values."""
+    def getter(self):
+        return self.buffer.value(getattr(self.buffer, name)[self.position])
+
+    def setter(self, value):
+        getattr(self.buffer, name)[self.position] = self.buffer.intern(value)
+
+    return property(getter, setter)
+
+
+class InstructionView(BaseInstruction):
+    """
+    Instruction stored in an `InstructionBuffer`, reads and writes go straight to the columns.
+
+    `buffer` and `position` locate the instruction, they are fixed for the life of the view.
+    """
+    __slots__ = ('buffer', 'position')
+
+    opcode = _column('_opcodes')
+    arg = _column('_args', none=NO_ARG)
+    offset = _column('_offsets')
+    starts_line = _column('_lines')
+    argval = _interned('_argvals')
+    argrepr = _interned('_argreprs')
+
+    def __init__(self, buffer: 'InstructionBuffer', index: int):  # pylint: disable=super-init-not-called
+        self.buffer = buffer
+        self.position = index
+
+    def __eq__(self, other):
+        if isinstance(other, InstructionView):
+            return self.buffer is other.buffer and self.position == other.position
+
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self.buffer), self.position))
+
+    @property
+    def opname(self) -> str:
+        return dis.opname[self.opcode]
+
+    @property
+    def is_jump_target(self) -> bool:
+        return bool(self.buffer._jump_targets[self.position])  # pylint: disable=protected-access
+
+
+_VIEW_CLASSES: dict[int, type[InstructionView]] = {}
+
+
+def view_class(opcode_: int) -> type[InstructionView]:
+    """View class sharing flags and behaviour with the instruction class of `opcode_`."""
+    try:
+        return _VIEW_CLASSES[opcode_]
+    except KeyError:
+        instruction_class = PYTHON_OPCODE_INSTRUCTION_MAP[opcode_]
+        view = type(
+            f'{instruction_class.__name__}View',
+            (InstructionView, instruction_class),
+            {'__slots__': (), '__module__': __name__},
+        )
+        return _VIEW_CLASSES.setdefault(opcode_, view)
+
+
+class InstructionBuffer:  # pylint: disable=too-many-instance-attributes
+    """
+    Struct-of-arrays instruction storage.
+
+    Opcodes, arguments, offsets and lines live in `array` columns, argument
+    values and their representations are interned into one value table.
+    Indexing and iteration produce `InstructionView` objects that behave like
+    the `BaseInstruction` subclass registered for the opcode.
+    """
+    def __init__(self, instructions: Iterable[dis.Instruction | BaseInstruction] = ()):
+        self._opcodes = array('B')
+        self._args = array('i')
+        self._offsets = array('I')
+        self._lines = array('I')
+        self._argvals = array('I')
+        self._argreprs = array('I')
+        self._jump_targets = bytearray()
+
+        self._values = Pool()
+
+        self._line = 0
+        self.extend(instructions)
+
+    def __len__(self) -> int:
+        return len(self._opcodes)
+
+    def __iter__(self) -> Iterator[InstructionView]:
+        for index, opcode_ in enumerate(self._opcodes):
+            yield view_class(opcode_)(self, index)
+
+    def __getitem__(self, index: int | slice) -> InstructionView | list[InstructionView]:
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+
+        if not 0 <= index < len(self):
+            raise IndexError('instruction index out of range')
+
+        return view_class(self._opcodes[index])(self, index)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the columns in bytes, the value table is not included."""
+        columns = (
+            self._opcodes, self._args, self._offsets, self._lines, self._argvals, self._argreprs,
+        )
+        return sum(column.itemsize * len(column) for column in columns) + len(self._jump_targets)
+
+    def intern(self, value: Any) -> int:
+        return self._values.index(value)
+
+    def value(self, index: int) -> Any:
+        return self._values[index]
+
+    def append(self, instruction: dis.Instruction | BaseInstruction) -> None:
+        """Append `instruction`, a missing `starts_line` continues the previous line."""
+        if instruction.starts_line is not None:
+            self._line = instruction.starts_line
+
+        self._opcodes.append(instruction.opcode)
+        self._args.append(NO_ARG if instruction.arg is None else instruction.arg)
+        self._offsets.append(instruction.offset)
+        self._lines.append(self._line)
+        self._argvals.append(self.intern(instruction.argval))
+        self._argreprs.append(self.intern(instruction.argrepr))
+        self._jump_targets.append(instruction.is_jump_target)
+
+    def extend(self, instructions: Iterable[dis.Instruction | BaseInstruction]) -> None:
+        for instruction in instructions:
+            self.append(instruction)
@@ -1,52 +1,195 @@
-import uuid
+import dis
+from array import array
+from functools import cache
+from itertools import count
+from typing import Any, Callable, NamedTuple, TypeVar
+
+from rigel.instruction import BaseInstruction, IFlag
+from rigel.pool import Pool
+from rigel.stack import JUMP_STACK_EFFECTS, STACK_EFFECTS
+from rigel.visitor import InstructionVisitor
 
-from more_itertools import first_true, unique_everseen
 
-from rigel.instruction import BaseInstruction
-from rigel.visitor import InstructionVisitor
+_HAS_CONST = frozenset(dis.hasconst)
+_HAS_NAME = frozenset(dis.hasname)
+
+
+@cache
+def has_target(instruction_class: type[BaseInstruction]) -> bool:
+    """Whether instructions of `instruction_class` carry a jump target in `argval`."""
+    return bool(instruction_class.FLAG & (IFlag.HAS_JREL | IFlag.HAS_JABS))
+
+
+def entry_stack_depth(instructions: list[BaseInstruction]) -> int:
+    """Generators and coroutines start with a sent value on the stack, `GEN_START` pops it."""
+    return int(bool(instructions) and instructions[0].opname == 'GEN_START')
 
 
-def calculate_stack_size(instructions):
-    size = 0
-    minsize = 0
+def calculate_stack_size(cfg: 'ControlFlowGraph') -> int:
+    """
+    Compute the maximum stack depth of `cfg`.
+
+    The blocks are laid out in graph order and walked from a worklist of entry
+    points: every jump pushes its target with the taken-branch effect, the
+    fall-through continues with the not-taken effect, and the walk stops at
+    final instructions. Each instruction is visited once, so the cost is linear,
+    and its effect is a lookup in the precomputed `rigel.stack` tables.
+
+    cpython:
+        https://github.com/python/cpython/blob/3.10/Python/compile.c#L7051
+    """
+    instructions = [instruction for block in cfg.blocks for instruction in block]
+    positions = {instruction.offset: position for position, instruction in enumerate(instructions)}
+    depths: list[int | None] = [None] * len(instructions)
+    effects, jump_effects = STACK_EFFECTS, JUMP_STACK_EFFECTS
+
     maxsize = 0
+    todo = [(0, entry_stack_depth(instructions))]
+    while todo:
+        position, size = todo.pop()
 
-    for instruction in instructions:
-        pre_, post_ = instruction.stack_effect(jump=False)
-        size += pre_ + post_
-        maxsize = max(maxsize, size)
-        minsize = min(minsize, size)
+        while position < len(instructions) and depths[position] is None:
+            depths[position] = size
+            instruction = instructions[position]
+
+            if has_target(instruction.__class__):
+                effect = jump_effects[instruction.opcode]
+                if effect.__class__ is not int:
+                    effect = effect(instruction.arg)
+
+                maxsize = max(maxsize, size + effect)
+                todo.append((positions[instruction.argval], size + effect))
+
+            effect = effects[instruction.opcode]
+            if effect.__class__ is not int:
+                effect = effect(instruction.arg)
+
+            size += effect
+            maxsize = max(maxsize, size)
+
+            if instruction.is_final():
+                break
+
+            position += 1
 
     return maxsize
 
 
-class Block:
+T = TypeVar('T')
+
+
+class Block:  # pylint: disable=too-many-instance-attributes
+    """
+    Basic block.
+
+    `number` is the number the graph gave the block when it was added, `next`
+    and `prev` list the successors and predecessors in the order their edges
+    were added. Besides the graph links and the instructions, a block keeps
+    the state `IncrementalEncoder` needs per block, its `offset` and whether
+    it is `dirty`, so that none of it has to be looked up in side tables.
+    """
+    __slots__ = (
+        'graph', 'number', 'next', 'prev', '_instructions', 'label', '_labels', '_target',
+        'offset', 'dirty',
+    )
+
     def __init__(self, instruction=None, label=None):
-        self.graph = None
-        self.next = set()
-        self.prev = set()
+        self.graph: ControlFlowGraph | None = None
+        self.number: int | None = None
+        self.next: list[Block] = []
+        self.prev: list[Block] = []
         self._instructions = []
         self.label = label
-        self.labels = {}
-        self.uuid = uuid.uuid4()
+        self._labels: dict | None = None
+        self._target: Block | None = None
+        self.offset = 0
+        self.dirty = True
 
         if instruction:
             self._instructions.append(instruction)
 
+    def __iter__(self):
+        return iter(self._instructions)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.number} {self.label or ""}>'
+
+    @property
+    def labels(self) -> dict:
+        if self._labels is None:
+            self._labels = {}
+
+        return self._labels
+
+    @property
+    def instructions(self) -> list[BaseInstruction]:
+        return self._instructions
+
+    @instructions.setter
+    def instructions(self, instructions: list[BaseInstruction]) -> None:
+        self._instructions = instructions
+        self.mark_dirty()
+
+    @property
+    def target(self) -> 'Block | None':
+        """Block the terminal jump of this block goes to."""
+        return self._target
+
+    @target.setter
+    def target(self, block: 'Block | None') -> None:
+        self._target = block
+        self.mark_dirty()
+
+    def mark_dirty(self) -> None:
+        """
+        Have the block encoded and the analyses of its graph computed again.
+
+        Needed after changing `instructions` or an instruction in place.
+        """
+        self.dirty = True
+        if self.graph is not None:
+            self.graph.invalidate()
+
     def add(self, instruction: BaseInstruction):
         self._instructions.append(instruction)
+        self.mark_dirty()
+
+    def insert(self, index: int, instruction: BaseInstruction) -> None:
+        self._instructions.insert(index, instruction)
+        self.mark_dirty()
+
+    def is_final(self) -> bool:
+        """Whether control never falls through the end of this block."""
+        return bool(self._instructions) and self._instructions[-1].is_final()
 
     def add_exit(self, block):
         """Adds an exit from this block to `block`."""
-        self.next.add(block)
-        block.prev.add(self)
+        if block in self.next:
+            return
+
+        self.next.append(block)
+        block.prev.append(self)
+
+        if self.graph is not None:
+            self.graph.invalidate()
+
+    def remove_exit(self, block):
+        """Removes the exit from this block to `block`."""
+        if block not in self.next:
+            return
+
+        self.next.remove(block)
+        block.prev.remove(self)
+
+        if self.graph is not None:
+            self.graph.invalidate()
 
     def get_source(self):
         return '\n'.join([str(inst) for inst in self._instructions])
 
 
 class For(Block):
-    pass
+    __slots__ = ()
 
 
 class Frame:
@@ -58,29 +201,112 @@ def add_instruction_to_block(_, instruction: BaseInstruction, block: Block) -> B
     return block
 
 
+class Adjacency(NamedTuple):
+    """
+    Edges in compressed sparse row form over block positions in `blocks`.
+
+    The neighbours of `blocks[i]` are `targets[offsets[i]:offsets[i + 1]]`.
+    """
+    blocks: list[Block]
+    offsets: array
+    targets: array
+
+
 class ControlFlowGraph:
+    __slots__ = ('start_block', '_blocks', '_numbers', 'version', '_analyses')
+
     def __init__(self, start_block):
         self.start_block = start_block
 
+        self._numbers = count()
         self._blocks = []
-        self._consts = []
-        self._names = []
 
-        self._blocks.append(start_block)
+        self.version = 0
+        self._analyses: dict[Callable, tuple[int, Any]] = {}
+
+        self.add_block(start_block)
 
     @property
-    def co_consts(self):
-        return tuple(unique_everseen(self._consts))
+    def blocks(self) -> list[Block]:
+        """Blocks in layout order."""
+        return self._blocks
 
     @property
-    def co_names(self):
-        return tuple(unique_everseen(self._names))
+    def co_consts(self) -> tuple:
+        """Constants the instructions load in order of first use, pooled again after changes."""
+        return self.analysis(const_pool).as_tuple()
+
+    @property
+    def co_names(self) -> tuple:
+        return self.analysis(name_pool).as_tuple()
+
+    def invalidate(self) -> None:
+        """
+        Records a change of the blocks, their instructions or edges.
+
+        Cached analyses are computed again on their next use.
+        """
+        self.version += 1
+
+    def analysis(self, compute: Callable[['ControlFlowGraph'], T]) -> T:
+        """`compute(self)`, cached until the graph changes."""
+        cached = self._analyses.get(compute)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+
+        result = compute(self)
+        self._analyses[compute] = (self.version, result)
+        return result
+
+    def adjacency(self, reverse: bool = False) -> Adjacency:
+        """Successors of every block as flat arrays, predecessors with `reverse`."""
+        positions = {block: position for position, block in enumerate(self._blocks)}
+        offsets, targets = array('l', [0]), array('l')
+        for block in self._blocks:
+            neighbours = block.prev if reverse else block.next
+            targets.extend(positions[neighbour] for neighbour in neighbours)
+            offsets.append(len(targets))
+
+        return Adjacency(list(self._blocks), offsets, targets)
+
+    def add_block(self, block: Block) -> Block:
+        block.graph = self
+        block.number = next(self._numbers)
+        self._blocks.append(block)
+        self.invalidate()
+        return block
+
+    def remove_blocks(self, blocks: set[Block]) -> None:
+        """Removes `blocks` from the layout together with their edges."""
+        for block in blocks:
+            for successor in list(block.next):
+                block.remove_exit(successor)
+
+            for predecessor in list(block.prev):
+                predecessor.remove_exit(block)
+
+            block.graph = None
+
+        self._blocks = [block for block in self._blocks if block not in blocks]
+        self.invalidate()
 
-    def add_const(self, const):
-        self._consts.append(const)
 
-    def add_name(self, name):
-        self._names.append(name)
+def _pool(cfg: ControlFlowGraph, opcodes: frozenset[int]) -> Pool:
+    pool = Pool()
+    for block in cfg.blocks:
+        for instruction in block:
+            if instruction.opcode in opcodes:
+                pool.index(instruction.argval)
+
+    return pool
+
+
+def const_pool(cfg: ControlFlowGraph) -> Pool:
+    return _pool(cfg, _HAS_CONST)
+
+
+def name_pool(cfg: ControlFlowGraph) -> Pool:
+    return _pool(cfg, _HAS_NAME)
 
 
 class CFGBuilder(InstructionVisitor):
@@ -93,20 +319,26 @@ class CFGBuilder(InstructionVisitor):
 
         self._split_offsets = []
 
+    def _new_block(self, block_class=Block, **kwargs) -> Block:
+        return self._cfg.add_block(block_class(**kwargs))
+
     def visit(self, instruction, block):
-        calc_block, offset = first_true(
-            iterable=self._split_offsets,
-            default=(block, None),
-            pred=lambda block_offset_pair: block_offset_pair[1] == instruction.offset
+        block = self._block_for(instruction, block)
+        return self._dispatch[instruction.opcode](self, instruction, block)
+
+    def _block_for(self, instruction: BaseInstruction, block: Block) -> Block:
+        calc_block, offset = next(
+            (pair for pair in self._split_offsets if pair[1] == instruction.offset),
+            (block, None),
         )
 
         if offset is None:
-            return super().visit(instruction, calc_block)
+            return calc_block
 
-        new_block = Block()
+        new_block = self._new_block()
         calc_block.add_exit(new_block)
 
-        return super().visit(instruction, new_block)
+        return new_block
 
     def build(self, instructions: list[BaseInstruction]) -> ControlFlowGraph:
         current_block = self._cfg.start_block
@@ -123,27 +355,46 @@ class CFGBuilder(InstructionVisitor):
     visit_get_iter = add_instruction_to_block
     visit_make_function = add_instruction_to_block
     visit_compare_op = add_instruction_to_block
-
-    def visit_load_name(self, instruction: BaseInstruction, block: Block) -> Block:
-        self._cfg.add_name(instruction.argval)
-        block.add(instruction)
-
-        return block
-
-    def visit_load_const(self, instruction: BaseInstruction, block: Block) -> Block:
-        self._cfg.add_const(instruction.argval)
-        block.add(instruction)
-
-        return block
-
-    def visit_store_name(self, instruction: BaseInstruction, block: Block) -> Block:
-        self._cfg.add_name(instruction.argval)
-        block.add(instruction)
-
-        return block
+    visit_binary_power = add_instruction_to_block
+    visit_binary_multiply = add_instruction_to_block
+    visit_binary_modulo = add_instruction_to_block
+    visit_binary_add = add_instruction_to_block
+    visit_binary_subtract = add_instruction_to_block
+    visit_binary_subscr = add_instruction_to_block
+    visit_binary_floor_divide = add_instruction_to_block
+    visit_binary_true_divide = add_instruction_to_block
+    visit_binary_lshift = add_instruction_to_block
+    visit_binary_rshift = add_instruction_to_block
+    visit_binary_and = add_instruction_to_block
+    visit_binary_xor = add_instruction_to_block
+    visit_binary_or = add_instruction_to_block
+    visit_load_fast = add_instruction_to_block
+    visit_store_fast = add_instruction_to_block
+    visit_load_build_class = add_instruction_to_block
+    visit_build_list = add_instruction_to_block
+    visit_list_append = add_instruction_to_block
+    visit_load_const = add_instruction_to_block
+    visit_load_name = add_instruction_to_block
+    visit_load_global = add_instruction_to_block
+    visit_store_name = add_instruction_to_block
+
+    def _generic_handler(self, instruction: BaseInstruction) -> Callable:
+        """Handler for opcodes without a `visit_` method, chosen from the flags of their class."""
+        if has_target(instruction.__class__):
+            if instruction.no_next:
+                return self.__class__.visit_jump_absolute
+
+            return self.__class__.visit_pop_jump_if_false
+
+        return add_instruction_to_block
+
+    def _unknown_instruction(self, *args, **kwargs) -> Block:
+        instruction = args[0]
+        handler = self._dispatch[instruction.opcode] = self._generic_handler(instruction)
+        return handler(self, *args, **kwargs)
 
     def visit_for_iter(self, instruction: BaseInstruction, block: Block) -> Block:
-        new_block = For(label='<for>')
+        new_block = self._new_block(For, label='<for>')
         new_block.add(instruction)
         block.add_exit(new_block)
         return new_block
@@ -151,18 +402,84 @@ class CFGBuilder(InstructionVisitor):
     def visit_jump_absolute(self, instruction: BaseInstruction, block: Block) -> Block:
         block.add(instruction)
 
-        new_block = Block()
+        new_block = self._new_block()
         block.add_exit(new_block)
         return new_block
 
     def visit_pop_jump_if_false(self, instruction: BaseInstruction, block: Block) -> Block:
         block.add(instruction)
         self._split_offsets.append((block, instruction.argval))
-        new_block = Block()
+        new_block = self._new_block()
         block.add_exit(new_block)
         return new_block
 
 
+class LeaderCFGBuilder(CFGBuilder):
+    """
+    Single pass variant of `CFGBuilder`.
+
+    Leaders (jump targets, loop heads and instructions that follow a branch)
+    are indexed by offset before the walk, so each instruction costs one
+    dictionary lookup and every jump, back-edges included, is wired to the
+    block that really starts at its target.
+    """
+    def __init__(self):
+        super().__init__()
+        self._leaders: dict[int, Block] = {}
+
+    def build(self, instructions: list[BaseInstruction]) -> ControlFlowGraph:
+        self._leaders = self._find_leaders(instructions)
+        return super().build(instructions)
+
+    def _find_leaders(self, instructions: list[BaseInstruction]) -> dict[int, Block]:
+        kinds: dict[int, type[Block]] = {}
+        follows_branch = False
+
+        for instruction in instructions:
+            if instruction.opname == 'FOR_ITER':
+                kinds[instruction.offset] = For
+            elif follows_branch:
+                kinds.setdefault(instruction.offset, Block)
+
+            if has_target(instruction.__class__):
+                kinds.setdefault(instruction.argval, Block)
+                follows_branch = True
+            else:
+                follows_branch = instruction.is_final()
+
+        leaders = {
+            offset: For(label='<for>') if kind is For else Block()
+            for offset, kind in kinds.items()
+        }
+        if kinds.get(0) is Block:
+            leaders[0] = self._cfg.start_block
+
+        return leaders
+
+    def _block_for(self, instruction: BaseInstruction, block: Block) -> Block:
+        leader = self._leaders.get(instruction.offset)
+        if leader is None or leader is block:
+            return block
+
+        if not block.is_final():
+            block.add_exit(leader)
+
+        return self._cfg.add_block(leader)
+
+    def _visit_jump(self, instruction: BaseInstruction, block: Block) -> Block:
+        block.add(instruction)
+        block.target = self._leaders[instruction.argval]
+        block.add_exit(block.target)
+
+        return block
+
+    # `_generic_handler` hands the jumps without a handler of their own to these as well.
+    visit_for_iter = _visit_jump
+    visit_jump_absolute = _visit_jump
+    visit_jump_forward = _visit_jump
+    visit_pop_jump_if_false = _visit_jump
+
+
 def build_cfg(instructions: list[BaseInstruction]):
     blocks = []
     code = []
@@ -1,26 +1,33 @@
 import dis
+import marshal
+import os
 from collections import deque
+from hashlib import blake2b
 from types import CodeType
 from typing import Iterable
 
-from rigel.cfg import CFGBuilder, calculate_stack_size
+from rigel.cfg import ControlFlowGraph, LeaderCFGBuilder
+from rigel.decoder import decode
+from rigel.encoder import IncrementalEncoder
+from rigel.exceptions import UnknownInstructionError
 from rigel.instruction import BaseInstruction, convert
-from rigel.lnotab import assemble_lnotab
+from rigel.interning import Interner
+from rigel.pool import Pool
 from rigel.utils import CompilerFlags, create_code_object
 
 
 class Code:  # pylint: disable=too-many-instance-attributes
     def __init__(self, instructions: list[BaseInstruction]):
-        self._instructions = instructions
-
-        self._cfg = CFGBuilder().build(self._instructions)
+        self._cfg = LeaderCFGBuilder().build(instructions)
+        self._encoder = IncrementalEncoder(self._cfg)
+        self._encoded = False
 
         self._co_argcount = 0
         self._co_posonlyargcount = 0
         self._co_kwonlyargcount = 0
         self._co_nlocals = 0
-        self._co_consts = tuple()
-        self._co_names = tuple()
+        self._co_consts: tuple | None = None
+        self._co_names: tuple | None = None
         self._co_varnames = tuple()
         self._co_freevars = tuple()
         self._co_cellvars = tuple()
@@ -29,30 +36,230 @@ class Code:  # pylint: disable=too-many-instance-attributes
         self._co_name = '<module>'
         self._co_filename = '<string>'
 
-    def _co_code(self) -> bytes:
-        return b''.join([instruction.as_bytes() for instruction in self._instructions])
+    @classmethod
+    def from_code(cls, code: CodeType) -> 'Code':
+        """Build from `code` without going through `dis`, keeping its signature and tables."""
+        instance = cls(instructions=decode(code))
+
+        instance._co_argcount = code.co_argcount
+        instance._co_posonlyargcount = code.co_posonlyargcount
+        instance._co_kwonlyargcount = code.co_kwonlyargcount
+        instance._co_nlocals = code.co_nlocals
+        instance._co_consts = code.co_consts
+        instance._co_names = code.co_names
+        instance._co_varnames = code.co_varnames
+        instance._co_freevars = code.co_freevars
+        instance._co_cellvars = code.co_cellvars
+        instance._co_flags = code.co_flags
+        instance._co_firstlineno = code.co_firstlineno
+        instance._co_name = code.co_name
+        instance._co_filename = code.co_filename
+
+        return instance
+
+    @property
+    def cfg(self) -> ControlFlowGraph:
+        """
+        The graph `code_object` encodes.
+
+        Edits to its blocks are picked up by the next `code_object` call, only
+        the blocks that changed are encoded again.
+        """
+        return self._cfg
+
+    @property
+    def instructions(self) -> list[BaseInstruction]:
+        """Instructions in layout order, with the offsets of the last `code_object` call."""
+        if not self._encoded:
+            return [instruction for block in self._cfg.blocks for instruction in block]
+
+        instructions = []
+        for block in self._cfg.blocks:
+            offset = block.offset
+            for instruction in block:
+                instruction.offset = offset
+                offset += instruction.size
+                instructions.append(instruction)
+
+        return instructions
+
+    @property
+    def consts(self) -> tuple:
+        return self._cfg.co_consts if self._co_consts is None else self._co_consts
+
+    @property
+    def varnames(self) -> tuple:
+        return self._co_varnames
+
+    @property
+    def flags(self) -> int:
+        return self._co_flags
+
+    @property
+    def name(self) -> str:
+        return self._co_name
+
+    def replace(self, instructions: list[BaseInstruction], **fields) -> 'Code':
+        """Build from `instructions` with the metadata of this code, overridden by `fields`."""
+        instance = self.__class__(instructions=instructions)
+
+        for name, value in vars(self).items():
+            if name.startswith('_co_'):
+                setattr(instance, name, value)
+
+        for name, value in fields.items():
+            setattr(instance, f'_{name}', value)
+
+        return instance
+
+    def _pools(self) -> tuple[tuple, tuple]:
+        """
+        `co_consts` and `co_names`, the ones not given are pooled from the instructions.
+
+        Arguments of the instructions using a pooled table are pointed at it,
+        blocks whose arguments moved are encoded again.
+        """
+        if self._co_consts is not None and self._co_names is not None:
+            return self._co_consts, self._co_names
+
+        consts = Pool() if self._co_consts is None else None
+        names = Pool() if self._co_names is None else None
+        pools = {**dict.fromkeys(dis.hasname, names), **dict.fromkeys(dis.hasconst, consts)}
+        for block in self._cfg.blocks:
+            moved = False
+            for instruction in block:
+                pool = pools.get(instruction.opcode)
+                if pool is None:
+                    continue
+
+                arg = pool.index(instruction.argval)
+                if arg != instruction.arg:
+                    instruction.arg = arg
+                    moved = True
+
+            if moved:
+                block.mark_dirty()
+
+        return (
+            self._co_consts if consts is None else consts.as_tuple(),
+            self._co_names if names is None else names.as_tuple(),
+        )
 
     def code_object(self) -> CodeType:
+        co_consts, co_names = self._pools()
+        co_code, co_lnotab, co_stacksize = self._encoder.encode(self._co_firstlineno)
+        self._encoded = True
+
         return create_code_object(
             co_argcount=self._co_argcount,
             co_posonlyargcount=self._co_posonlyargcount,
             co_kwonlyargcount=self._co_kwonlyargcount,
             co_nlocals=self._co_nlocals,
-            co_stacksize=calculate_stack_size(self._instructions),
+            co_stacksize=co_stacksize,
             co_flags=self._co_flags,
-            co_code=self._co_code(),
-            co_consts=self._cfg.co_consts,
-            co_names=self._cfg.co_names,
+            co_code=co_code,
+            co_consts=co_consts,
+            co_names=co_names,
             co_varnames=self._co_varnames,
             co_filename=self._co_filename,
             co_name=self._co_name,
             co_firstlineno=self._co_firstlineno,
-            co_lnotab=b''.join(assemble_lnotab(self._instructions)),
+            co_lnotab=co_lnotab,
             co_freevars=self._co_freevars,
             co_cellvars=self._co_cellvars,
         )
 
 
+def content_key(code: CodeType) -> bytes:
+    """
+    Digest of everything `code` is made of, nested code objects included.
+
+    Marshal format 2 has no references, the newer formats flag objects by
+    their refcount and interning, which gives equal code objects different
+    digests.
+    """
+    return blake2b(marshal.dumps(code, 2), digest_size=16).digest()
+
+
+def _rebuild_consts(code: CodeType, memo: dict[bytes, CodeType]) -> CodeType:
+    if not any(isinstance(const, CodeType) for const in code.co_consts):
+        return code
+
+    return code.replace(co_consts=tuple(
+        _rebuild_nested(const, memo) if isinstance(const, CodeType) else const
+        for const in code.co_consts
+    ))
+
+
+def _rebuild_nested(code: CodeType, memo: dict[bytes, CodeType]) -> CodeType:
+    key = content_key(code)
+    if key in memo:
+        return memo[key]
+
+    code = _rebuild_consts(code, memo)
+    try:
+        rebuilt = Code.from_code(code).code_object()
+    except UnknownInstructionError:
+        rebuilt = code
+
+    memo[key] = rebuilt
+    return rebuilt
+
+
+def _rebuild_marshalled(data: bytes) -> bytes:
+    return marshal.dumps(_rebuild_nested(marshal.loads(data), {}))
+
+
+def rebuild(
+        code: CodeType,
+        jobs: int = 1,
+        memo: dict[bytes, CodeType] | None = None,
+        interner: Interner | None = None,
+) -> CodeType:
+    """
+    Rebuild `code` and every code object nested in its constants through `Code`.
+
+    The tree is rebuilt bottom-up, so each function, class body and
+    comprehension is assembled with its already rebuilt children as
+    constants. Identical code objects are rebuilt once, `memo` maps their
+    `content_key` to the result and may be shared between calls. Code that
+    uses instructions rigel doesn't know yet is kept as it is, with its
+    children rebuilt.
+
+    With more than one job the distinct code objects directly under `code` are
+    rebuilt in a process pool, `jobs=0` uses every core. With `interner` the
+    result shares its code objects and constants with everything else the
+    interner has seen.
+    """
+    memo = {} if memo is None else memo
+    jobs = jobs or os.cpu_count() or 1
+
+    nested = (const for const in code.co_consts if isinstance(const, CodeType))
+    children = {
+        key: const
+        for key, const in ((content_key(const), const) for const in nested)
+        if key not in memo
+    }
+
+    if jobs > 1 and len(children) > 1:
+        from concurrent.futures import ProcessPoolExecutor  # pylint: disable=import-outside-toplevel
+
+        chunksize = max(1, len(children) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            rebuilt = executor.map(
+                _rebuild_marshalled, map(marshal.dumps, children.values()), chunksize=chunksize,
+            )
+            memo.update(zip(children, map(marshal.loads, rebuilt)))
+
+    code = _rebuild_consts(code, memo)
+    try:
+        rebuilt = Code.from_code(code).code_object()
+    except UnknownInstructionError:
+        rebuilt = code
+
+    return rebuilt if interner is None else interner.intern_code(rebuilt)
+
+
 def flat_instructions(code: CodeType) -> Iterable[dis.Instruction]:
     todo = deque(list(dis.get_instructions(code)))
     while todo:
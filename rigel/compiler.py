@@ -0,0 +1,112 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from functools import partial
+from importlib.util import cache_from_source
+from typing import Iterable, Iterator
+
+from rigel.code import rebuild
+from rigel.exceptions import PycError
+from rigel.loader import PYTHON_VERSION, PYTHON_VERSION_MAGIC_MAP, dump, read_header
+
+
+class Status(Enum):
+    COMPILED = 'compiled'
+    SKIPPED = 'skipped'
+    FAILED = 'failed'
+
+
+@dataclass
+class CompileResult:
+    path: str
+    status: Status
+    error: str = ''
+
+
+def find_sources(paths: Iterable[str]) -> Iterator[str]:
+    """Yield `.py` files under `paths`, directories are walked skipping `__pycache__`."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(name for name in dirs if name != '__pycache__')
+            yield from (os.path.join(root, name) for name in sorted(files) if name.endswith('.py'))
+
+
+def is_up_to_date(cfile: str, stat: os.stat_result) -> bool:
+    """Whether `cfile` has a timestamp header for this Python matching the source `stat`."""
+    try:
+        header = read_header(cfile)
+    except (OSError, PycError):
+        return False
+
+    return (
+        header.magic == PYTHON_VERSION_MAGIC_MAP[PYTHON_VERSION]
+        and header.flags == 0
+        and header.modified == int(stat.st_mtime) & 0xFFFFFFFF
+        and header.source_size == stat.st_size & 0xFFFFFFFF
+    )
+
+
+def compile_file(source: str, force: bool = False) -> CompileResult:
+    """Rebuild `source` with its nested code objects and write its `__pycache__` file atomically."""
+    try:
+        cfile = cache_from_source(source)
+        stat = os.stat(source)
+
+        if not force and is_up_to_date(cfile, stat):
+            return CompileResult(source, Status.SKIPPED)
+
+        with open(source, 'rb') as source_file:
+            code = compile(source_file.read(), source, 'exec', dont_inherit=True)
+
+        code = rebuild(code)
+
+        directory = os.path.dirname(cfile)
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as fp:
+            try:
+                dump(
+                    code, fp,
+                    version=PYTHON_VERSION,
+                    modified=int(stat.st_mtime),
+                    source_size=stat.st_size,
+                )
+            except BaseException:
+                os.unlink(fp.name)
+                raise
+
+        os.replace(fp.name, cfile)
+    except Exception as error:  # pylint: disable=broad-except
+        return CompileResult(source, Status.FAILED, f'{error.__class__.__name__}: {error}')
+
+    return CompileResult(source, Status.COMPILED)
+
+
+def compile_paths(
+        paths: Iterable[str],
+        jobs: int = 1,
+        force: bool = False,
+) -> Iterator[CompileResult]:
+    """
+    Compile every source under `paths`.
+
+    With more than one job the sources are handed to a process pool in
+    chunks, a few per worker, so scheduling overhead stays small on large
+    trees. `jobs=0` uses every core.
+    """
+    sources = list(find_sources(paths))
+    worker = partial(compile_file, force=force)
+    jobs = jobs or os.cpu_count() or 1
+
+    if jobs == 1 or len(sources) < 2:
+        yield from map(worker, sources)
+        return
+
+    chunksize = max(1, len(sources) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(worker, sources, chunksize=chunksize)
@@ -0,0 +1,336 @@
+"""
+Bitset dataflow analyses over a `ControlFlowGraph`.
+
+Facts are Python ints used as bitsets, every block is summarized once into
+`gen` and `kill` sets, and a transfer is `gen | (fact & ~kill)`. The solver
+visits blocks in reverse postorder for forward problems and in postorder for
+backward ones, revisiting only the blocks whose inputs changed. Each loop
+then settles after one extra pass.
+
+Variables are the fast locals (`LOAD_FAST`, `STORE_FAST`, `DELETE_FAST`)
+and the names of module and class bodies (`LOAD_NAME`, `STORE_NAME`,
+`DELETE_NAME`). Cells, globals and attributes are not tracked. Exception
+edges are the ones of the graph, from a `SETUP_` instruction to its handler,
+so a store inside a protected region isn't seen by the handler.
+"""
+import operator
+from dataclasses import dataclass
+from functools import reduce
+from typing import Any, Hashable, Iterable, Iterator
+
+from rigel.cfg import Block, ControlFlowGraph
+from rigel.dominators import reverse_postorder
+from rigel.pool import const_key
+
+
+_READS = {'LOAD_FAST': 'fast', 'LOAD_NAME': 'name', 'DELETE_FAST': 'fast', 'DELETE_NAME': 'name'}
+_WRITES = {'STORE_FAST': 'fast', 'STORE_NAME': 'name', 'DELETE_FAST': 'fast', 'DELETE_NAME': 'name'}
+
+
+@dataclass
+class Problem:
+    """
+    A gen/kill problem, `gen` and `kill` hold one bitset per block of `order`.
+
+    May problems meet with union and start from the empty set, must problems
+    meet with intersection and start from `universe`. `boundary` is the fact
+    at the entry of the start block for forward problems and at the exit of
+    blocks without successors for backward ones.
+    """
+    order: list[Block]
+    gen: list[int]
+    kill: list[int]
+    forward: bool = True
+    may: bool = True
+    boundary: int = 0
+    universe: int = 0
+
+
+@dataclass
+class Solution:
+    """Facts at the entry and exit of every reachable block."""
+    ins: dict[Block, int]
+    outs: dict[Block, int]
+
+
+def _initial(problem: Problem) -> tuple[list[list[int]], list[list[int]], range, list[int]]:
+    """
+    Where the facts of every position come from and go to, the visiting order and the
+    fact every meet starts from, the boundary or the neutral element.
+    """
+    order = problem.order
+    index = {block: position for position, block in enumerate(order)}
+    predecessors = [[index[block_] for block_ in block.prev if block_ in index] for block in order]
+    successors = [[index[block_] for block_ in block.next if block_ in index] for block in order]
+
+    initial = 0 if problem.may else problem.universe
+    if problem.forward:
+        starts = [initial] * len(order)
+        if starts:
+            starts[0] = problem.boundary
+        return predecessors, successors, range(len(order)), starts
+
+    starts = [initial if targets else problem.boundary for targets in successors]
+    return successors, predecessors, range(len(order) - 1, -1, -1), starts
+
+
+def _meet(after: list[int], sources: list[int], fact: int, may: bool) -> int:
+    """`fact` met with the facts after `sources`, by union for may problems."""
+    if may:
+        for source in sources:
+            fact |= after[source]
+    else:
+        for source in sources:
+            fact &= after[source]
+
+    return fact
+
+
+def solve(problem: Problem) -> Solution:
+    sources, targets, positions, starts = _initial(problem)
+
+    gen, kill = problem.gen, problem.kill
+    initial = 0 if problem.may else problem.universe
+    before = [initial] * len(positions)
+    after = [gen[position] | (initial & ~kill[position]) for position in range(len(positions))]
+
+    pending = [True] * len(positions)
+    changed = True
+    while changed:
+        changed = False
+        for position in positions:
+            if not pending[position]:
+                continue
+
+            pending[position] = False
+            fact = before[position] = _meet(after, sources[position], starts[position], problem.may)
+            fact = gen[position] | (fact & ~kill[position])
+            if fact != after[position]:
+                after[position] = fact
+                changed = True
+                for target in targets[position]:
+                    pending[target] = True
+
+    if problem.forward:
+        return Solution(dict(zip(problem.order, before)), dict(zip(problem.order, after)))
+
+    return Solution(dict(zip(problem.order, after)), dict(zip(problem.order, before)))
+
+
+def _union(bitsets: Iterable[int]) -> int:
+    return reduce(operator.or_, bitsets, 0)
+
+
+class Variables:
+    """Bit of every variable, `('fast', name)` or `('name', name)`, in order of appearance."""
+    def __init__(self):
+        self.keys: list[Hashable] = []
+        self._bits: dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def bit(self, key: Hashable) -> int:
+        try:
+            return self._bits[key]
+        except KeyError:
+            self.keys.append(key)
+            return self._bits.setdefault(key, 1 << (len(self.keys) - 1))
+
+    def decode(self, bits: int) -> list[Hashable]:
+        """Variables of the bitset `bits`."""
+        return [key for position, key in enumerate(self.keys) if bits >> position & 1]
+
+
+def _accesses(block: Block) -> Iterator[tuple[int, Any, str | None, str | None]]:
+    """`(position, instruction, read, written)` of the instructions of `block` using a variable."""
+    for position, instruction in enumerate(block.instructions):
+        read, written = _READS.get(instruction.opname), _WRITES.get(instruction.opname)
+        if read or written:
+            yield position, instruction, read, written
+
+
+@dataclass
+class Liveness:
+    variables: Variables
+    solution: Solution
+
+    def live_in(self, block: Block) -> list[Hashable]:
+        return self.variables.decode(self.solution.ins.get(block, 0))
+
+    def live_out(self, block: Block) -> list[Hashable]:
+        return self.variables.decode(self.solution.outs.get(block, 0))
+
+
+def liveness(cfg: ControlFlowGraph) -> Liveness:
+    """Variables that may be read before being written again, at the entry and exit of blocks."""
+    order = cfg.analysis(reverse_postorder)
+    variables = Variables()
+
+    uses, defs = [], []
+    for block in order:
+        use = define = 0
+        for _, instruction, read, written in _accesses(block):
+            if read:
+                bit = variables.bit((read, instruction.argval))
+                if not define & bit:
+                    use |= bit
+            if written:
+                define |= variables.bit((written, instruction.argval))
+
+        uses.append(use)
+        defs.append(define)
+
+    return Liveness(variables, solve(Problem(order, uses, defs, forward=False)))
+
+
+@dataclass
+class ReachingDefinitions:
+    """`definitions` holds `(block, position, instruction)` of every store, bit `i` is the `i`th."""
+    definitions: list[tuple[Block, int, Any]]
+    solution: Solution
+
+    def reaching(self, block: Block) -> list[tuple[Block, int, Any]]:
+        """Definitions that may reach the entry of `block`."""
+        bits = self.solution.ins.get(block, 0)
+        return [
+            definition
+            for position, definition in enumerate(self.definitions) if bits >> position & 1
+        ]
+
+
+def reaching_definitions(cfg: ControlFlowGraph) -> ReachingDefinitions:
+    order = cfg.analysis(reverse_postorder)
+    definitions: list[tuple[Block, int, Any]] = []
+    by_variable: dict[Hashable, int] = {}
+    last: list[dict[Hashable, int]] = []
+
+    for block in order:
+        latest: dict[Hashable, int] = {}
+        for position, instruction, _, written in _accesses(block):
+            if written:
+                key = (written, instruction.argval)
+                bit = 1 << len(definitions)
+                definitions.append((block, position, instruction))
+                by_variable[key] = by_variable.get(key, 0) | bit
+                latest[key] = bit
+
+        last.append(latest)
+
+    gen = [_union(latest.values()) for latest in last]
+    kill = [_union(by_variable[key] & ~bit for key, bit in latest.items()) for latest in last]
+
+    return ReachingDefinitions(definitions, solve(Problem(order, gen, kill)))
+
+
+@dataclass
+class AvailableConstants:
+    """`pairs` holds `(variable, constant key, constant)`, bit `i` is pair `i`."""
+    pairs: list[tuple[Hashable, Hashable, Any]]
+    solution: Solution
+
+    def constants(self, block: Block) -> dict[Hashable, Any]:
+        """Variables that hold the same constant on every path to the entry of `block`."""
+        bits = self.solution.ins.get(block, 0)
+        return {
+            variable: value
+            for position, (variable, _, value) in enumerate(self.pairs) if bits >> position & 1
+        }
+
+
+class _ConstantPairs:
+    """Bit of every `(variable, constant)` pair, in order of appearance."""
+    def __init__(self):
+        self.pairs: list[tuple[Hashable, Hashable, Any]] = []
+        self.by_variable: dict[Hashable, int] = {}
+        self._bits: dict[tuple[Hashable, Hashable], int] = {}
+
+    def bit(self, variable: Hashable, value: Any) -> int:
+        key = (variable, const_key(value))
+        bit = self._bits.get(key)
+        if bit is None:
+            bit = self._bits[key] = 1 << len(self.pairs)
+            self.pairs.append((variable, key[1], value))
+            self.by_variable[variable] = self.by_variable.get(variable, 0) | bit
+
+        return bit
+
+
+def _latest_constants(block: Block, pairs: _ConstantPairs) -> dict[Hashable, int]:
+    """Pair bit of the last store of every variable `block` writes, zero if not a constant."""
+    latest: dict[Hashable, int] = {}
+    instructions = block.instructions
+    for position, instruction, _, written in _accesses(block):
+        if not written:
+            continue
+
+        variable: Hashable = (written, instruction.argval)
+        previous = instructions[position - 1] if position else None
+        if (
+            instruction.opname.startswith('STORE_')
+            and previous is not None
+            and previous.opname == 'LOAD_CONST'
+        ):
+            latest[variable] = pairs.bit(variable, previous.argval)
+        else:
+            latest[variable] = 0
+
+    return latest
+
+
+def available_constants(cfg: ControlFlowGraph) -> AvailableConstants:
+    """Variables last assigned straight from a `LOAD_CONST`, constants are told apart by type."""
+    order = cfg.analysis(reverse_postorder)
+    pairs = _ConstantPairs()
+    last = [_latest_constants(block, pairs) for block in order]
+
+    gen = [_union(latest.values()) for latest in last]
+    kill = [
+        _union(pairs.by_variable.get(variable, 0) & ~bit for variable, bit in latest.items())
+        for latest in last
+    ]
+    universe = (1 << len(pairs.pairs)) - 1
+
+    solution = solve(Problem(order, gen, kill, may=False, universe=universe))
+    return AvailableConstants(pairs.pairs, solution)
+
+
+@dataclass
+class DefiniteAssignment:
+    variables: Variables
+    solution: Solution
+
+    def assigned(self, block: Block) -> list[Hashable]:
+        """Variables bound on every path to the entry of `block`."""
+        return self.variables.decode(self.solution.ins.get(block, 0))
+
+
+def definite_assignment(cfg: ControlFlowGraph) -> DefiniteAssignment:
+    """
+    Variables stored and not deleted since on every path from the start.
+
+    Arguments aren't stores and count as unbound, a store in a protected
+    region doesn't reach its handler.
+    """
+    order = cfg.analysis(reverse_postorder)
+    variables = Variables()
+
+    gen, kill = [], []
+    for block in order:
+        stored = deleted = 0
+        for _, instruction, _, written in _accesses(block):
+            if not written:
+                continue
+
+            bit = variables.bit((written, instruction.argval))
+            if instruction.opname.startswith('STORE_'):
+                stored, deleted = stored | bit, deleted & ~bit
+            else:
+                stored, deleted = stored & ~bit, deleted | bit
+
+        gen.append(stored)
+        kill.append(deleted)
+
+    universe = (1 << len(variables)) - 1
+    solution = solve(Problem(order, gen, kill, may=False, universe=universe))
+    return DefiniteAssignment(variables, solution)
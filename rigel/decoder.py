@@ -0,0 +1,125 @@
+import dis
+from types import CodeType
+
+from rigel.exceptions import UnknownInstructionError
+from rigel.instruction import PYTHON_OPCODE_INSTRUCTION_MAP, BaseInstruction
+
+
+# Kinds of opcode arguments, `ARGUMENT_KINDS[opcode]` is one of them.
+KIND_PLAIN = 0
+KIND_CONST = 1
+KIND_NAME = 2
+KIND_JABS = 3
+KIND_JREL = 4
+KIND_LOCAL = 5
+KIND_COMPARE = 6
+KIND_FREE = 7
+KIND_FORMAT = 8
+
+
+def _argument_kinds() -> list[int]:
+    kinds = [KIND_PLAIN] * 256
+    for kind, opcodes in (
+            (KIND_CONST, dis.hasconst),
+            (KIND_NAME, dis.hasname),
+            (KIND_JABS, dis.hasjabs),
+            (KIND_JREL, dis.hasjrel),
+            (KIND_LOCAL, dis.haslocal),
+            (KIND_COMPARE, dis.hascompare),
+            (KIND_FREE, dis.hasfree),
+            (KIND_FORMAT, (dis.opmap['FORMAT_VALUE'],)),
+    ):
+        for opcode_ in opcodes:
+            kinds[opcode_] = kind
+
+    return kinds
+
+
+ARGUMENT_KINDS = _argument_kinds()
+
+
+def decode(code: CodeType) -> list[BaseInstruction]:  # pylint: disable=too-many-locals,too-many-branches,too-many-statements
+    """
+    Decode `code.co_code` straight into rigel instructions.
+
+    `EXTENDED_ARG` prefixes are folded into the instruction they extend, which
+    keeps the offset of its first prefix. The line table is walked once and
+    `starts_line` carries the current line forward like `convert` does. The
+    argument tables are only touched by the opcodes that need them and no
+    `argrepr` is formatted. Opcodes without a rigel instruction class raise
+    `UnknownInstructionError`.
+    """
+    co_code = memoryview(code.co_code)
+    consts, names, varnames = code.co_consts, code.co_names, code.co_varnames
+    cells = None
+
+    kinds, classes, opnames = ARGUMENT_KINDS, PYTHON_OPCODE_INSTRUCTION_MAP, dis.opname
+    extended_arg, have_argument = dis.EXTENDED_ARG, dis.HAVE_ARGUMENT
+
+    instructions: list[BaseInstruction] = []
+    append = instructions.append
+    targets = set()
+
+    line: int | None = None
+    start = None
+    start_line = line
+    extended = 0
+
+    for first, end, next_line in code.co_lines():
+        if next_line is not None:
+            line = next_line
+
+        units = zip(range(first, end, 2), co_code[first:end:2], co_code[first + 1:end:2])
+        for offset, opcode_, arg in units:
+            if start is None:
+                start, start_line = offset, line
+
+            if opcode_ == extended_arg:
+                extended = (arg | extended) << 8
+                continue
+
+            if opcode_ < have_argument:
+                arg = argval = None
+            else:
+                arg |= extended
+                kind = kinds[opcode_]
+
+                if kind == KIND_PLAIN:
+                    argval = arg
+                elif kind == KIND_CONST:
+                    argval = consts[arg]
+                elif kind == KIND_NAME:
+                    argval = names[arg]
+                elif kind == KIND_JABS:
+                    argval = arg * 2
+                    targets.add(argval)
+                elif kind == KIND_JREL:
+                    argval = offset + 2 + arg * 2
+                    targets.add(argval)
+                elif kind == KIND_LOCAL:
+                    argval = varnames[arg]
+                elif kind == KIND_COMPARE:
+                    argval = dis.cmp_op[arg]
+                elif kind == KIND_FREE:
+                    if cells is None:
+                        cells = code.co_cellvars + code.co_freevars
+                    argval = cells[arg]
+                else:
+                    argval = dis.FORMAT_VALUE_CONVERTERS[arg & 0x3][0], bool(arg & 0x4)
+
+            try:
+                instruction_class = classes[opcode_]
+            except KeyError:
+                raise UnknownInstructionError(f'{opnames[opcode_]} in {code.co_name}') from None
+
+            append(instruction_class(
+                opnames[opcode_], opcode_, arg, argval, '', start, start_line, False,
+            ))
+            start = None
+            extended = 0
+
+    for instruction in instructions:
+        if instruction.offset in targets:
+            instruction.is_jump_target = True
+
+    return instructions
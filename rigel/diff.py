@@ -0,0 +1,215 @@
+"""
+Instruction level diff of code objects.
+
+Both sides are decoded with `decoder.decode` and split into basic blocks.
+Every instruction gets a key that doesn't depend on offsets: its opcode and
+resolved argument, with jumps resolved to the content of the block they go
+to. Blocks are hashed from those keys and aligned, only the spans of blocks
+that don't line up are diffed instruction by instruction, and nested code
+objects found in the constants are diffed the same way.
+
+Code objects that compare equal, including the line tables and file names
+`CodeType.__eq__` leaves out, are reported identical without being decoded.
+"""
+import operator
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from types import CodeType
+from typing import Any, Hashable, NamedTuple
+
+from rigel.decoder import ARGUMENT_KINDS, KIND_CONST, KIND_JABS, KIND_JREL, decode
+from rigel.pool import const_key
+
+
+FIELDS = (
+    'co_argcount', 'co_posonlyargcount', 'co_kwonlyargcount', 'co_nlocals', 'co_stacksize',
+    'co_flags', 'co_names', 'co_varnames', 'co_freevars', 'co_cellvars', 'co_filename', 'co_name',
+    'co_firstlineno', 'co_linetable',
+)
+
+
+class DiffInstruction(NamedTuple):
+    offset: int
+    opname: str
+    argval: Any
+
+
+class InstructionChange(NamedTuple):
+    """Like the opcodes of `difflib.SequenceMatcher`, `tag` is `replace`, `delete` or `insert`."""
+    tag: str
+    a: list[DiffInstruction]
+    b: list[DiffInstruction]
+
+
+@dataclass
+class CodeDiff:
+    """
+    Differences between two code objects.
+
+    `fields` holds the differing attributes other than the bytecode and the
+    constants, `instructions` the minimal changes of the bytecode and `nested`
+    the diffs of nested code objects paired by name and order. Nested code
+    objects without a counterpart only show up as changed `LOAD_CONST`s.
+    """
+    name: str
+    fields: dict[str, tuple[Any, Any]] = field(default_factory=dict)
+    instructions: list[InstructionChange] = field(default_factory=list)
+    nested: dict[str, 'CodeDiff'] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.fields or self.instructions or self.nested)
+
+
+def _same_locations(code_a: CodeType, code_b: CodeType) -> bool:
+    """What `CodeType.__eq__` doesn't compare, for codes that are equal."""
+    return (
+        code_a.co_linetable == code_b.co_linetable
+        and code_a.co_filename == code_b.co_filename
+        and all(
+            _same_locations(const_a, const_b)
+            for const_a, const_b in zip(code_a.co_consts, code_b.co_consts)
+            if const_a.__class__ is CodeType and const_a is not const_b
+        )
+    )
+
+
+def identical(code_a: CodeType, code_b: CodeType) -> bool:
+    return code_a is code_b or (code_a == code_b and _same_locations(code_a, code_b))
+
+
+def _const_key(value: Any) -> Hashable:
+    if value.__class__ is CodeType:
+        return CodeType, value.co_name
+
+    return const_key(value)
+
+
+def _decode(code: CodeType) -> tuple[list[DiffInstruction], list[tuple], list[tuple[int, int]]]:
+    """Instructions of `code`, their keys with jumps unresolved, the jumps and their targets."""
+    instructions: list[DiffInstruction] = []
+    keys: list[tuple] = []
+    jumps: list[tuple[int, int]] = []
+    for instruction in decode(code):
+        opcode_, argval = instruction.opcode, instruction.argval
+        kind = ARGUMENT_KINDS[opcode_]
+
+        key: Hashable
+        if kind == KIND_CONST:
+            key = _const_key(argval)
+        elif kind in (KIND_JABS, KIND_JREL):
+            key = None
+            jumps.append((len(instructions), argval))
+        else:
+            key = argval
+
+        instructions.append(DiffInstruction(instruction.offset, instruction.opname, argval))
+        keys.append((opcode_, key))
+
+    return instructions, keys, jumps
+
+
+class _Blocks(NamedTuple):
+    """Instructions of a code object, their final keys, where its blocks start and their hashes."""
+    instructions: list[DiffInstruction]
+    keys: list[tuple]
+    bounds: list[int]
+    hashes: list[int]
+
+
+def _blocks(code: CodeType) -> _Blocks:
+    """Split `code` into blocks, `bounds` holds the position of every block and the end."""
+    instructions, keys, jumps = _decode(code)
+    positions = {instruction.offset: position for position, instruction in enumerate(instructions)}
+    jumps = [(position, positions[offset]) for position, offset in jumps if offset in positions]
+
+    leaders = {0}
+    for position, target in jumps:
+        leaders.add(position + 1)
+        leaders.add(target)
+
+    starts = sorted(leader for leader in leaders if leader < len(instructions))
+    bounds = list(zip(starts, [*starts[1:], len(instructions)]))
+
+    content, block_of = {}, {}
+    for start, end in bounds:
+        content[start] = hash(tuple(keys[start:end]))
+        block_of.update(dict.fromkeys(range(start, end), start))
+
+    for position, target in jumps:
+        start = block_of[target]
+        keys[position] = (keys[position][0], content[start], target - start)
+
+    hashes = [hash(tuple(keys[start:end])) for start, end in bounds]
+    return _Blocks(instructions, keys, [*starts, len(instructions)], hashes)
+
+
+def _diff_span(
+        blocks_a: _Blocks,
+        span_a: slice,
+        blocks_b: _Blocks,
+        span_b: slice,
+) -> list[InstructionChange]:
+    """Changes between the instructions of `span_a` and `span_b`, blocks that didn't line up."""
+    instructions_a, instructions_b = blocks_a.instructions[span_a], blocks_b.instructions[span_b]
+    matcher = SequenceMatcher(None, blocks_a.keys[span_a], blocks_b.keys[span_b], autojunk=False)
+
+    return [
+        InstructionChange(change, instructions_a[start_a:end_a], instructions_b[start_b:end_b])
+        for change, start_a, end_a, start_b, end_b in matcher.get_opcodes()
+        if change != 'equal'
+    ]
+
+
+def _diff_instructions(code_a: CodeType, code_b: CodeType) -> list[InstructionChange]:
+    blocks_a, blocks_b = _blocks(code_a), _blocks(code_b)
+    bounds_a, bounds_b = blocks_a.bounds, blocks_b.bounds
+
+    changes = []
+    matcher = SequenceMatcher(None, blocks_a.hashes, blocks_b.hashes, autojunk=False)
+    for tag, low_a, high_a, low_b, high_b in matcher.get_opcodes():
+        if tag != 'equal':
+            changes.extend(_diff_span(
+                blocks_a, slice(bounds_a[low_a], bounds_a[high_a]),
+                blocks_b, slice(bounds_b[low_b], bounds_b[high_b]),
+            ))
+
+    return changes
+
+
+def _nested(code: CodeType) -> dict[str, CodeType]:
+    nested: dict[str, CodeType] = {}
+    seen: dict[str, int] = {}
+    for const in code.co_consts:
+        if const.__class__ is CodeType:
+            index = seen[const.co_name] = seen.get(const.co_name, -1) + 1
+            nested[const.co_name if not index else f'{const.co_name}#{index}'] = const
+
+    return nested
+
+
+def diff_code(code_a: CodeType, code_b: CodeType) -> CodeDiff:
+    """Instruction level differences between `code_a` and `code_b` and their nested code objects."""
+    result = CodeDiff(code_a.co_name)
+    if identical(code_a, code_b):
+        return result
+
+    getter = operator.attrgetter(*FIELDS)
+    result.fields = {
+        name: (value_a, value_b)
+        for name, value_a, value_b in zip(FIELDS, getter(code_a), getter(code_b))
+        if value_a != value_b
+    }
+
+    consts_a = [_const_key(const) for const in code_a.co_consts]
+    consts_b = [_const_key(const) for const in code_b.co_consts]
+    if code_a.co_code != code_b.co_code or consts_a != consts_b:
+        result.instructions = _diff_instructions(code_a, code_b)
+
+    nested_b = _nested(code_b)
+    for name, nested_a in _nested(code_a).items():
+        if name in nested_b:
+            nested = diff_code(nested_a, nested_b[name])
+            if nested:
+                result.nested[name] = nested
+
+    return result
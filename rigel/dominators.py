@@ -0,0 +1,192 @@
+"""
+Dominator tree and loop nesting forest of a `ControlFlowGraph`.
+
+Dominators are computed with the iterative algorithm of Cooper, Harvey and
+Kennedy over reverse postorder, which settles in two or three passes on the
+graphs Python compiles to. Natural loops are found from the back edges, the
+edges going to a block that dominates their source, and nested by
+containment. Both are cached on the graph with `ControlFlowGraph.analysis`
+and computed again after blocks or edges change.
+
+    https://www.cs.rice.edu/~keith/EMBED/dom.pdf
+"""
+from dataclasses import dataclass, field
+
+from rigel.cfg import Block, ControlFlowGraph
+
+
+def reverse_postorder(cfg: ControlFlowGraph) -> list[Block]:
+    """Blocks reachable from the start block, each before its successors except along back edges."""
+    postorder = []
+    visited = {cfg.start_block}
+    stack = [(cfg.start_block, iter(cfg.start_block.next))]
+    while stack:
+        block, children = stack[-1]
+        for child in children:
+            if child not in visited and child.graph is cfg:
+                visited.add(child)
+                stack.append((child, iter(child.next)))
+                break
+        else:
+            stack.pop()
+            postorder.append(block)
+
+    postorder.reverse()
+    return postorder
+
+
+class DominatorTree:
+    """
+    Immediate dominators of the blocks reachable from the start block.
+
+    `dominates` compares the entry and exit numbers of both blocks in a walk
+    of the tree, so it is constant time. Unreachable blocks have no dominator
+    and dominate nothing.
+    """
+    def __init__(self, cfg: ControlFlowGraph):
+        self.order = cfg.analysis(reverse_postorder)
+        index = {block: position for position, block in enumerate(self.order)}
+        predecessors = [
+            sorted(index[predecessor] for predecessor in block.prev if predecessor in index)
+            for block in self.order
+        ]
+
+        idoms = [0] + [-1] * (len(self.order) - 1)
+        changed = True
+        while changed:
+            changed = False
+            for position in range(1, len(self.order)):
+                new = -1
+                for predecessor in predecessors[position]:
+                    if idoms[predecessor] == -1:
+                        continue
+
+                    if new == -1:
+                        new = predecessor
+                        continue
+
+                    while new != predecessor:
+                        while new > predecessor:
+                            new = idoms[new]
+                        while predecessor > new:
+                            predecessor = idoms[predecessor]
+
+                if idoms[position] != new:
+                    idoms[position] = new
+                    changed = True
+
+        self._idom = {
+            block: self.order[idoms[position]]
+            for position, block in enumerate(self.order) if position
+        }
+        self._children: dict[Block, list[Block]] = {block: [] for block in self.order}
+        for block, idom in self._idom.items():
+            self._children[idom].append(block)
+
+        self._enter: dict[Block, int] = {}
+        self._exit: dict[Block, int] = {}
+        clock = 0
+        stack = [(cfg.start_block, False)] if self.order else []
+        while stack:
+            block, done = stack.pop()
+            clock += 1
+            if done:
+                self._exit[block] = clock
+                continue
+
+            self._enter[block] = clock
+            stack.append((block, True))
+            stack.extend((child, False) for child in reversed(self._children[block]))
+
+    def __contains__(self, block: Block) -> bool:
+        return block in self._enter
+
+    def idom(self, block: Block) -> Block | None:
+        """Immediate dominator of `block`, `None` for the start block and unreachable blocks."""
+        return self._idom.get(block)
+
+    def children(self, block: Block) -> list[Block]:
+        """Blocks `block` is the immediate dominator of."""
+        return self._children.get(block, [])
+
+    def dominates(self, dominator: Block, block: Block) -> bool:
+        """Whether every path from the start to `block` passes `dominator`, which may be `block`."""
+        if dominator not in self._enter or block not in self._enter:
+            return False
+
+        return (
+            self._enter[dominator] <= self._enter[block]
+            and self._exit[block] <= self._exit[dominator]
+        )
+
+
+@dataclass(eq=False)
+class Loop:
+    """Natural loop of `header`, the blocks of loops nested in it included."""
+    header: Block
+    blocks: set[Block]
+    parent: 'Loop | None' = None
+    children: list['Loop'] = field(default_factory=list)
+    depth: int = 1
+
+
+class LoopForest:
+    """
+    Natural loops of a graph nested by containment.
+
+    Back edges with the same header make one loop. Cycles entered at more
+    than one block (irreducible control flow, which the Python compiler
+    doesn't produce) have no back edge and aren't loops here. `loop`, `depth`
+    and `is_header` are dictionary lookups.
+    """
+    def __init__(self, cfg: ControlFlowGraph):
+        dominators = dominator_tree(cfg)
+
+        bodies: dict[Block, set[Block]] = {}
+        for block in dominators.order:
+            for successor in block.next:
+                if dominators.dominates(successor, block):
+                    body = bodies.setdefault(successor, {successor})
+                    todo = [block]
+                    while todo:
+                        member = todo.pop()
+                        if member not in body and member in dominators:
+                            body.add(member)
+                            todo.extend(member.prev)
+
+        self.loops: list[Loop] = []
+        self.roots: list[Loop] = []
+        self._innermost: dict[Block, Loop] = {}
+
+        for header, body in sorted(bodies.items(), key=lambda item: -len(item[1])):
+            parent = self._innermost.get(header)
+            loop = Loop(header, body, parent, depth=parent.depth + 1 if parent else 1)
+            (parent.children if parent else self.roots).append(loop)
+            self.loops.append(loop)
+
+            for block in body:
+                self._innermost[block] = loop
+
+    def loop(self, block: Block) -> Loop | None:
+        """Innermost loop containing `block`."""
+        return self._innermost.get(block)
+
+    def depth(self, block: Block) -> int:
+        """Number of loops containing `block`, zero outside loops."""
+        loop = self._innermost.get(block)
+        return loop.depth if loop else 0
+
+    def in_loop(self, block: Block) -> bool:
+        return block in self._innermost
+
+    def is_header(self, block: Block) -> bool:
+        loop = self._innermost.get(block)
+        return loop is not None and loop.header is block
+
+
+def dominator_tree(cfg: ControlFlowGraph) -> DominatorTree:
+    return cfg.analysis(DominatorTree)
+
+
+def loop_forest(cfg: ControlFlowGraph) -> LoopForest:
+    return cfg.analysis(LoopForest)
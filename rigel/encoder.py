@@ -0,0 +1,283 @@
+"""
+Block by block encoding of a `ControlFlowGraph` that survives edits.
+
+Every block keeps its encoded body (the instructions before its terminal
+jump), its line runs with the middle of its line table already encoded, and a
+stack summary. After an edit only dirty blocks are encoded again; what is left
+is sizing the jumps, patching their arguments and the block offsets, and
+splicing the cached pieces together, a few operations per block.
+"""
+from dataclasses import dataclass
+
+from rigel.assembler import encode_instruction, relax_jumps, width
+from rigel.cfg import Block, ControlFlowGraph, entry_stack_depth, has_target
+from rigel.exceptions import AssemblerError
+from rigel.lnotab import emit_line_run
+from rigel.stack import JUMP_STACK_EFFECTS, STACK_EFFECTS
+
+
+@dataclass
+class EncodedBlock:  # pylint: disable=too-many-instance-attributes
+    """Encoding of a block body, everything but its terminal jump, and what the layout needs."""
+    code: bytes
+    runs: list[tuple[int, int | None]]
+    middle: bytes | None
+    effect: int
+    peak: int
+    final: bool
+    target: Block | None
+    taken: int = 0
+    fallen: int = 0
+    relative: bool = False
+    entry: int = 0
+    last: int = 0
+
+    @property
+    def units(self) -> int:
+        return len(self.code) // 2
+
+    def summary(self) -> tuple:
+        """Everything the stack size depends on."""
+        return self.effect, self.peak, self.final, self.target, self.taken, self.fallen, self.entry
+
+
+def _effect(effects, instruction) -> int:
+    effect = effects[instruction.opcode]
+    return effect if effect.__class__ is int else effect(instruction.arg)
+
+
+def _middle(runs: list[tuple[int, int | None]]) -> tuple[bytes | None, int]:
+    """
+    Line table entries of the runs between the first and the last one, and their last line.
+
+    They are relative to the line before the block when it starts without one, so those
+    blocks get `None` and have their runs written one by one.
+    """
+    if not runs or runs[0][1] is None:
+        return None, 0
+
+    table = bytearray()
+    last = runs[0][1]
+    for length, line in runs[1:-1]:
+        last = emit_line_run(table, length, line, last)
+
+    return bytes(table), last
+
+
+def encode_block(block: Block) -> EncodedBlock:
+    body = block.instructions
+    if block.target is not None:
+        if not body or not has_target(body[-1].__class__):
+            raise AssemblerError(f'{block!r} has a target but does not end with a jump')
+        body = body[:-1]
+    elif body and has_target(body[-1].__class__):
+        raise AssemblerError(f'{block!r} ends with a jump but has no target')
+
+    widths = [width(instruction.arg) for instruction in body]
+    code = bytearray(2 * sum(widths))
+    runs: list[tuple[int, int | None]] = []
+    position = effect = peak = 0
+
+    for instruction, units in zip(body, widths):
+        position = encode_instruction(code, position, instruction.opcode, instruction.arg, units)
+
+        if runs and runs[-1][1] == instruction.starts_line:
+            runs[-1] = (runs[-1][0] + 2 * units, instruction.starts_line)
+        else:
+            runs.append((2 * units, instruction.starts_line))
+
+        effect += _effect(STACK_EFFECTS, instruction)
+        peak = max(peak, effect)
+
+    middle, last = _middle(runs)
+    encoded = EncodedBlock(bytes(code), runs, middle, effect, peak, block.is_final(), block.target)
+    encoded.entry = entry_stack_depth(block.instructions)
+    encoded.last = last
+    if block.target is not None:
+        jump = block.instructions[-1]
+        encoded.taken = _effect(JUMP_STACK_EFFECTS, jump)
+        encoded.fallen = _effect(STACK_EFFECTS, jump)
+        encoded.relative = bool(jump.has_jrel)
+
+    return encoded
+
+
+class _LineTableWriter:
+    """Line table written run by run, a run on the line of the one before extends it."""
+    def __init__(self, firstlineno: int):
+        self.table = bytearray()
+        self.previous = firstlineno
+        self.length = 0
+        self.line: int | None = None
+
+    def add(self, length: int, line: int | None) -> None:
+        if line != self.line:
+            self.flush()
+            self.line = line
+        self.length += length
+
+    def flush(self) -> None:
+        if self.length:
+            self.previous = emit_line_run(self.table, self.length, self.line, self.previous)
+            self.length = 0
+
+    def splice(self, middle: bytes, last: int) -> None:
+        """Append the entries encoded by `encode_block`, `last` is the last line they have."""
+        self.flush()
+        self.table += middle
+        self.previous = last
+
+
+class IncrementalEncoder:
+    """
+    Encodes `cfg` into `co_code`, its line table and stack size.
+
+    Blocks are encoded again when they are dirty (see `Block.mark_dirty`).
+    Jump widths are relaxed like `assemble` does, starting from the previous
+    widths when no block got smaller, and every block gets its `offset`. The
+    stack size is only recomputed when the layout or the stack summary of a
+    block changed.
+    """
+    def __init__(self, cfg: ControlFlowGraph):
+        self.cfg = cfg
+
+        self._encoded: dict[Block, EncodedBlock] = {}
+        self._blocks: list[Block] = []
+        self._widths: list[int] = []
+        self._stack_size = 0
+
+    def encode(self, firstlineno: int) -> tuple[bytes, bytes, int]:
+        """`co_code`, `co_lnotab` and `co_stacksize`."""
+        blocks = self.cfg.blocks
+        relayout = blocks != self._blocks
+        shrunk = stack_changed = relayout
+
+        encoded = []
+        for block in blocks:
+            body = self._encoded.get(block)
+            if block.dirty or body is None:
+                new = self._encoded[block] = encode_block(block)
+                block.dirty = False
+
+                if body is None or new.units < body.units:
+                    shrunk = True
+                if body is None or new.summary() != body.summary():
+                    stack_changed = True
+
+                body = new
+
+            encoded.append(body)
+
+        if relayout:
+            self._blocks = list(blocks)
+            self._encoded = dict(zip(blocks, encoded))
+
+        widths = self._layout(blocks, encoded, None if shrunk else self._widths)
+        self._widths = widths
+
+        code = bytearray(sum(map(len, (body.code for body in encoded))) + 2 * sum(widths))
+        for block, body, units in zip(blocks, encoded, widths):
+            end = block.offset + len(body.code)
+            code[block.offset:end] = body.code
+            if units:
+                jump = block.instructions[-1]
+                encode_instruction(code, end, jump.opcode, jump.arg, units)
+
+        if stack_changed:
+            self._stack_size = self._calculate_stack_size(blocks, encoded)
+
+        return bytes(code), self._lnotab(blocks, encoded, widths, firstlineno), self._stack_size
+
+    @staticmethod
+    def _layout(
+            blocks: list[Block],
+            encoded: list[EncodedBlock],
+            widths: list[int] | None,
+    ) -> list[int]:
+        """
+        Terminal jump width of every block in code units, zero for blocks without one.
+
+        Relaxed by `relax_jumps`, shared with `assemble`.
+        """
+        positions = {block: position for position, block in enumerate(blocks)}
+        jumps = [
+            (position, block.instructions[-1], positions[body.target], body.relative)
+            for position, (block, body) in enumerate(zip(blocks, encoded))
+            if body.target is not None
+        ]
+
+        if widths is None:
+            widths = [int(block.target is not None) for block in blocks]
+        else:
+            widths = list(widths)
+
+        starts = relax_jumps(widths, jumps, [body.units for body in encoded])
+
+        for block, start in zip(blocks, starts):
+            block.offset = 2 * start
+
+        for position, jump, target, _ in jumps:
+            jump.argval = 2 * starts[target]
+
+        return widths
+
+    @staticmethod
+    def _lnotab(
+            blocks: list[Block],
+            encoded: list[EncodedBlock],
+            widths: list[int],
+            firstlineno: int,
+    ) -> bytes:
+        writer = _LineTableWriter(firstlineno)
+        for block, body, units in zip(blocks, encoded, widths):
+            runs = body.runs
+            if runs:
+                writer.add(*runs[0])
+                if len(runs) > 1:
+                    if body.middle is None:
+                        for run in runs[1:-1]:
+                            writer.add(*run)
+                    else:
+                        writer.splice(body.middle, body.last)
+                    writer.add(*runs[-1])
+
+            if units:
+                writer.add(2 * units, block.instructions[-1].starts_line)
+
+        writer.flush()
+        return bytes(writer.table)
+
+    @staticmethod
+    def _calculate_stack_size(blocks: list[Block], encoded: list[EncodedBlock]) -> int:
+        """Block level version of `calculate_stack_size`, visiting blocks in the same order."""
+        if not blocks:
+            return 0
+
+        summaries = dict(zip(blocks, encoded))
+        following = dict(zip(blocks, blocks[1:]))
+        depths: dict[Block, int] = {}
+
+        maxsize = 0
+        todo: list[tuple[Block | None, int]] = [(blocks[0], encoded[0].entry)]
+        while todo:
+            block, size = todo.pop()
+
+            while block is not None and block not in depths:
+                depths[block] = size
+                body = summaries[block]
+                maxsize = max(maxsize, size + body.peak)
+                size += body.effect
+
+                if body.target is not None:
+                    maxsize = max(maxsize, size + body.taken)
+                    todo.append((body.target, size + body.taken))
+
+                    size += body.fallen
+                    maxsize = max(maxsize, size)
+
+                if body.final:
+                    break
+
+                block = following.get(block)
+
+        return maxsize
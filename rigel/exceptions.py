@@ -4,3 +4,11 @@ class RigelError(Exception):
 
 class UnknownInstructionError(RigelError):
     """"""
+
+
+class PycError(RigelError):
+    """Malformed `.pyc` file."""
+
+
+class AssemblerError(RigelError):
+    """Instruction stream that can't be encoded."""
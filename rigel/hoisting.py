@@ -0,0 +1,318 @@
+"""
+Loop-invariant hoisting of global and attribute lookups out of `for` loops.
+
+A load is hoisted when nothing in the loop stores to what it reads: a
+`LOAD_GLOBAL` is loaded once before the loop into a new local slot, and
+every use in the loop becomes a `LOAD_FAST` of that slot. The new locals are
+named after what they hold with a leading dot (`.len`, `.self.items.append`),
+so they can't clash with names from source.
+
+Whether a load can change without a store in the loop depends on code the
+loop calls, which rigel can't see. `Assumption` names what is taken for
+granted, pick the weakest one the code satisfies:
+
+`Assumption.GLOBALS` hoists `LOAD_GLOBAL`. It assumes that nothing called
+from the loop rebinds those globals or builtins, and that they are bound
+when the loop starts, a missing name raises `NameError` before the first
+iteration even if the loop runs zero times.
+
+`Assumption.ATTRIBUTES` also hoists attribute chains rooted at a global or
+at a local that isn't stored in the loop, `self.items` or `math.sqrt`. A
+`LOAD_METHOD` at the end of the chain is hoisted as a bound method and its
+`CALL_METHOD` becomes a `CALL_FUNCTION`. On top of `GLOBALS` it assumes
+that attribute lookups have no side effects and that the objects of the
+chain aren't changed by anything the loop calls. Chains whose attributes are
+stored or deleted anywhere in the loop, on any object, are left alone.
+
+An attribute chain is only hoisted when it is looked up on every iteration
+that goes on to the next one, from a block that dominates every back edge of
+the loop, so a lookup behind a condition (`if item is not None: item.value`)
+stays in the loop. It is still looked up before the first iteration, an
+attribute that is missing there raises `AttributeError` even if the loop
+runs zero times or leaves before reaching the lookup.
+
+Only functions are transformed, their locals are fast slots. Loops that
+yield or await are left alone, the caller could change what they load
+before the loop resumes.
+"""
+from copy import copy
+from enum import Enum
+from types import CodeType
+from typing import Hashable, NamedTuple
+
+from rigel.cfg import Block, For, LeaderCFGBuilder
+from rigel.code import Code
+from rigel.dominators import DominatorTree, dominator_tree, loop_forest
+from rigel.instruction import BaseInstruction, make_instruction
+from rigel.optimizer import linearize
+from rigel.stack import STACK_EFFECTS
+from rigel.utils import CompilerFlags
+
+
+class Assumption(Enum):
+    GLOBALS = 'globals'
+    ATTRIBUTES = 'attributes'
+
+
+_STORES = {
+    'STORE_GLOBAL': 'global',
+    'DELETE_GLOBAL': 'global',
+    'STORE_FAST': 'fast',
+    'DELETE_FAST': 'fast',
+}
+_SUSPENDS = {'YIELD_VALUE', 'YIELD_FROM'}
+
+
+class Chain(NamedTuple):
+    """Instructions `start:end` of a block loading `key`, `call` is where its `CALL_METHOD` is."""
+    start: int
+    end: int
+    key: tuple[Hashable, ...]
+    call: int | None
+
+
+def _matching_call(instructions: list[BaseInstruction], position: int) -> int | None:
+    """Position of the `CALL_METHOD` using the `LOAD_METHOD` at `position`, in the same block."""
+    depth = 0
+    for index in range(position + 1, len(instructions)):
+        instruction = instructions[index]
+        if instruction.opname == 'CALL_METHOD' and depth == instruction.arg:
+            return index
+
+        effect = STACK_EFFECTS[instruction.opcode]
+        depth += effect if effect.__class__ is int else effect(instruction.arg)
+        if depth < 0:
+            return None
+
+    return None
+
+
+def chains(block: Block, assumption: Assumption) -> list[Chain]:
+    """Loads in `block` that could be hoisted under `assumption`, invariant or not."""
+    instructions = block.instructions
+    attributes = assumption is Assumption.ATTRIBUTES
+    found = []
+
+    position = 0
+    while position < len(instructions):
+        instruction = instructions[position]
+        key: tuple[Hashable, ...]
+        if instruction.opname == 'LOAD_GLOBAL':
+            key = ('global', instruction.argval)
+        elif instruction.opname == 'LOAD_FAST' and attributes:
+            key = ('fast', instruction.argval)
+        else:
+            position += 1
+            continue
+
+        end = position + 1
+        while attributes and end < len(instructions) and instructions[end].opname == 'LOAD_ATTR':
+            key += (instructions[end].argval,)
+            end += 1
+
+        call = None
+        if attributes and end < len(instructions) and instructions[end].opname == 'LOAD_METHOD':
+            call = _matching_call(instructions, end)
+            if call is not None:
+                key += (instructions[end].argval,)
+                end += 1
+
+        if len(key) > 2 or key[0] == 'global':
+            found.append(Chain(position, end, key, call))
+
+        position = end
+
+    return found
+
+
+def _stored(blocks: set[Block]) -> tuple[set[tuple[str, str]], set[str]]:
+    """Variables and attribute names stored or deleted in `blocks`."""
+    variables, attributes = set(), set()
+    for block in blocks:
+        for instruction in block:
+            if instruction.opname in _STORES:
+                variables.add((_STORES[instruction.opname], instruction.argval))
+            elif instruction.opname in ('STORE_ATTR', 'DELETE_ATTR'):
+                attributes.add(instruction.argval)
+
+    return variables, attributes
+
+
+def _local_name(key: tuple[Hashable, ...]) -> str:
+    return '.' + '.'.join(map(str, key[1:]))
+
+
+class _Hoister:
+    def __init__(
+            self,
+            code: Code,
+            assumption: Assumption,
+            layout: list[Block],
+            dominators: DominatorTree,
+    ):
+        self.assumption = assumption
+        self.varnames = list(code.varnames)
+        self.layout = layout
+        self.dominators = dominators
+
+    def slot(self, name: str) -> int:
+        if name not in self.varnames:
+            self.varnames.append(name)
+
+        return self.varnames.index(name)
+
+    def hoist(self, header: Block, body: set[Block]) -> bool:
+        entries = [predecessor for predecessor in header.prev if predecessor not in body]
+        if (
+                any(instruction.opname in _SUSPENDS for block in body for instruction in block)
+                or any(entry.target not in (None, header) for entry in entries)
+        ):
+            return False
+
+        found, sources = self._candidates(header, body)
+        if not sources:
+            return False
+
+        for block, block_chains in found.items():
+            if block_chains:
+                self._rewrite(block, block_chains)
+
+        preheader = self._preheader(header.instructions[0].starts_line, sources)
+        for predecessor in entries:
+            instructions = [copy(instruction) for instruction in preheader]
+            if predecessor.target is header:
+                predecessor.instructions[-1:-1] = instructions
+            else:
+                predecessor.instructions.extend(instructions)
+            predecessor.mark_dirty()
+
+        return True
+
+    def _candidates(
+            self,
+            header: Block,
+            body: set[Block],
+    ) -> tuple[dict[Block, list[Chain]], dict[tuple, list[BaseInstruction]]]:
+        """
+        Invariant chains of the loop by block, and the loads each hoisted key
+        is computed with in the preheader.
+
+        A key is hoisted when it's a bare global or when a block that runs on
+        every iteration looks it up, every chain loading a hoisted key is
+        rewritten.
+        """
+        variables, attributes = _stored(body)
+        latches = [block for block in header.prev if block in body]
+
+        candidates: dict[Block, list[Chain]] = {}
+        sources: dict[tuple, list[BaseInstruction]] = {}
+        for block in self.layout:
+            if block not in body:
+                continue
+
+            every_iteration = all(self.dominators.dominates(block, latch) for latch in latches)
+            for chain in chains(block, self.assumption):
+                if chain.key[:2] in variables or attributes.intersection(chain.key[2:]):
+                    continue
+
+                candidates.setdefault(block, []).append(chain)
+                if every_iteration or len(chain.key) == 2:
+                    sources.setdefault(chain.key, block.instructions[chain.start:chain.end])
+
+        found = {
+            block: [chain for chain in block_chains if chain.key in sources]
+            for block, block_chains in candidates.items()
+        }
+        return found, sources
+
+    def _preheader(
+            self,
+            line: int | None,
+            sources: dict[tuple, list[BaseInstruction]],
+    ) -> list[BaseInstruction]:
+        """Instructions storing every hoisted key in its local, attributed to `line`."""
+        preheader = []
+        for key, loads in sources.items():
+            for instruction in loads:
+                instruction = (
+                    make_instruction('LOAD_ATTR', instruction.arg, instruction.argval)
+                    if instruction.opname == 'LOAD_METHOD' else copy(instruction)
+                )
+                instruction.starts_line = line
+                preheader.append(instruction)
+
+            name = _local_name(key)
+            preheader.append(
+                make_instruction('STORE_FAST', self.slot(name), name, starts_line=line),
+            )
+
+        return preheader
+
+    def _rewrite(self, block: Block, block_chains: list[Chain]) -> None:
+        starts = {chain.start: chain for chain in block_chains}
+        calls = {chain.call for chain in block_chains if chain.call is not None}
+
+        instructions = []
+        position = 0
+        old = block.instructions
+        while position < len(old):
+            instruction = old[position]
+            if position in starts:
+                chain = starts[position]
+                name = _local_name(chain.key)
+                following = old[chain.end] if chain.end < len(old) else None
+                if (
+                        following is not None
+                        and following.opname == 'STORE_FAST'
+                        and following.argval == name
+                ):
+                    # Hoisted out of an inner loop already, the outer preheader stores it now.
+                    position = chain.end + 1
+                    continue
+
+                instructions.append(make_instruction(
+                    'LOAD_FAST', self.slot(name), name,
+                    offset=instruction.offset, starts_line=instruction.starts_line,
+                ))
+                position = chain.end
+                continue
+
+            if position in calls:
+                instruction = make_instruction(
+                    'CALL_FUNCTION', instruction.arg, instruction.argval,
+                    offset=instruction.offset, starts_line=instruction.starts_line,
+                )
+
+            instructions.append(instruction)
+            position += 1
+
+        block.instructions = instructions
+
+
+def hoist_invariants(code: Code, assumption: Assumption = Assumption.GLOBALS) -> Code:
+    """Hoist invariant loads out of the `for` loops of `code`, innermost first, see the module."""
+    if not code.flags & CompilerFlags.CO_OPTIMIZED:
+        return code
+
+    instructions = [copy(instruction) for instruction in code.instructions]
+    cfg = LeaderCFGBuilder().build(instructions)
+    loops = sorted(
+        (loop for loop in loop_forest(cfg).loops if isinstance(loop.header, For)),
+        key=lambda loop: -loop.depth,
+    )
+
+    hoister = _Hoister(code, assumption, cfg.blocks, dominator_tree(cfg))
+    changed = False
+    for loop in loops:
+        changed = hoister.hoist(loop.header, loop.blocks) or changed
+
+    if not changed:
+        return code
+
+    return code.replace(
+        linearize(cfg), co_varnames=tuple(hoister.varnames), co_nlocals=len(hoister.varnames),
+    )
+
+
+def hoist_code(code: CodeType, assumption: Assumption = Assumption.GLOBALS) -> CodeType:
+    return hoist_invariants(Code.from_code(code), assumption).code_object()
@@ -1,8 +1,8 @@
 import dis
 from enum import IntFlag
-from typing import Final, Iterable, NamedTuple
+from typing import Any, Final, Iterable, NamedTuple
 
-import opcode
+from rigel.stack import stack_effect
 
 
 UNCONDITIONAL_JUMP_INSTRUCTIONS: Final = frozenset({
@@ -79,23 +79,21 @@ class IProperties:
 
 
 class MetaInstruction(type):
+    """Gives the root instruction class the `IProperties`, subclasses inherit them."""
     def __new__(cls, *args, **kwargs):
-        name, base, variables = args
+        name, bases, variables = args
 
-        return type.__new__(
-            cls,
-            name,
-            base,
-            {
+        if not any(isinstance(base, MetaInstruction) for base in bases):
+            variables = {
                 **variables,
                 **{
                     key: value
                     for key, value in IProperties.__dict__.items()
                     if not key.startswith('__')
                 },
-            },
-            **kwargs
-        )
+            }
+
+        return type.__new__(cls, name, bases, variables, **kwargs)
 
 
 class BaseInstruction(metaclass=MetaInstruction):  # pylint: disable=too-many-instance-attributes
@@ -120,16 +118,14 @@ class BaseInstruction(metaclass=MetaInstruction):  # pylint: disable=too-many-in
         return dis.stack_effect(self.opcode, self.oparg)
 
     def _stack_effect(self, jump: bool | None = None) -> int:
-        if self.opcode < opcode.HAVE_ARGUMENT:
-            arg = None
-        elif self.opname == 'LOAD_GLOBAL' and isinstance(self.arg, tuple):
-            arg = self.arg[0]
-        elif not isinstance(self.arg, int) or self.opcode in opcode.hasconst:
-            arg = 0
-        else:
-            arg = self.arg
+        arg = self.arg if isinstance(self.arg, int) else 0
+        if jump is None:
+            return max(
+                stack_effect(self.opcode, arg, jump=False),
+                stack_effect(self.opcode, arg, jump=True),
+            )
 
-        return dis.stack_effect(self.opcode, arg, jump=jump)
+        return stack_effect(self.opcode, arg, jump=jump)
 
     def stack_effect(self, jump: bool | None = None) -> tuple[int, int]:
         if self.opname in STATIC_STACK_EFFECTS:
@@ -244,21 +240,203 @@ class InplaceAdd(BaseInstruction):
     pass
 
 
-PYTHON_OPCODE_INSTRUCTION_MAP = {
+class BinaryOp(BaseInstruction):
+    pass
+
+
+class BinaryPower(BinaryOp):
+    pass
+
+
+class BinaryMultiply(BinaryOp):
+    pass
+
+
+class BinaryModulo(BinaryOp):
+    pass
+
+
+class BinaryAdd(BinaryOp):
+    pass
+
+
+class BinarySubtract(BinaryOp):
+    pass
+
+
+class BinarySubscr(BinaryOp):
+    pass
+
+
+class BinaryFloorDivide(BinaryOp):
+    pass
+
+
+class BinaryTrueDivide(BinaryOp):
+    pass
+
+
+class BinaryLshift(BinaryOp):
+    pass
+
+
+class BinaryRshift(BinaryOp):
+    pass
+
+
+class BinaryAnd(BinaryOp):
+    pass
+
+
+class BinaryXor(BinaryOp):
+    pass
+
+
+class BinaryOr(BinaryOp):
+    pass
+
+
+class LoadFast(WithArgument):
+    FLAG = IFlag.HAS_LOCAL | IFlag.HAS_ARGUMENT
+
+
+class StoreFast(WithArgument):
+    FLAG = IFlag.HAS_LOCAL | IFlag.HAS_ARGUMENT
+
+
+class LoadGlobal(WithArgument):
+    FLAG = IFlag.HAS_NAME | IFlag.HAS_ARGUMENT
+
+
+class LoadBuildClass(BaseInstruction):
+    pass
+
+
+class BuildList(WithArgument):
+    FLAG = IFlag.HAS_NARGS | IFlag.HAS_ARGUMENT
+
+
+class ListAppend(WithArgument):
+    FLAG = IFlag.HAS_ARGUMENT
+
+
+class JumpForward(WithArgument):
+    FLAG = IFlag.HAS_JREL | IFlag.HAS_ARGUMENT | IFlag.NO_NEXT
+
+
+def _flag(opcode_: int) -> IFlag:
+    """Flags of `opcode_` from the tables of the `dis` module of the running Python."""
+    flag = IFlag.NONE
+    for table, bit in (
+            (dis.hasconst, IFlag.HAS_CONST),
+            (dis.hasname, IFlag.HAS_NAME),
+            (dis.hasjrel, IFlag.HAS_JREL),
+            (dis.hasjabs, IFlag.HAS_JABS),
+            (dis.haslocal, IFlag.HAS_LOCAL),
+            (dis.hasfree, IFlag.HAS_FREE),
+            (dis.hasnargs, IFlag.HAS_NARGS),
+    ):
+        if opcode_ in table:
+            flag |= bit
+
+    opname = dis.opname[opcode_]
+    if opcode_ >= dis.HAVE_ARGUMENT:
+        flag |= IFlag.HAS_ARGUMENT
+    if opname in FINAL_INSTRUCTIONS or opname in UNCONDITIONAL_JUMP_INSTRUCTIONS:
+        flag |= IFlag.NO_NEXT
+    if opname.startswith('SETUP_'):
+        flag |= IFlag.PUSHES_BLOCK
+    if opname == 'POP_BLOCK':
+        flag |= IFlag.POPS_BLOCK
+
+    return flag
+
+
+def _make_instruction_class(opcode_: int) -> type[BaseInstruction]:
+    opname = dis.opname[opcode_]
+    if opname.startswith('BINARY_'):
+        base = BinaryOp
+    elif opcode_ >= dis.HAVE_ARGUMENT:
+        base = WithArgument
+    else:
+        base = BaseInstruction
+
+    name = ''.join(part.capitalize() for part in opname.split('_'))
+    return MetaInstruction(name, (base,), {'FLAG': _flag(opcode_), '__module__': __name__})
+
+
+def _is_opcode(opcode_: int) -> bool:
+    return 0 <= opcode_ < len(dis.opname) and not dis.opname[opcode_].startswith('<')
+
+
+class InstructionClasses(dict):
+    """
+    Instruction class of every opcode of the running Python, by opcode.
+
+    Classes written out above are registered up front, the others are
+    generated from the `dis` tables the first time their opcode is looked up
+    and cached. Opcodes this Python doesn't have raise `KeyError`.
+    """
+    def __missing__(self, opcode_: int) -> type[BaseInstruction]:
+        if not isinstance(opcode_, int) or not _is_opcode(opcode_):
+            raise KeyError(opcode_)
+
+        return self.setdefault(opcode_, _make_instruction_class(opcode_))
+
+    def __contains__(self, opcode_) -> bool:
+        return super().__contains__(opcode_) or isinstance(opcode_, int) and _is_opcode(opcode_)
+
+    def get(self, opcode_, default=None):
+        try:
+            return self[opcode_]
+        except KeyError:
+            return default
+
+
+PYTHON_OPCODE_INSTRUCTION_MAP = InstructionClasses({
     1: PopTop,
+    19: BinaryPower,
+    20: BinaryMultiply,
+    22: BinaryModulo,
+    23: BinaryAdd,
+    24: BinarySubtract,
+    25: BinarySubscr,
+    26: BinaryFloorDivide,
+    27: BinaryTrueDivide,
     55: InplaceAdd,
+    62: BinaryLshift,
+    63: BinaryRshift,
+    64: BinaryAnd,
+    65: BinaryXor,
+    66: BinaryOr,
     68: GetIter,
+    71: LoadBuildClass,
     83: ReturnValue,
     90: StoreName,
     93: ForIter,
     100: LoadConst,
     101: LoadName,
+    103: BuildList,
     107: CompareOp,
+    110: JumpForward,
     113: JumpAbsolute,
     114: PopJumpIfFalse,
+    116: LoadGlobal,
+    124: LoadFast,
+    125: StoreFast,
     131: CallFunction,
     132: MakeFunction,
-}
+    145: ListAppend,
+})
+
+
+def __getattr__(name: str) -> type[BaseInstruction]:
+    """Generated instruction classes by name, `from rigel.instruction import LoadAttr`."""
+    for opcode_, opname in enumerate(dis.opname):
+        if _is_opcode(opcode_) and ''.join(part.capitalize() for part in opname.split('_')) == name:
+            return PYTHON_OPCODE_INSTRUCTION_MAP[opcode_]
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 class Positions(NamedTuple):
@@ -268,19 +446,57 @@ class Positions(NamedTuple):
     end_col_offset: int | None = ...
 
 
+def make_instruction(
+        opname: str,
+        arg: int | None = None,
+        argval: Any = None,
+        *,
+        offset: int = 0,
+        starts_line: int | None = 0,
+) -> BaseInstruction:
+    """Create a rigel instruction by name, `offset` and jump arguments are set when it's emitted."""
+    opcode_ = dis.opmap[opname]
+    return PYTHON_OPCODE_INSTRUCTION_MAP[opcode_](
+        opname=opname,
+        opcode_=opcode_,
+        arg=arg,
+        argval=argval,
+        argrepr='',
+        offset=offset,
+        starts_line=starts_line,
+        is_jump_target=False,
+    )
+
+
 def convert(instructions: list[dis.Instruction]) -> Iterable[BaseInstruction]:
-    line = 0
+    """
+    Rigel instructions of a `dis` listing.
+
+    `EXTENDED_ARG` prefixes are folded into the instruction they extend, which
+    takes their offset and is a jump target if they are, like `decoder.decode`
+    does. `arg` already holds the whole argument, a prefix left in front of it
+    would be encoded twice.
+    """
+    line: int | None = None
+    start = None
+    target = False
     for instruction in instructions:
         if instruction.starts_line is not None:
             line = instruction.starts_line
 
+        if instruction.opcode == dis.EXTENDED_ARG:
+            start = instruction.offset if start is None else start
+            target = target or instruction.is_jump_target
+            continue
+
         yield PYTHON_OPCODE_INSTRUCTION_MAP[instruction.opcode](
             opname=instruction.opname,
             opcode_=instruction.opcode,
             arg=instruction.arg,
             argval=instruction.argval,
             argrepr=instruction.argrepr,
-            offset=instruction.offset,
+            offset=instruction.offset if start is None else start,
             starts_line=line,
-            is_jump_target=instruction.is_jump_target,
+            is_jump_target=target or instruction.is_jump_target,
         )
+        start, target = None, False
@@ -0,0 +1,143 @@
+import hashlib
+import marshal
+import os
+import tempfile
+from importlib.util import MAGIC_NUMBER
+from types import CodeType
+from typing import Callable
+
+
+Transform = Callable[[CodeType], CodeType]
+
+DEFAULT_MAX_SIZE = 256 * 2 ** 20
+
+
+def default_cache_dir() -> str:
+    if directory := os.environ.get('RIGEL_CACHE_DIR'):
+        return directory
+
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'rigel')
+
+
+def transform_fingerprint(transform: Transform) -> str:
+    """
+    Identity of `transform` in cache keys.
+
+    A transform can expose a `fingerprint` attribute that changes whenever
+    its output does, otherwise its qualified name is used.
+    """
+    fingerprint = getattr(transform, 'fingerprint', None)
+    if fingerprint is not None:
+        return str(fingerprint)
+
+    qualname = getattr(transform, '__qualname__', transform.__class__.__qualname__)
+    return f'{transform.__module__}.{qualname}'
+
+
+class CodeCache:
+    """
+    Content-addressed on-disk store of transformed code objects.
+
+    Entries are marshalled code objects named by a hash of the module bytes,
+    its path, the interpreter magic number and the transform fingerprint. The
+    path is part of the key because it ends up in `co_filename`, modules
+    with the same bytes (empty `__init__.py` files) get entries of their own.
+
+    Entries live in their own directory, the regular `__pycache__` files are
+    left to the import system. Writers go through a temp file and a rename,
+    so concurrent processes never see partial entries. Reads refresh the
+    entry mtime and the least recently used entries are evicted once the
+    cache grows over `max_size` bytes.
+    """
+    def __init__(self, directory: str | None = None, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = directory or default_cache_dir()
+        self.max_size = max_size
+        self._size: int | None = None
+
+    @staticmethod
+    def key(data: bytes, path: str, transform: Transform) -> str:
+        digest = hashlib.blake2b(data, digest_size=20)
+        digest.update(os.fsencode(path))
+        digest.update(b'\0')
+        digest.update(MAGIC_NUMBER)
+        digest.update(transform_fingerprint(transform).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def get(self, key: str) -> CodeType | None:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fp:
+                data = fp.read()
+            os.utime(path)
+        except OSError:
+            return None
+
+        try:
+            return marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            self._remove(path)
+            return None
+
+    def put(self, key: str, code: CodeType) -> None:
+        path = self._path(key)
+        data = marshal.dumps(code)
+
+        try:
+            directory = os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as fp:
+                fp.write(data)
+            os.replace(fp.name, path)
+        except OSError:
+            return
+
+        if self._size is None:
+            self._size = self._disk_size()
+        else:
+            self._size += len(data)
+
+        if self._size > self.max_size:
+            self.evict()
+
+    def evict(self, target: float = 0.9) -> None:
+        """Remove the least recently used entries until the cache fits in `target * max_size`."""
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+
+        for _, entry_size, path in entries:
+            if size <= self.max_size * target:
+                break
+
+            if self._remove(path):
+                size -= entry_size
+
+        self._size = size
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        return entries
+
+    def _disk_size(self) -> int:
+        return sum(entry_size for _, entry_size, _ in self._entries())
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.unlink(path)
+        except OSError:
+            return False
+
+        return True
@@ -1,11 +1,16 @@
 import sys
 from importlib.abc import MetaPathFinder
 from importlib.machinery import ModuleSpec, PathFinder, SourceFileLoader, SourcelessFileLoader
-from types import ModuleType
+from types import CodeType, ModuleType
 from typing import Sequence
 
 from more_itertools import first_true
 
+from rigel.interning import Interner
+
+from .cache import CodeCache, Transform
+from .profiler import ImportProfiler
+
 
 class RigelLoader:
     loaders: list['RigelLoader'] = []
@@ -13,16 +18,73 @@ class RigelLoader:
     def __init_subclass__(cls, **kwargs) -> None:
         cls.loaders.append(cls)
 
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            fullname: str,
+            path: str,
+            *,
+            transform: Transform | None = None,
+            cache: CodeCache | None = None,
+            profiler: ImportProfiler | None = None,
+            interner: Interner | None = None,
+    ):
+        super().__init__(fullname, path)
+        self.transform = transform
+        self.cache = cache
+        self.profiler = profiler
+        self.interner = interner
+
     @classmethod
     def get_loader(cls):
         return cls.__mro__[2]
 
+    def get_code(self, fullname: str) -> CodeType | None:
+        if self.profiler is None:
+            return self._get_code(fullname)
+
+        start = self.profiler.now()
+        code = self._get_code(fullname)
+        self.profiler.loaded(fullname, start, self.profiler.now(), code)
+
+        return code
+
+    def exec_module(self, module: ModuleType) -> None:
+        if self.profiler is None:
+            return super().exec_module(module)
+
+        with self.profiler.executing(module.__name__):
+            return super().exec_module(module)
+
+    def _get_code(self, fullname: str) -> CodeType | None:
+        code = self._load_code(fullname)
+        if code is None or self.interner is None:
+            return code
+
+        return self.interner.intern_code(code)
+
+    def _load_code(self, fullname: str) -> CodeType | None:
+        if self.transform is None:
+            return super().get_code(fullname)
 
-class RigelSourceFileLoader(RigelLoader, SourcelessFileLoader):
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(self.get_data(self.path), self.path, self.transform)
+            if (code := self.cache.get(key)) is not None:
+                return code
+
+        code = self.transform(super().get_code(fullname))
+
+        if key is not None:
+            self.cache.put(key, code)
+
+        return code
+
+
+class RigelSourceFileLoader(RigelLoader, SourceFileLoader):
     ...
 
 
-class RigelSourcelessFileLoader(RigelLoader, SourceFileLoader):
+class RigelSourcelessFileLoader(RigelLoader, SourcelessFileLoader):
     ...
 
 
@@ -35,9 +97,21 @@ def rigel_loader(loader):
 
 
 class ImportHook:
+    def __init__(
+            self,
+            transform: Transform | None = None,
+            cache: CodeCache | None = None,
+            profile: bool = False,
+            interner: Interner | None = None,
+    ):
+        self.profiler = ImportProfiler() if profile else None
+        self.finder = RigelMetaPathFinder(
+            transform=transform, cache=cache, profiler=self.profiler, interner=interner,
+        )
+
     def __enter__(self) -> 'ImportHook':
         if first_true(sys.meta_path, pred=lambda _: isinstance(_, RigelMetaPathFinder)) is None:
-            sys.meta_path.insert(0, RigelMetaPathFinder())
+            sys.meta_path.insert(0, self.finder)
 
         return self
 
@@ -49,20 +123,67 @@ class ImportHook:
         ]
 
 
-def instrument_imports() -> ImportHook:
-    return ImportHook()
+def instrument_imports(
+        transform: Transform | None = None,
+        cache: CodeCache | None = None,
+        profile: bool = False,
+        interner: Interner | None = None,
+) -> ImportHook:
+    """
+    Route imports through rigel loaders.
+
+    `transform` rewrites the code object of every module found on the path,
+    with `cache` the rewritten code objects are reused across interpreter
+    runs as long as the module bytes and path, the Python version and the
+    transform fingerprint are unchanged. With `profile` the hook records find, load
+    and exec timings of every module in `ImportHook.profiler`. With
+    `interner` (usually `rigel.interning.process_interner()`) the code
+    objects and constants of every loaded module are shared with the modules
+    loaded before it.
+    """
+    return ImportHook(transform=transform, cache=cache, profile=profile, interner=interner)
 
 
 class RigelMetaPathFinder(MetaPathFinder):
+    def __init__(
+            self,
+            transform: Transform | None = None,
+            cache: CodeCache | None = None,
+            profiler: ImportProfiler | None = None,
+            interner: Interner | None = None,
+    ):
+        self.transform = transform
+        self.cache = cache
+        self.profiler = profiler
+        self.interner = interner
+
     def find_spec(
             self,
             fullname: str, path: Sequence[str] | None,
             target: ModuleType | None = ...
     ) -> ModuleSpec | None:
-        spec = PathFinder.find_spec(fullname, path, target)
+        if self.profiler is None:
+            spec = PathFinder.find_spec(fullname, path, target)
+        else:
+            start = self.profiler.now()
+            spec = PathFinder.find_spec(fullname, path, target)
+            if spec is not None:
+                self.profiler.found(fullname, start, self.profiler.now())
+
         if spec is None:
             return
 
-        spec.loader = rigel_loader(loader=spec.loader)(spec.loader.name, spec.loader.path)
+        loader_class = rigel_loader(loader=spec.loader)
+        if loader_class is None:
+            return spec
+
+        spec.loader = loader_class(
+            spec.loader.name,
+            spec.loader.path,
+            transform=self.transform,
+            cache=self.cache,
+            profiler=self.profiler,
+            interner=self.interner,
+        )
 
         return spec
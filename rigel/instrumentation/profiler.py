@@ -0,0 +1,163 @@
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import CodeType
+from typing import Any, Iterator, TextIO
+
+
+def bytecode_size(code: CodeType) -> int:
+    """Size of `co_code` of `code` and every code object nested in its constants."""
+    return len(code.co_code) + sum(
+        bytecode_size(const) for const in code.co_consts if isinstance(const, CodeType)
+    )
+
+
+@dataclass
+class ModuleRecord:  # pylint: disable=too-many-instance-attributes
+    """Timings of one import, in nanoseconds since the profiler started."""
+    name: str
+    parent: str | None
+    find_start: int = 0
+    find_ns: int = 0
+    load_start: int = 0
+    load_ns: int = 0
+    exec_start: int = 0
+    exec_ns: int = 0
+    bytecode_size: int = 0
+    children: list['ModuleRecord'] = field(default_factory=list)
+
+    @property
+    def total_ns(self) -> int:
+        return self.find_ns + self.load_ns + self.exec_ns
+
+    @property
+    def self_ns(self) -> int:
+        """Time spent in this module, imports it triggered excluded."""
+        return self.total_ns - sum(child.total_ns for child in self.children)
+
+
+class ImportProfiler:
+    """
+    Collects per-module find, load and exec timings from the import hook.
+
+    A module executing while another one is imported becomes its parent, so
+    the records form a tree rooted at the imports made outside of any module.
+    There is a record per import, a module imported again after leaving
+    `sys.modules` or reloaded gets a new one next to the earlier ones.
+    """
+    def __init__(self):
+        self.records: list[ModuleRecord] = []
+        self.roots: list[ModuleRecord] = []
+        self._latest: dict[str, ModuleRecord] = {}
+        self._stack: list[ModuleRecord] = []
+        self._origin = time.perf_counter_ns()
+
+    def now(self) -> int:
+        return time.perf_counter_ns() - self._origin
+
+    def found(self, fullname: str, start: int, end: int) -> None:
+        parent = self._stack[-1] if self._stack else None
+        record = ModuleRecord(
+            name=fullname,
+            parent=parent.name if parent else None,
+            find_start=start,
+            find_ns=end - start,
+        )
+
+        self.records.append(record)
+        self._latest[fullname] = record
+        (parent.children if parent else self.roots).append(record)
+
+    def loaded(self, fullname: str, start: int, end: int, code: CodeType | None) -> None:
+        if (record := self._latest.get(fullname)) is None:
+            return
+
+        record.load_start = start
+        record.load_ns = end - start
+        record.bytecode_size = bytecode_size(code) if code is not None else 0
+
+    @contextmanager
+    def executing(self, fullname: str) -> Iterator[None]:
+        if (record := self._latest.get(fullname)) is None:
+            yield
+            return
+
+        self._stack.append(record)
+        start = self.now()
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            end = self.now()
+
+            # `exec_module` fetches the code itself, that part is already accounted as load time.
+            if record.load_start >= start:
+                start = record.load_start + record.load_ns
+
+            record.exec_start = start
+            record.exec_ns = end - start
+
+    def top(self, limit: int = 10, key: str = 'self_ns') -> list[ModuleRecord]:
+        """The `limit` records with the largest `key`, `self_ns`, `total_ns`, `bytecode_size`..."""
+        return sorted(self.records, key=lambda record: getattr(record, key), reverse=True)[:limit]
+
+    def format_top(self, limit: int = 10, key: str = 'self_ns') -> str:
+        lines = [
+            f'{"self us":>10} | {"total us":>10} | {"find us":>8} | {"load us":>8} | '
+            f'{"bytecode":>9} | module'
+        ]
+        lines.extend(
+            f'{record.self_ns // 1000:>10} | {record.total_ns // 1000:>10} | '
+            f'{record.find_ns // 1000:>8} | {record.load_ns // 1000:>8} | '
+            f'{record.bytecode_size:>9} | {record.name}'
+            for record in self.top(limit, key)
+        )
+        return '\n'.join(lines)
+
+    def format_tree(self) -> str:
+        lines = [f'{"self us":>10} | {"total us":>10} | {"bytecode":>9} | module']
+
+        def walk(record: ModuleRecord, depth: int) -> None:
+            lines.append(
+                f'{record.self_ns // 1000:>10} | {record.total_ns // 1000:>10} | '
+                f'{record.bytecode_size:>9} | {"  " * depth}{record.name}'
+            )
+            for child in record.children:
+                walk(child, depth + 1)
+
+        for root in self.roots:
+            walk(root, 0)
+
+        return '\n'.join(lines)
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """Trace Event Format document, loadable in chrome://tracing and Perfetto."""
+        events = []
+        for record in self.records:
+            for phase, start, duration in (
+                    ('find', record.find_start, record.find_ns),
+                    ('load', record.load_start, record.load_ns),
+                    ('exec', record.exec_start, record.exec_ns),
+            ):
+                if not duration:
+                    continue
+
+                events.append({
+                    'name': record.name,
+                    'cat': phase,
+                    'ph': 'X',
+                    'ts': start / 1000,
+                    'dur': duration / 1000,
+                    'pid': 0,
+                    'tid': 0,
+                    'args': {'parent': record.parent, 'bytecode_size': record.bytecode_size},
+                })
+
+        return {
+            'traceEvents': sorted(events, key=lambda event: event['ts']),
+            'displayTimeUnit': 'ms',
+        }
+
+    def dump_chrome_trace(self, fp: TextIO) -> None:
+        json.dump(self.chrome_trace(), fp)
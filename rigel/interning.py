@@ -0,0 +1,150 @@
+"""
+Process wide interning of code objects and constants.
+
+Modules produced from the same generator share lots of byte-identical pieces:
+small lambdas, property getters, generated `__init__`s and constant tuples.
+`Interner` keys them structurally and hands out one instance for each, so a
+worker that loads the same modules many times keeps a single copy.
+"""
+import operator
+import sys
+from dataclasses import dataclass
+from functools import cache
+from types import CodeType
+from typing import Any, Hashable
+
+from rigel.pool import const_key
+
+
+_CONSTANT_TYPES = (str, bytes, int, float, complex, tuple, frozenset)
+
+
+@dataclass
+class InternStats:
+    """What `Interner` has seen and how much memory the duplicates it replaced took."""
+    code_objects: int = 0
+    code_hits: int = 0
+    constants: int = 0
+    constant_hits: int = 0
+    bytes_saved: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.code_hits + self.constant_hits
+
+
+def footprint(code: CodeType) -> int:
+    """Memory held by `code` itself, without the objects in its tables."""
+    return sum(map(sys.getsizeof, (code, code.co_code, code.co_lnotab, code.co_consts)))
+
+
+class Interner:
+    """
+    Canonical instances of code objects and constants.
+
+    Code objects are matched on their bytecode, constants, names, signature
+    and flags. Nested code objects and constants are interned first, so
+    constants are compared by identity and only the bytecode, names and
+    flags need hashing. Without `locations` the file name and line numbers
+    are left out of the key, which lets code from different modules be shared
+    but makes tracebacks through shared code point at the first module that
+    produced it.
+
+    Constants are matched by type as well as value, `1`, `1.0` and `True`
+    stay apart. Strings, bytes and ints are their own keys, tuples of already
+    interned items are matched item by item.
+    """
+    def __init__(self, locations: bool = False):
+        self.locations = locations
+        self.stats = InternStats()
+
+        self._codes: dict[Hashable, list[CodeType]] = {}
+        self._tuples: dict[tuple, tuple] = {}
+        self._constants: dict[Hashable, Any] = {}
+
+    def __len__(self) -> int:
+        return sum(map(len, self._codes.values())) + len(self._tuples) + len(self._constants)
+
+    def clear(self) -> None:
+        self._codes.clear()
+        self._tuples.clear()
+        self._constants.clear()
+        self.stats = InternStats()
+
+    def _same_code(self, left: CodeType, right: CodeType) -> bool:
+        """Whether `left` and `right` are interchangeable, their constants are already interned."""
+        return (
+            len(left.co_consts) == len(right.co_consts)
+            and all(map(operator.is_, left.co_consts, right.co_consts))
+            and left.co_varnames == right.co_varnames
+            and left.co_freevars == right.co_freevars
+            and left.co_cellvars == right.co_cellvars
+            and left.co_argcount == right.co_argcount
+            and left.co_posonlyargcount == right.co_posonlyargcount
+            and left.co_kwonlyargcount == right.co_kwonlyargcount
+            and left.co_nlocals == right.co_nlocals
+            and left.co_stacksize == right.co_stacksize
+            and (not self.locations or (
+                left.co_filename == right.co_filename
+                and left.co_firstlineno == right.co_firstlineno
+                and left.co_lnotab == right.co_lnotab
+            ))
+        )
+
+    def intern_code(self, code: CodeType) -> CodeType:
+        """Canonical instance of `code`, its nested code objects and constants are interned too."""
+        consts = tuple(map(self.intern, code.co_consts))
+        if not all(map(operator.is_, consts, code.co_consts)):
+            code = code.replace(co_consts=consts)
+
+        self.stats.code_objects += 1
+        key = (code.co_code, code.co_names, code.co_name, code.co_flags)
+        candidates = self._codes.setdefault(key, [])
+        for candidate in candidates:
+            if self._same_code(candidate, code):
+                self.stats.code_hits += 1
+                self.stats.bytes_saved += footprint(code)
+                return candidate
+
+        candidates.append(code)
+        return code
+
+    def _canonical(self, value: Any) -> Any:
+        if value.__class__ in (str, bytes, int):
+            return self._constants.setdefault(value, value)
+
+        if value.__class__ is tuple:
+            candidate = self._tuples.setdefault(value, value)
+            if all(map(operator.is_, candidate, value)):
+                return candidate
+
+        return self._constants.setdefault(const_key(value), value)
+
+    def intern(self, value: Any) -> Any:
+        """Canonical instance of the constant `value`, values of other types are returned as is."""
+        if isinstance(value, CodeType):
+            return self.intern_code(value)
+
+        if value.__class__ not in _CONSTANT_TYPES:
+            return value
+
+        if value.__class__ is tuple:
+            items = tuple(map(self.intern, value))
+            if not all(map(operator.is_, items, value)):
+                value = items
+        elif value.__class__ is frozenset:
+            value = frozenset(map(self.intern, value))
+
+        self.stats.constants += 1
+        canonical = self._canonical(value)
+        if canonical is not value:
+            self.stats.constant_hits += 1
+            self.stats.bytes_saved += sys.getsizeof(value)
+
+        return canonical
+
+
+@cache
+def process_interner() -> Interner:
+    """The interner shared by everything in this process."""
+    return Interner()
@@ -0,0 +1,361 @@
+"""
+Lifting of top-level loops into functions.
+
+Module code reads and writes its variables with `LOAD_NAME` and
+`STORE_NAME`, dictionary operations on the module namespace, where a
+function uses indexed fast locals. `lift_loops` moves every top-level loop
+of a module into a function of its own, called once where the loop was.
+The iterator of a `for` loop is its argument, like for comprehensions.
+
+Inside the function a name the loop stores becomes a fast local unless:
+
+- it is deleted in the loop or is a dunder,
+- a function or class of the module reads it, they would miss updates made
+  during the loop,
+- it isn't bound on every path to the loop but is read outside the loop,
+  or in it before the loop stores it.
+
+Fast locals bound before the loop are module globals already, they are
+loaded from the module at the start of the function and stored back when it
+returns. The others only live in the loop, typically its loop variables and
+temporaries, and are dropped. Every other name becomes a `LOAD_GLOBAL` or
+`STORE_GLOBAL`, which module code can use as its namespace is its globals.
+
+The transform assumes that code outside the module doesn't read or rebind
+the loop's names while the loop runs, and that nothing imports the names
+that aren't stored back. When the rest of the module calls `locals`,
+`vars`, `dir`, `eval`, `exec` or `globals`, every name stored in the loop
+counts as read. Loops calling them, loops inside `try` or `with` blocks and
+loops entered or left anywhere but at their start and end are left alone.
+
+`lift_module_loops` rewrites module code objects and can be passed as the
+transform of `rigel.instrumentation.loader.instrument_imports`:
+
+    with instrument_imports(transform=lift_module_loops):
+        import pipeline
+"""
+from copy import copy
+from types import CodeType
+from typing import NamedTuple
+
+from rigel.assembler import Label, assemble
+from rigel.cfg import Block, For, has_target
+from rigel.code import Code
+from rigel.dataflow import definite_assignment, liveness
+from rigel.dominators import loop_forest
+from rigel.instruction import BaseInstruction, make_instruction
+from rigel.pool import Pool
+from rigel.utils import CompilerFlags
+
+
+LOOP_NAME = '<loop>'
+
+_UNSUPPORTED = {
+    'IMPORT_STAR', 'RETURN_VALUE', 'YIELD_VALUE', 'YIELD_FROM', 'LOAD_LOCALS', 'SETUP_ANNOTATIONS',
+}
+_DYNAMIC_SCOPE = {'locals', 'vars', 'dir', 'eval', 'exec', 'globals'}
+_NAME_ACCESS = ('LOAD_NAME', 'STORE_NAME', 'DELETE_NAME')
+_FLAGS = CompilerFlags.CO_OPTIMIZED | CompilerFlags.CO_NEWLOCALS | CompilerFlags.CO_NOFREE
+
+
+class Region(NamedTuple):
+    """Instructions `start:end` of the loop of `header`, exiting to `end`, `iterator` for `for`."""
+    header: Block
+    start: int
+    end: int
+    iterator: bool
+
+
+class Scope(NamedTuple):
+    """Fast locals of a lifted loop, `carried` are bound before it, loaded and stored back."""
+    fast: list[str]
+    carried: list[str]
+
+
+def _nested_names(consts: tuple) -> set[str]:
+    """Names read or written by the code objects in `consts` and nested in them."""
+    names: set[str] = set()
+    for const in consts:
+        if const.__class__ is CodeType:
+            names.update(const.co_names)
+            names.update(_nested_names(const.co_consts))
+
+    return names
+
+
+def _is_dunder(name: str) -> bool:
+    return name.startswith('__') and name.endswith('__')
+
+
+def _closed(body: list[Block], header: Block, entry: Block, exit_: Block) -> bool:
+    """Whether the loop `body` is only entered from `entry` at `header` and only left to `exit_`."""
+    members = set(body)
+    return not (
+            any(
+                successor not in members and successor is not exit_
+                for block in body for successor in block.next
+            )
+            or any(prev not in members for block in body[1:] for prev in block.prev)
+            or [prev for prev in header.prev if prev not in members] != [entry]
+            or entry.target is header
+            or not exit_.instructions
+    )
+
+
+def _liftable(instructions: list[BaseInstruction], start: int, end: int) -> bool:
+    """Whether the loop in `instructions[start:end]` is outside `try` and `with`, and can move."""
+    header_offset = instructions[start].offset
+    if any(
+            instruction.opname.startswith('SETUP_') and instruction.argval > header_offset
+            for instruction in instructions[:start]
+    ):
+        return False
+
+    return not any(
+        instruction.opname in _UNSUPPORTED
+        or instruction.opname == 'LOAD_NAME' and instruction.argval in _DYNAMIC_SCOPE
+        for instruction in instructions[start:end]
+    )
+
+
+def _regions(code: Code, instructions: list[BaseInstruction]) -> list[Region]:
+    """Top-level loops of `code` that can be lifted, in order."""
+    cfg = code.cfg
+    positions = {instruction.offset: position for position, instruction in enumerate(instructions)}
+    layout = {block: index for index, block in enumerate(cfg.blocks)}
+
+    regions = []
+    for loop in loop_forest(cfg).roots:
+        first = layout[loop.header]
+        last = max(layout[block] for block in loop.blocks) + 1
+        if not first or last >= len(cfg.blocks):
+            continue
+
+        exit_ = cfg.blocks[last]
+        if not _closed(cfg.blocks[first:last], loop.header, cfg.blocks[first - 1], exit_):
+            continue
+
+        start = positions[loop.header.instructions[0].offset]
+        end = positions[exit_.instructions[0].offset]
+        if _liftable(instructions, start, end):
+            regions.append(Region(loop.header, start, end, isinstance(loop.header, For)))
+
+    return regions
+
+
+def _scope(code: Code, instructions: list[BaseInstruction], region: Region) -> Scope:
+    cfg = code.cfg
+    inside = instructions[region.start:region.end]
+    outside = instructions[:region.start] + instructions[region.end:]
+
+    stored = {instruction.argval for instruction in inside if instruction.opname == 'STORE_NAME'}
+    deleted = {instruction.argval for instruction in inside if instruction.opname == 'DELETE_NAME'}
+    escaping = {
+        instruction.argval for instruction in outside
+        if instruction.opname in ('LOAD_NAME', 'DELETE_NAME')
+    }
+    nested = _nested_names(code.consts)
+    if any(
+            instruction.opname == 'LOAD_NAME' and instruction.argval in _DYNAMIC_SCOPE
+            for instruction in outside
+    ):
+        escaping |= stored
+    live = {
+        name for kind, name in cfg.analysis(liveness).live_in(region.header) if kind == 'name'
+    }
+    bound = {
+        name for kind, name in cfg.analysis(definite_assignment).assigned(region.header)
+        if kind == 'name'
+    }
+
+    accessed = (instruction.argval for instruction in inside if instruction.opname in _NAME_ACCESS)
+    fast = [
+        name for name in dict.fromkeys(accessed)
+        if name in stored and name not in deleted and name not in nested and not _is_dunder(name)
+        and (name in bound or name not in live and name not in escaping)
+    ]
+
+    return Scope(fast, [name for name in fast if name in bound])
+
+
+def _place(
+        stream: list[BaseInstruction | Label],
+        instructions: list[BaseInstruction],
+        labels: dict[int, Label],
+) -> None:
+    """Append `instructions` to `stream` after the labels of their offsets, jumps go to labels."""
+    for instruction in instructions:
+        if instruction.offset in labels:
+            stream.append(labels[instruction.offset])
+
+        if has_target(instruction.__class__):
+            instruction.argval = labels[instruction.argval]
+
+        stream.append(instruction)
+
+
+def _assemble(stream: list[BaseInstruction | Label]) -> list[BaseInstruction]:
+    assemble(stream)
+    return [item for item in stream if not isinstance(item, Label)]
+
+
+class _Names:
+    """Fast locals and global names of a lifted loop, in `co_varnames` and `co_names` order."""
+    def __init__(self, varnames: tuple[str, ...], line: int | None):
+        self.varnames = varnames
+        self.names: dict[str, int] = {}
+        self.line = line
+
+    def index(self, name: str) -> int:
+        """Index of `name` in `co_names`, added when it's new."""
+        return self.names.setdefault(name, len(self.names))
+
+    def make(
+            self,
+            opname: str,
+            argval: str,
+            source: BaseInstruction | None = None,
+    ) -> BaseInstruction:
+        """
+        `opname` on the local or global `argval`, at the offset and line of
+        `source` if given, at the first line of the loop otherwise.
+        """
+        arg = self.varnames.index(argval) if opname.endswith('_FAST') else self.index(argval)
+        if source is None:
+            return make_instruction(opname, arg, argval, starts_line=self.line)
+
+        return make_instruction(
+            opname, arg, argval, offset=source.offset, starts_line=source.starts_line,
+        )
+
+
+def _function(
+        code: Code,
+        instructions: list[BaseInstruction],
+        region: Region,
+        scope: Scope,
+) -> CodeType:
+    """The code object of the loop in `region` as a function."""
+    inside = [copy(instruction) for instruction in instructions[region.start:region.end]]
+    line = inside[0].starts_line
+    names = _Names(('.0',) * region.iterator + tuple(scope.fast), line)
+    consts = Pool([None])
+
+    body = []
+    for instruction in inside:
+        if instruction.opname in _NAME_ACCESS:
+            suffix = '_FAST' if instruction.argval in scope.fast else '_GLOBAL'
+            instruction = names.make(
+                instruction.opname.replace('_NAME', suffix), instruction.argval, instruction,
+            )
+        elif instruction.has_name:
+            instruction.arg = names.index(instruction.argval)
+        elif instruction.has_const:
+            instruction.arg = consts.index(instruction.argval)
+
+        body.append(instruction)
+
+    labels = {
+        instruction.argval: Label() for instruction in inside if has_target(instruction.__class__)
+    }
+    exit_ = labels.setdefault(instructions[region.end].offset, Label())
+
+    stream: list[BaseInstruction | Label] = []
+    for variable in scope.carried:
+        stream += [names.make('LOAD_GLOBAL', variable), names.make('STORE_FAST', variable)]
+    if region.iterator:
+        stream.append(names.make('LOAD_FAST', '.0'))
+
+    _place(stream, body, labels)
+
+    stream.append(exit_)
+    for variable in scope.carried:
+        stream += [names.make('LOAD_FAST', variable), names.make('STORE_GLOBAL', variable)]
+    stream += [
+        make_instruction('LOAD_CONST', consts.index(None), None, starts_line=line),
+        make_instruction('RETURN_VALUE', starts_line=line),
+    ]
+
+    return code.replace(
+        _assemble(stream),
+        co_argcount=int(region.iterator),
+        co_posonlyargcount=0,
+        co_kwonlyargcount=0,
+        co_nlocals=len(names.varnames),
+        co_varnames=names.varnames,
+        co_freevars=(),
+        co_cellvars=(),
+        co_flags=_FLAGS,
+        co_name=LOOP_NAME,
+        co_firstlineno=min(instruction.starts_line or line for instruction in inside),
+        co_consts=consts.as_tuple(),
+        co_names=tuple(names.names),
+    ).code_object()
+
+
+def lift_loops(code: Code) -> Code:
+    """Lift the top-level loops of module code into functions, see the module docstring."""
+    if code.flags & CompilerFlags.CO_OPTIMIZED or code.name != '<module>':
+        return code
+
+    instructions = [copy(instruction) for instruction in code.instructions]
+    regions = _regions(code, instructions)
+    if not regions:
+        return code
+
+    functions = {
+        region.start: (
+            region, _function(code, instructions, region, _scope(code, instructions, region)),
+        )
+        for region in regions
+    }
+
+    consts = Pool(code.consts)
+    labels = {
+        instruction.argval: Label()
+        for instruction in instructions if has_target(instruction.__class__)
+    }
+
+    stream: list[BaseInstruction | Label] = []
+    position = 0
+    while position < len(instructions):
+        if position not in functions:
+            instruction = instructions[position]
+            if instruction.has_const:
+                instruction.arg = consts.index(instruction.argval)
+            _place(stream, [instruction], labels)
+            position += 1
+            continue
+
+        region, function = functions[position]
+        line = instructions[position].starts_line
+        stream += [
+            make_instruction('LOAD_CONST', consts.index(function), function, starts_line=line),
+            make_instruction('LOAD_CONST', consts.index(LOOP_NAME), LOOP_NAME, starts_line=line),
+            make_instruction('MAKE_FUNCTION', 0, 0, starts_line=line),
+        ]
+        if region.iterator:
+            # The iterator is below the function, the call takes it as the argument.
+            stream.append(make_instruction('ROT_TWO', starts_line=line))
+        stream += [
+            make_instruction(
+                'CALL_FUNCTION', int(region.iterator), int(region.iterator), starts_line=line,
+            ),
+            make_instruction('POP_TOP', starts_line=line),
+        ]
+        position = region.end
+
+    return code.replace(_assemble(stream), co_consts=consts.as_tuple())
+
+
+class LiftModuleLoops:
+    """`lift_loops` over code objects, with the fingerprint the import cache keys results by."""
+    fingerprint = 'lift-module-loops-1'
+
+    def __call__(self, code: CodeType) -> CodeType:
+        instance = Code.from_code(code)
+        lifted = lift_loops(instance)
+        return code if lifted is instance else lifted.code_object()
+
+
+lift_module_loops = LiftModuleLoops()
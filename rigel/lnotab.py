@@ -1,71 +1,195 @@
-import struct
-from typing import Iterable
-
-from more_itertools import first, last
+"""
+Line number tables of python 3.10, `co_linetable`.
+
+See https://github.com/python/cpython/blob/3.10/Objects/lnotab_notes.txt
+    for the description of the line number table.
+"""
+import weakref
+from array import array
+from bisect import bisect_left, bisect_right
+from types import CodeType
+from typing import Iterator
 
 from .instruction import BaseInstruction
 
 
-def _assemble_emit_linetable_pair(bdelta: int, ldelta_: int | None) -> Iterable[bytes]:
-    """Helper function for calculation lnotab for python3.10."""
+NO_LINE = -128
+
+
+def emit_linetable_pair(table: bytearray, bdelta: int, ldelta_: int | None) -> None:
+    """Append the entries covering `bdelta` bytes that move the line by `ldelta_` to `table`."""
     if ldelta_ is None:
-        ldelta = -128
+        ldelta = NO_LINE
     else:
         ldelta = ldelta_
 
         while ldelta > 127:
-            yield struct.pack('bb', 0, 127)
+            table += b'\x00\x7f'
             ldelta -= 127
 
         while ldelta < -127:
-            yield struct.pack('bb', 0, -127)
+            table += b'\x00\x81'
             ldelta += 127
 
     while bdelta > 254:
-        yield struct.pack('Bb', 254, ldelta)
+        table.append(254)
+        table.append(ldelta & 0xff)
 
         if ldelta_ is None:
-            ldelta = -128
+            ldelta = NO_LINE
         else:
             ldelta = 0
 
         bdelta -= 254
 
-    yield struct.pack('Bb', bdelta, ldelta)
+    table.append(bdelta)
+    table.append(ldelta & 0xff)
+
+
+def emit_line_run(table: bytearray, length: int, line: int | None, previous: int) -> int:
+    """
+    Append the entries of a `length` bytes run on `line` to `table`.
+
+    Line deltas are taken from `previous`, the last run having a line, which is
+    returned for the next run. A run without a line keeps it.
+    """
+    if line is None:
+        emit_linetable_pair(table, length, None)
+        return previous
+
+    emit_linetable_pair(table, length, line - previous)
+    return line
 
 
-def assemble_lnotab(instructions: list[BaseInstruction], starts_line: int = 1) -> Iterable[bytes]:
+def assemble_lnotab(
+        instructions: list[BaseInstruction],
+        starts_line: int = 1,
+        code_size: int | None = None,
+) -> bytes:
     """
     Generate lnotab for python 3.10.
 
-    See https://github.com/python/cpython/blob/3.10/Objects/lnotab_notes.txt
-        for the description of the line number table.
+    `code_size` is the length of `co_code`, by default the last instruction is
+    taken to end where its argument says. Instructions whose `starts_line` is
+    `None` get the no line entry, like the `GEN_START` of a generator.
 
     cpython:
         https://github.com/python/cpython/blob/3.10/Python/compile.c#L6681
     """
-    instruction = first(instructions)
+    table = bytearray()
 
+    iterator = iter(instructions)
+    instruction = next(iterator)
+
+    previous = starts_line
     old_offset = 0
     old_lineno = instruction.starts_line
-    old_ldelta = instruction.starts_line - starts_line
-    for instruction in instructions[1:]:
-        ldelta = instruction.starts_line - old_lineno
-        if ldelta == 0:
+    for instruction in iterator:
+        if instruction.starts_line == old_lineno:
             continue
 
-        yield from _assemble_emit_linetable_pair(
-            bdelta=instruction.offset - old_offset,
-            ldelta_=old_ldelta,
-        )
+        previous = emit_line_run(table, instruction.offset - old_offset, old_lineno, previous)
 
         old_lineno = instruction.starts_line
         old_offset = instruction.offset
-        old_ldelta = ldelta
 
-    instruction = last(instructions)
+    if code_size is None:
+        code_size = instruction.offset + instruction.size
+
+    emit_line_run(table, code_size - old_offset, old_lineno, previous)
+    return bytes(table)
+
+
+class LineTable:
+    """
+    Decoded line table, the address ranges of a code object with their lines.
+
+    Ranges are kept in two sorted arrays, so finding the line of an offset and
+    the ranges of a line are both a binary search. Adjacent ranges on the same
+    line are merged and offsets without a line map to `None`.
+    """
+    __slots__ = ('_starts', '_lines', '_end', '_order', '_ordered_lines')
+
+    def __init__(self, linetable: bytes, firstlineno: int, code_size: int | None = None):
+        starts = array('l')
+        lines = array('l')
+
+        start = 0
+        line = firstlineno
+        for index in range(0, len(linetable), 2):
+            bdelta = linetable[index]
+            ldelta = linetable[index + 1]
+            if ldelta == NO_LINE & 0xff:
+                current = -1
+            else:
+                line += ldelta - 256 if ldelta > 127 else ldelta
+                current = line
+
+            if bdelta:
+                if not lines or lines[-1] != current:
+                    starts.append(start)
+                    lines.append(current)
+                start += bdelta
+
+        self._starts = starts
+        self._lines = lines
+        self._end = start if code_size is None else code_size
+
+        order = sorted(
+            (index for index, line in enumerate(lines) if line >= 0), key=lines.__getitem__,
+        )
+        self._order = array('l', order)
+        self._ordered_lines = array('l', map(lines.__getitem__, order))
+
+    @classmethod
+    def from_code(cls, code: CodeType) -> 'LineTable':
+        return cls(code.co_linetable, code.co_firstlineno, len(code.co_code))
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __iter__(self) -> Iterator[tuple[int, int, int | None]]:
+        """`(start, end, line)` of every range, like `co_lines` with adjacent ranges merged."""
+        ends = [*self._starts[1:], self._end]
+        for start, end, line in zip(self._starts, ends, self._lines):
+            yield start, end, None if line < 0 else line
+
+    def _end_of(self, index: int) -> int:
+        return self._starts[index + 1] if index + 1 < len(self._starts) else self._end
+
+    def line(self, offset: int) -> int | None:
+        """Line of the instruction at `offset`, `None` when it has no line or is out of the code."""
+        index = bisect_right(self._starts, offset) - 1
+        if index < 0 or offset >= self._end:
+            return None
+
+        line = self._lines[index]
+        return None if line < 0 else line
+
+    def ranges(self, line: int) -> list[tuple[int, int]]:
+        """`(start, end)` offset ranges of the instructions on `line`, in code order."""
+        low = bisect_left(self._ordered_lines, line)
+        high = bisect_right(self._ordered_lines, line, low)
+        return [(self._starts[index], self._end_of(index)) for index in self._order[low:high]]
+
+    def lines(self) -> list[int]:
+        """Every line having instructions, sorted."""
+        return sorted(set(self._ordered_lines))
+
+
+_line_tables: dict[int, LineTable] = {}
+
+
+def line_table(code: CodeType) -> LineTable:
+    """
+    `LineTable` of `code`, decoded once and kept as long as `code` lives.
+
+    Tables are keyed on the identity of the code object, code objects that
+    compare equal may still have different line tables.
+    """
+    table = _line_tables.get(id(code))
+    if table is None:
+        table = _line_tables[id(code)] = LineTable.from_code(code)
+        weakref.finalize(code, _line_tables.pop, id(code), None)
 
-    yield from _assemble_emit_linetable_pair(
-        bdelta=instruction.offset + instruction.size - old_offset,
-        ldelta_=old_ldelta,
-    )
+    return table
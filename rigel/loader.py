@@ -1,8 +1,15 @@
 import marshal
+import mmap
+import os
 import struct
 import sys
 import time
+from array import array
 from dataclasses import dataclass
+from functools import cached_property
+from typing import Iterator, NamedTuple
+
+from rigel.exceptions import PycError
 
 
 PYTHON_MAGIC_VERSION_MAP = {
@@ -32,17 +39,21 @@ PYTHON_VERSION: tuple[int, int] = sys.version_info[:2]
 PYC_HEADER = _pyc_header(PYTHON_VERSION)
 
 
-def dump(code, fp, *, version: tuple[int, int]) -> None:
+def dump(code, fp, *, version: tuple[int, int], modified: int = 0, source_size: int = 0) -> None:
     """
     Serialize ``obj`` as a PYC formatted stream to ``fp`` (a
        ``.write()``-supporting file-like object).
+
+    ``modified`` and ``source_size`` are the source mtime and size recorded
+    in a timestamp based header, the import system checks them against the
+    source file.
     """
     magic = (PYTHON_VERSION_MAGIC_MAP[version]).to_bytes(2, 'little') + b'\r\n'
 
     fp.write(magic)
     fp.write(b'\x00\x00\x00\x00')
-    fp.write(b'\x00\x00\x00\x00')
-    fp.write(b'\x00\x00\x00\x00')
+    fp.write(struct.pack('<L', modified & 0xFFFFFFFF))
+    fp.write(struct.pack('<L', source_size & 0xFFFFFFFF))
 
     marshal.dump(code, fp)
 
@@ -87,3 +98,155 @@ def load(fp) -> CodeInfo:
         source_size=fp.read(4),
         code=fp.read(),
     )
+
+
+FLAG_HASH_BASED = 0b01
+FLAG_CHECK_SOURCE = 0b10
+
+
+class PycHeader(NamedTuple):
+    """
+    PEP 552 header.
+
+    Timestamp based files carry `modified` and `source_size`, hash based
+    ones (`flags & FLAG_HASH_BASED`) carry the 8 byte `source_hash` instead.
+    """
+    magic: int
+    flags: int
+    modified: int
+    source_size: int
+    source_hash: bytes
+
+    @property
+    def python_version(self) -> tuple[int, int] | None:
+        return PYTHON_MAGIC_VERSION_MAP.get(self.magic)
+
+    @property
+    def hash_based(self) -> bool:
+        return bool(self.flags & FLAG_HASH_BASED)
+
+
+def parse_header(data: bytes) -> PycHeader:
+    if len(data) < PYC_HEADER or data[2:4] != b'\r\n':
+        raise PycError('not a pyc header')
+
+    magic, flags = struct.unpack_from('<H2xL', data)
+    if flags & FLAG_HASH_BASED:
+        return PycHeader(magic, flags, 0, 0, bytes(data[8:16]))
+
+    modified, source_size = struct.unpack_from('<LL', data, 8)
+    return PycHeader(magic, flags, modified, source_size, b'')
+
+
+def read_header(path: str | os.PathLike) -> PycHeader:
+    """Read only the header of the `.pyc` file at `path`."""
+    with open(path, 'rb') as fp:
+        return parse_header(fp.read(PYC_HEADER))
+
+
+class PycFile:
+    """
+    A `.pyc` file mapped into memory.
+
+    The header is parsed when the file is opened, the payload is only
+    unmarshalled on the first access to `code`.
+    """
+    def __init__(self, path: str | os.PathLike):
+        self.path = path
+
+        with open(path, 'rb') as fp:
+            try:
+                self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as error:
+                raise PycError(f'{path}: empty file') from error
+
+        try:
+            self.header = parse_header(self._mmap[:PYC_HEADER])
+        except PycError:
+            self._mmap.close()
+            raise
+
+    def __enter__(self) -> 'PycFile':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @cached_property
+    def code(self):
+        with memoryview(self._mmap) as view, view[PYC_HEADER:] as payload:
+            return marshal.loads(payload)
+
+    def close(self) -> None:
+        self._mmap.close()
+
+
+def iter_headers(root: str | os.PathLike) -> Iterator[tuple[str, PycHeader]]:
+    """Yield the header of every `.pyc` file under `root`, skipping unreadable or malformed ones."""
+    todo = [os.fspath(root)]
+    while todo:
+        try:
+            entries = os.scandir(todo.pop())
+        except OSError:
+            continue
+
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    todo.append(entry.path)
+                elif entry.name.endswith('.pyc'):
+                    try:
+                        yield entry.path, read_header(entry.path)
+                    except (OSError, PycError):
+                        continue
+
+
+class HeaderIndex:
+    """
+    Headers of every `.pyc` file under a directory, one array column per field.
+
+    Only the paths are Python objects, the rest costs 24 bytes per file.
+    """
+    def __init__(self):
+        self.paths: list[str] = []
+        self._magics = array('H')
+        self._flags = array('I')
+        self._modified = array('I')
+        self._source_sizes = array('I')
+        self._source_hashes = array('Q')
+
+    @classmethod
+    def build(cls, root: str | os.PathLike) -> 'HeaderIndex':
+        index = cls()
+        for path, header in iter_headers(root):
+            index.append(path, header)
+
+        return index
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __getitem__(self, index: int) -> tuple[str, PycHeader]:
+        flags = self._flags[index]
+        source_hash = b''
+        if flags & FLAG_HASH_BASED:
+            source_hash = self._source_hashes[index].to_bytes(8, 'little')
+
+        return self.paths[index], PycHeader(
+            magic=self._magics[index],
+            flags=flags,
+            modified=self._modified[index],
+            source_size=self._source_sizes[index],
+            source_hash=source_hash,
+        )
+
+    def __iter__(self) -> Iterator[tuple[str, PycHeader]]:
+        return (self[index] for index in range(len(self)))
+
+    def append(self, path: str, header: PycHeader) -> None:
+        self.paths.append(path)
+        self._magics.append(header.magic)
+        self._flags.append(header.flags)
+        self._modified.append(header.modified)
+        self._source_sizes.append(header.source_size)
+        self._source_hashes.append(int.from_bytes(header.source_hash or bytes(8), 'little'))
@@ -0,0 +1,295 @@
+"""
+Peephole optimizations over `ControlFlowGraph`.
+
+CPython already runs the same passes when it compiles source, so they pay off
+on code that rigel builds or instruments itself rather than on plain `compile`
+output.
+
+cpython:
+    https://github.com/python/cpython/blob/3.10/Python/compile.c#L7417
+"""
+import operator
+import warnings
+from copy import copy
+from types import CodeType
+from typing import Any, Callable, Final, Iterable
+
+from rigel.assembler import Label, assemble
+from rigel.cfg import Block, ControlFlowGraph, LeaderCFGBuilder
+from rigel.code import Code
+from rigel.instruction import BaseInstruction, BinaryOp, make_instruction
+from rigel.pool import Pool
+
+
+MAX_INT_SIZE: Final = 128  # bits
+MAX_COLLECTION_SIZE: Final = 256
+MAX_STR_SIZE: Final = 4096
+
+BINARY_OPERATORS: Final = {
+    'BINARY_POWER': operator.pow,
+    'BINARY_MULTIPLY': operator.mul,
+    'BINARY_MODULO': operator.mod,
+    'BINARY_ADD': operator.add,
+    'BINARY_SUBTRACT': operator.sub,
+    'BINARY_SUBSCR': operator.getitem,
+    'BINARY_FLOOR_DIVIDE': operator.floordiv,
+    'BINARY_TRUE_DIVIDE': operator.truediv,
+    'BINARY_LSHIFT': operator.lshift,
+    'BINARY_RSHIFT': operator.rshift,
+    'BINARY_AND': operator.and_,
+    'BINARY_XOR': operator.xor,
+    'BINARY_OR': operator.or_,
+}
+
+UNCONDITIONAL_JUMPS: Final = frozenset({'JUMP_ABSOLUTE', 'JUMP_FORWARD'})
+
+_NOT_FOLDED: Final = object()
+
+
+Pass = Callable[[ControlFlowGraph, Pool], bool]
+
+
+def _too_expensive(opname: str, left: Any, right: Any) -> bool:
+    """Whether computing `left <op> right` could take a long time or build a huge constant."""
+    if isinstance(left, int) and isinstance(right, int):
+        if opname == 'BINARY_POWER':
+            return right > 0 and left.bit_length() * right > MAX_INT_SIZE
+        if opname == 'BINARY_LSHIFT':
+            return right > MAX_INT_SIZE or left.bit_length() + right > MAX_INT_SIZE
+
+    if opname == 'BINARY_MULTIPLY':
+        for sequence, times in ((left, right), (right, left)):
+            if isinstance(sequence, (str, bytes, tuple)) and isinstance(times, int) and times > 0:
+                limit = MAX_COLLECTION_SIZE if isinstance(sequence, tuple) else MAX_STR_SIZE
+                return len(sequence) * times > limit
+
+    return False
+
+
+def _fold(opname: str, left: Any, right: Any) -> Any:
+    if _too_expensive(opname, left, right):
+        return _NOT_FOLDED
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        try:
+            result = BINARY_OPERATORS[opname](left, right)
+        except Exception:  # pylint: disable=broad-except
+            return _NOT_FOLDED
+
+    if isinstance(result, (str, bytes)) and len(result) > MAX_STR_SIZE:
+        return _NOT_FOLDED
+
+    if isinstance(result, tuple) and len(result) > MAX_COLLECTION_SIZE:
+        return _NOT_FOLDED
+
+    return result
+
+
+def fold_constants(cfg: ControlFlowGraph, consts: Pool) -> bool:
+    """Replace `LOAD_CONST a; LOAD_CONST b; BINARY_*` with `LOAD_CONST a <op> b`."""
+    changed = False
+
+    for block in cfg.blocks:
+        instructions = []
+        folded = False
+
+        for instruction in block:
+            if (
+                isinstance(instruction, BinaryOp)
+                and len(instructions) >= 2
+                and instructions[-1].opname == instructions[-2].opname == 'LOAD_CONST'
+            ):
+                left, right = instructions[-2], instructions[-1]
+                result = _fold(instruction.opname, left.argval, right.argval)
+
+                if result is not _NOT_FOLDED:
+                    instructions[-2:] = [make_instruction(
+                        'LOAD_CONST',
+                        consts.index(result),
+                        result,
+                        offset=left.offset,
+                        starts_line=left.starts_line,
+                    )]
+                    folded = True
+                    continue
+
+            instructions.append(instruction)
+
+        if folded:
+            block.instructions = instructions
+            changed = True
+
+    return changed
+
+
+def remove_dead_const_loads(cfg: ControlFlowGraph, _: Pool) -> bool:
+    """Drop `LOAD_CONST; POP_TOP` pairs."""
+    changed = False
+
+    for block in cfg.blocks:
+        instructions = []
+        removed = False
+
+        for instruction in block:
+            if (
+                instruction.opname == 'POP_TOP'
+                and instructions
+                and instructions[-1].opname == 'LOAD_CONST'
+            ):
+                instructions.pop()
+                removed = True
+                continue
+
+            instructions.append(instruction)
+
+        if removed:
+            block.instructions = instructions
+            changed = True
+
+    return changed
+
+
+def _is_jump_only(block: Block) -> bool:
+    return len(block.instructions) == 1 and block.instructions[0].opname in UNCONDITIONAL_JUMPS
+
+
+def _final_target(block: Block) -> Block:
+    """Follow `block` through blocks that only jump somewhere else."""
+    seen = {block}
+    while _is_jump_only(block) and block.target not in seen:
+        block = block.target
+        seen.add(block)
+
+    return block
+
+
+def _falls_into(blocks: list[Block], position: int, target: Block) -> bool:
+    """Whether falling off `blocks[position]` reaches `target` without executing anything."""
+    for block in blocks[position + 1:]:
+        if block is target:
+            return True
+        if block.instructions:
+            return False
+
+    return False
+
+
+def thread_jumps(cfg: ControlFlowGraph, _: Pool) -> bool:
+    """
+    Retarget jumps that land on an unconditional jump and drop unconditional
+    jumps to the code that follows them anyway.
+
+    Relative jumps only go forward, so a backward `JUMP_FORWARD` becomes a
+    `JUMP_ABSOLUTE` and a `FOR_ITER` is only threaded forward.
+    """
+    blocks = cfg.blocks
+    positions = {block: position for position, block in enumerate(blocks)}
+    changed = False
+
+    for position, block in enumerate(blocks):
+        if block.target is None:
+            continue
+
+        jump = block.instructions[-1]
+        target = _final_target(block.target)
+        following = blocks[position + 1] if position + 1 < len(blocks) else None
+
+        if target is not block.target:
+            if jump.has_jrel and positions[target] <= position:
+                if jump.opname != 'JUMP_FORWARD':
+                    continue
+
+                jump = block.instructions[-1] = make_instruction(
+                    'JUMP_ABSOLUTE', offset=jump.offset, starts_line=jump.starts_line,
+                )
+
+            if block.is_final() or following is not block.target:
+                block.remove_exit(block.target)
+
+            block.target = target
+            block.add_exit(target)
+            changed = True
+
+        if jump.opname in UNCONDITIONAL_JUMPS and _falls_into(blocks, position, block.target):
+            block.instructions.pop()
+            block.remove_exit(block.target)
+            block.add_exit(following)
+            block.target = None
+            changed = True
+
+    return changed
+
+
+def remove_unreachable(cfg: ControlFlowGraph, _: Pool) -> bool:
+    """Drop blocks that can't be reached from the start block."""
+    reachable = {cfg.start_block}
+    todo = [cfg.start_block]
+    while todo:
+        for successor in todo.pop().next:
+            if successor not in reachable:
+                reachable.add(successor)
+                todo.append(successor)
+
+    unreachable = {block for block in cfg.blocks if block not in reachable}
+    if unreachable:
+        cfg.remove_blocks(unreachable)
+
+    return bool(unreachable)
+
+
+PASSES: Final[tuple[Pass, ...]] = (
+    fold_constants,
+    remove_dead_const_loads,
+    thread_jumps,
+    remove_unreachable,
+)
+
+
+def linearize(cfg: ControlFlowGraph) -> list[BaseInstruction]:
+    """Lay the blocks out in order, jumps are pointed at their target blocks and assembled."""
+    labels = {block: Label() for block in cfg.blocks}
+
+    stream = []
+    for block in cfg.blocks:
+        if block.target is not None:
+            block.instructions[-1].argval = labels[block.target]
+
+        stream.append(labels[block])
+        stream.extend(block)
+
+    assemble(stream)
+
+    return [item for item in stream if not isinstance(item, Label)]
+
+
+def optimize(code: Code, passes: Iterable[Pass] = PASSES) -> Code:
+    """Run `passes` over the graph of `code` until none of them changes it, re-emit the result."""
+    passes = tuple(passes)
+    instructions = [copy(instruction) for instruction in code.instructions]
+
+    consts = Pool(code.consts)
+    for instruction in instructions:
+        if instruction.opname == 'LOAD_CONST':
+            instruction.arg = consts.index(instruction.argval)
+
+    cfg = LeaderCFGBuilder().build(instructions)
+
+    changed = True
+    while changed:
+        changed = False
+        for pass_ in passes:
+            changed = pass_(cfg, consts) or changed
+
+    return code.replace(linearize(cfg), co_consts=consts.as_tuple())
+
+
+def optimize_code(code: CodeType, passes: Iterable[Pass] = PASSES) -> CodeType:
+    """`optimize` over `code` and the code objects nested in its constants, innermost first."""
+    passes = tuple(passes)
+    consts = tuple(
+        optimize_code(const, passes) if isinstance(const, CodeType) else const
+        for const in code.co_consts
+    )
+
+    return optimize(Code.from_code(code.replace(co_consts=consts)), passes).code_object()
@@ -0,0 +1,121 @@
+"""
+Constant and name pools with type-exact keys.
+
+Values that compare equal aren't always interchangeable, `1`, `1.0` and
+`True` or `0.0` and `-0.0` share a slot in a plain dictionary and the code
+reading them would change meaning. Pools key values by their type as well,
+floats and complex numbers by their bits, tuples and frozensets item by item
+and code objects by identity. Two code objects that only differ in their
+line numbers compare equal.
+"""
+import struct
+from types import CodeType
+from typing import Any, Callable, Hashable, Iterable, Iterator
+
+
+_DOUBLE = struct.Struct('<d')
+_COMPLEX = struct.Struct('<dd')
+_PLAIN: frozenset[type] = frozenset({str, bytes, int, bool, type(None), type(...)})
+
+
+def _plain(value: Any) -> Hashable:
+    return value.__class__, value
+
+
+def _float(value: float) -> Hashable:
+    return float, _DOUBLE.pack(value)
+
+
+def _complex(value: complex) -> Hashable:
+    return complex, _COMPLEX.pack(value.real, value.imag)
+
+
+def _tuple(value: tuple) -> Hashable:
+    return value.__class__, tuple(const_key(item) for item in value)
+
+
+def _frozenset(value: frozenset) -> Hashable:
+    return value.__class__, frozenset(const_key(item) for item in value)
+
+
+def _identity(value: Any) -> Hashable:
+    return value.__class__, id(value)
+
+
+def _other(value: Any) -> Hashable:
+    """Key of a value whose exact type has no keyer, subclasses of containers included."""
+    if isinstance(value, tuple):
+        return _tuple(value)
+
+    if isinstance(value, frozenset):
+        return _frozenset(value)
+
+    try:
+        hash(value)
+    except TypeError:
+        return _identity(value)
+
+    return _plain(value)
+
+
+_KEYERS: dict[type, Callable[[Any], Hashable]] = {
+    **dict.fromkeys(_PLAIN, _plain),
+    float: _float,
+    complex: _complex,
+    tuple: _tuple,
+    frozenset: _frozenset,
+    CodeType: _identity,
+}
+
+
+def const_key(value: Any) -> Hashable:
+    """Key telling apart values that are equal but not interchangeable, `1`, `1.0` or `True`."""
+    return _KEYERS.get(value.__class__, _other)(value)
+
+
+class Pool:
+    """
+    `co_consts` or `co_names` under construction, values in order of first use.
+
+    Values given to the constructor are kept as they are, duplicates
+    included, so existing arguments stay valid. `index` is a dictionary
+    lookup that appends values it hasn't seen, the tuple is built on the
+    first `as_tuple` after a change.
+    """
+    __slots__ = ('_values', '_index', '_tuple')
+
+    def __init__(self, values: Iterable[Any] = ()):
+        self._values: list[Any] = []
+        self._index: dict[Hashable, int] = {}
+        self._tuple: tuple | None = None
+
+        for value in values:
+            self._index.setdefault(const_key(value), len(self._values))
+            self._values.append(value)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._values)
+
+    def __getitem__(self, index: int) -> Any:
+        return self._values[index]
+
+    def __contains__(self, value: Any) -> bool:
+        return const_key(value) in self._index
+
+    def index(self, value: Any) -> int:
+        key = (value.__class__, value) if value.__class__ in _PLAIN else const_key(value)
+        try:
+            return self._index[key]
+        except KeyError:
+            self._values.append(value)
+            self._tuple = None
+            return self._index.setdefault(key, len(self._values) - 1)
+
+    def as_tuple(self) -> tuple:
+        if self._tuple is None:
+            self._tuple = tuple(self._values)
+
+        return self._tuple
@@ -0,0 +1,98 @@
+"""
+Stack effects of opcodes, precomputed for the running Python.
+
+`STACK_EFFECTS` and `JUMP_STACK_EFFECTS` are indexed by opcode. An entry is
+the effect itself when it doesn't depend on the argument, a function of the
+argument when it does, and `None` for opcodes this Python doesn't have. The
+first table is for falling through to the next instruction, the second for
+taking the jump.
+
+`CLOSED_FORMS` are written after the 3.10 compiler. Each one is checked
+against `dis.stack_effect` over a range of arguments when the tables are
+built, opcodes whose effect changed in the running Python call
+`dis.stack_effect` instead.
+
+cpython:
+    https://github.com/python/cpython/blob/3.10/Python/compile.c#L1051
+"""
+import dis
+from functools import partial
+from typing import Callable, Final
+
+
+StackEffect = int | Callable[[int], int] | None
+
+_SAMPLE_ARGS: Final = (0, 1, 2, 3, 4, 0x0f, 0x101)
+_CHECKED_ARGS: Final = (*range(0x20), 0xff, 0x100, 0x101, 0x1234)
+
+CLOSED_FORMS: Final[dict[str, Callable[[int], int]]] = {
+    'UNPACK_SEQUENCE': lambda arg: arg - 1,
+    'UNPACK_EX': lambda arg: (arg & 0xff) + (arg >> 8),
+    'BUILD_TUPLE': lambda arg: 1 - arg,
+    'BUILD_LIST': lambda arg: 1 - arg,
+    'BUILD_SET': lambda arg: 1 - arg,
+    'BUILD_STRING': lambda arg: 1 - arg,
+    'BUILD_MAP': lambda arg: 1 - 2 * arg,
+    'BUILD_CONST_KEY_MAP': lambda arg: -arg,
+    'RAISE_VARARGS': lambda arg: -arg,
+    'CALL_FUNCTION': lambda arg: -arg,
+    'CALL_METHOD': lambda arg: -arg - 1,
+    'CALL_FUNCTION_KW': lambda arg: -arg - 1,
+    'CALL_FUNCTION_EX': lambda arg: -1 - (arg & 0x01),
+    'MAKE_FUNCTION': lambda arg: -1 - bin(arg & 0x0f).count('1'),
+    'BUILD_SLICE': lambda arg: -2 if arg == 3 else -1,
+    'FORMAT_VALUE': lambda arg: -1 if arg & 0x04 else 0,
+}
+
+
+def _closed_form(opcode_: int, jump: bool) -> Callable[[int], int] | None:
+    """Closed form of the effect of `opcode_`, if it agrees with `dis.stack_effect`."""
+    form = CLOSED_FORMS.get(dis.opname[opcode_])
+    if form is None:
+        return None
+
+    for arg in _CHECKED_ARGS:
+        try:
+            effect = dis.stack_effect(opcode_, arg, jump=jump)
+        except ValueError:
+            continue
+
+        if form(arg) != effect:
+            return None
+
+    return form
+
+
+def _stack_effect(opcode_: int, jump: bool) -> StackEffect:
+    if opcode_ < dis.HAVE_ARGUMENT:
+        try:
+            return dis.stack_effect(opcode_, jump=jump)
+        except ValueError:
+            return None
+
+    try:
+        effects = {dis.stack_effect(opcode_, arg, jump=jump) for arg in _SAMPLE_ARGS}
+    except ValueError:
+        return None
+
+    if len(effects) == 1:
+        return effects.pop()
+
+    return _closed_form(opcode_, jump) or partial(dis.stack_effect, opcode_, jump=jump)
+
+
+STACK_EFFECTS: Final[tuple[StackEffect, ...]] = tuple(
+    _stack_effect(opcode_, jump=False) for opcode_ in range(256)
+)
+JUMP_STACK_EFFECTS: Final[tuple[StackEffect, ...]] = tuple(
+    _stack_effect(opcode_, jump=True) for opcode_ in range(256)
+)
+
+
+def stack_effect(opcode_: int, arg: int | None = None, jump: bool = False) -> int:
+    """Like `dis.stack_effect` with an explicit `jump`, without the per call argument checks."""
+    effect = (JUMP_STACK_EFFECTS if jump else STACK_EFFECTS)[opcode_]
+    if effect is None:
+        raise ValueError(f'Invalid opcode or oparg: {opcode_}')
+
+    return effect if effect.__class__ is int else effect(arg)
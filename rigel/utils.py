@@ -1,6 +1,5 @@
 from enum import IntFlag
-from inspect import isbuiltin
-from textwrap import dedent
+from operator import attrgetter
 from types import CodeType
 from typing import Any, Iterable
 
@@ -88,39 +87,65 @@ def create_code_object(  # pylint: disable=too-many-arguments,too-many-locals
     )
 
 
+CO_FIELDS = (
+    'co_argcount', 'co_cellvars', 'co_code', 'co_consts', 'co_filename', 'co_firstlineno',
+    'co_flags', 'co_freevars', 'co_kwonlyargcount', 'co_linetable', 'co_name', 'co_names',
+    'co_nlocals', 'co_posonlyargcount', 'co_stacksize', 'co_varnames',
+)
+
+# Computed by the interpreter from the fields above on every access.
+CO_DERIVED_FIELDS = {
+    'co_lnotab': lambda code: code.co_lnotab,
+    'co_lines': lambda code: list(code.co_lines()),
+}
+
+
 def get_co_fields(code: CodeType) -> Iterable[tuple[str, Any]]:
     """
     :param code:
     :return:
     """
-    for co_property in dir(code):
-        if co_property.startswith('co_') is False:
-            continue
+    for co_property in CO_FIELDS:
+        yield co_property, getattr(code, co_property)
 
-        value = getattr(code, co_property)
-        if isbuiltin(value):
-            value = list(value())
-
-        yield co_property, value
+    for co_property, getter in CO_DERIVED_FIELDS.items():
+        yield co_property, getter(code)
 
 
 def code_diff(code_a: CodeType, code_b: CodeType) -> dict[str, tuple[Any, Any]]:
     """
+    Fields of `code_a` and `code_b` that differ.
+
+    The derived fields are only computed when the line table, the bytecode or
+    the first line differ. See `rigel.diff.diff_code` for a diff of the
+    instructions themselves.
+
     :param code_a:
     :param code_b:
     :return:
     """
-    co_fields_a = dict(get_co_fields(code_a))
-    co_fields_b = dict(get_co_fields(code_b))
-
-    return {
-        key: (value, co_fields_b[key])
-        for key, value in co_fields_a.items()
-        if co_fields_b[key] != value
+    if code_a is code_b:
+        return {}
+
+    getter = attrgetter(*CO_FIELDS)
+    diff = {
+        key: (value_a, value_b)
+        for key, value_a, value_b in zip(CO_FIELDS, getter(code_a), getter(code_b))
+        if value_a != value_b
     }
 
+    if diff.keys() & {'co_linetable', 'co_code', 'co_firstlineno'}:
+        for key, derived in CO_DERIVED_FIELDS.items():
+            value_a, value_b = derived(code_a), derived(code_b)
+            if value_a != value_b:
+                diff[key] = (value_a, value_b)
+
+    return diff
+
 
 def main():
+    from textwrap import dedent  # pylint: disable=import-outside-toplevel
+
     raw_code_a = '''print('string 1')
 print('string 2')
     '''
@@ -1,30 +1,64 @@
+import dis
 from contextlib import contextmanager
-from typing import Iterable
+from typing import Callable, Iterable
 
 from .exceptions import UnknownInstructionError
 
 
 class InstructionVisitor:
-    """"""
+    """
+    Dispatches instructions to `visit_<opname>` methods.
+
+    The handlers are resolved once per class into a table indexed by opcode,
+    missing ones fall back to `_unknown_instruction`.
+    """
+    _dispatch: list[Callable] = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._build_dispatch()
+
+    @classmethod
+    def _build_dispatch(cls) -> None:
+        cls._dispatch = [
+            getattr(cls, f'visit_{opname.lower()}', cls._unknown_instruction)
+            for opname in dis.opname
+        ]
+
     def visit(self, instruction, block):
-        return getattr(
-            self,
-            f'visit_{instruction.opname.lower()}',
-            self._unknown_instruction,
-        )(instruction, block)
+        return self._dispatch[instruction.opcode](self, instruction, block)
 
     def _unknown_instruction(self, *args, **kwargs):
         raise UnknownInstructionError
 
 
+InstructionVisitor._build_dispatch()  # pylint: disable=protected-access
+
+
 class BlockVisitor:
-    """"""
+    """
+    Dispatches blocks to `visit_<block class name>` methods.
+
+    The handler of each block class is resolved on first use and cached per
+    visitor class, missing ones fall back to `generic_visit`.
+    """
+    _dispatch: dict[type, Callable] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {}
+
     def visit(self, block):
-        return getattr(
-            self,
-            f'visit_{block.__class__.__name__.lower()}',
-            self.generic_visit,
-        )(block)
+        try:
+            handler = self._dispatch[block.__class__]
+        except KeyError:
+            handler = self._dispatch.setdefault(block.__class__, getattr(
+                self.__class__,
+                f'visit_{block.__class__.__name__.lower()}',
+                self.__class__.generic_visit,
+            ))
+
+        return handler(self, block)
 
     def generic_visit(self, blocks):
         for block in blocks:
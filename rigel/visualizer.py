@@ -1,5 +1,3 @@
-from graphviz import Digraph
-
 from rigel.code import Code
 from rigel.instruction import convert
 from rigel.visitor import BlockVisitor
@@ -11,6 +9,8 @@ class Visualizer(BlockVisitor):
     }
 
     def __init__(self, name: str = 'CFG', format_: str = 'png'):
+        from graphviz import Digraph  # pylint: disable=import-outside-toplevel
+
         self._graph = Digraph(
             name=name,
             format=format_,
@@ -24,6 +24,7 @@ class Visualizer(BlockVisitor):
             node_attr={'fontname': 'DejaVu Sans Mono'},
             edge_attr={'fontname': 'DejaVu Sans Mono'},
         )
+        self._visited = set()
 
     def visualize(self, cfg):
         self.visit(cfg.start_block)
@@ -36,30 +37,14 @@ class Visualizer(BlockVisitor):
         return shape, color, text
 
     def visit_block(self, block):
-        node_shape, node_color, node_label = self.stylize_node(block)
-
-        self._graph.node(
-            str(block.uuid),
-            label=node_label,
-            _attributes={
-                'shape': node_shape,
-                'color': node_color,
-            },
-        )
-
-        self.generic_visit(block.next)
-
-        for exit_ in block.next:
-            self._graph.edge(
-                str(block.uuid),
-                str(exit_.uuid),
-            )
+        if block in self._visited:
+            return
 
-    def visit_for(self, block):
+        self._visited.add(block)
         node_shape, node_color, node_label = self.stylize_node(block)
 
         self._graph.node(
-            str(block.uuid),
+            str(block.number),
             label=node_label,
             _attributes={
                 'shape': node_shape,
@@ -67,19 +52,16 @@ class Visualizer(BlockVisitor):
             },
         )
 
-        self._graph.edge(
-            str(block.uuid),
-            str(block.uuid),
-        )
-
         self.generic_visit(block.next)
 
         for exit_ in block.next:
             self._graph.edge(
-                str(block.uuid),
-                str(exit_.uuid),
+                str(block.number),
+                str(exit_.number),
             )
 
+    visit_for = visit_block
+
 
 def visualize(cfg):
     Visualizer().visualize(cfg)
@@ -0,0 +1,48 @@
+import dis
+from textwrap import dedent
+
+import pytest
+
+from rigel.assembler import Label, assemble, label_jumps
+from rigel.decoder import decode
+from rigel.exceptions import AssemblerError
+from rigel.instruction import make_instruction
+from tests.test_code import EXTENDED_ARG_STATEMENT, IF_ELSE_STATEMENT, LOOP_THEN_CALL_STATEMENT
+
+
+@pytest.mark.parametrize('test_input', [LOOP_THEN_CALL_STATEMENT, IF_ELSE_STATEMENT, EXTENDED_ARG_STATEMENT])
+def test_assemble_matches_compiler(test_input):
+    native_code = compile(dedent(test_input), '<string>', 'exec')
+
+    assert assemble(label_jumps(decode(native_code))) == native_code.co_code
+
+
+def test_assemble_grows_jumps():
+    end = Label()
+    stream = [
+        make_instruction('LOAD_NAME', 0, 'flag'),
+        make_instruction('POP_JUMP_IF_FALSE', argval=end),
+        *[make_instruction(opname, 0, None) for _ in range(150) for opname in ('LOAD_CONST', 'POP_TOP')],
+        end,
+        make_instruction('LOAD_CONST', 0, None),
+        make_instruction('RETURN_VALUE'),
+    ]
+
+    code = compile('', '<string>', 'exec').replace(co_code=bytes(assemble(stream)), co_names=('flag',))
+
+    jump = next(instruction for instruction in dis.get_instructions(code) if instruction.opname == 'POP_JUMP_IF_FALSE')
+    assert jump.argval == stream[-2].offset == 2 + 4 + 300 * 2
+    assert stream[1].arg == jump.arg and stream[1].argval == jump.argval
+
+
+def test_assemble_rejects_backward_relative_jump():
+    start = Label()
+    stream = [start, make_instruction('JUMP_FORWARD', argval=start)]
+
+    with pytest.raises(AssemblerError):
+        assemble(stream)
+
+
+def test_assemble_rejects_missing_label():
+    with pytest.raises(AssemblerError):
+        assemble([make_instruction('JUMP_ABSOLUTE', argval=Label())])
@@ -0,0 +1,70 @@
+import dis
+from textwrap import dedent
+
+import pytest
+
+from rigel.buffer import InstructionBuffer, InstructionView
+from rigel.code import Code
+from rigel.instruction import LoadConst, convert
+from rigel.utils import code_diff
+
+
+LOOP_FOR_STATEMENT = """
+a = 0
+for _ in range(10):
+    a += 1
+"""
+
+IF_ELSE_STATEMENT = """
+a = 123
+b = 2
+if a == 0:
+    print(b)
+else:
+    print(a)
+b = 5
+"""
+
+
+@pytest.mark.parametrize('test_input', [LOOP_FOR_STATEMENT, IF_ELSE_STATEMENT])
+def test_buffer_code(test_input):
+    native_code = compile(dedent(test_input), '<string>', 'exec')
+
+    generated_code = Code(instructions=InstructionBuffer(dis.get_instructions(native_code))).code_object()
+
+    assert code_diff(native_code, generated_code) == {}
+
+
+def test_buffer_views():
+    instructions = list(dis.get_instructions(compile(dedent(LOOP_FOR_STATEMENT), '<string>', 'exec')))
+    buffer = InstructionBuffer(instructions)
+
+    assert len(buffer) == len(instructions)
+    for view, instruction in zip(buffer, convert(instructions)):
+        assert isinstance(view, InstructionView)
+        assert isinstance(view, instruction.__class__)
+        assert (view.opname, view.arg, view.argval, view.offset, view.starts_line, view.FLAG) == (
+            instruction.opname, instruction.arg, instruction.argval,
+            instruction.offset, instruction.starts_line, instruction.FLAG,
+        )
+
+    assert buffer[-1] == buffer[len(buffer) - 1]
+    assert buffer[1:3] == [buffer[1], buffer[2]]
+
+
+def test_buffer_interns_by_type():
+    buffer = InstructionBuffer()
+
+    assert len({buffer.intern(value) for value in (1, 1.0, True, 0.0, -0.0, (1,), (1.0,))}) == 7
+    assert buffer.intern((1, 2)) == buffer.intern((1, 2))
+
+
+def test_buffer_view_write():
+    buffer = InstructionBuffer(dis.get_instructions(compile('a = 1', '<string>', 'exec')))
+
+    view = buffer[0]
+    view.argval = 2
+    view.offset = 10
+
+    assert isinstance(view, LoadConst)
+    assert (buffer[0].argval, buffer[0].offset) == (2, 10)
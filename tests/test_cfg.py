@@ -0,0 +1,96 @@
+import dis
+from textwrap import dedent
+
+import pytest
+
+from rigel.cfg import CFGBuilder, For, LeaderCFGBuilder
+from rigel.instruction import convert
+
+
+LOOP_FOR_STATEMENT = """
+a = 0
+for _ in range(10):
+    a += 1
+"""
+
+IF_STATEMENT = """
+a = 123
+if a == 0:
+    a = 1
+b = 5
+"""
+
+TRY_STATEMENT = """
+a = b or c
+try:
+    d = 1
+finally:
+    e = 2
+"""
+
+
+def _instructions(source):
+    return list(convert(dis.get_instructions(compile(dedent(source), '<string>', 'exec'))))
+
+
+@pytest.mark.parametrize('test_input', [LOOP_FOR_STATEMENT, IF_STATEMENT])
+def test_leader_builder_keeps_layout(test_input):
+    instructions = _instructions(test_input)
+
+    cfg = LeaderCFGBuilder().build(instructions)
+
+    assert [instruction for block in cfg.blocks for instruction in block] == instructions
+    assert cfg.co_consts == CFGBuilder().build(_instructions(test_input)).co_consts
+
+
+def test_leader_builder_wires_back_edge():
+    cfg = LeaderCFGBuilder().build(_instructions(LOOP_FOR_STATEMENT))
+
+    loop, = [block for block in cfg.blocks if isinstance(block, For)]
+    body, = [block for block in loop.prev if block is not cfg.start_block]
+
+    assert [instruction.opname for instruction in loop] == ['FOR_ITER']
+    assert list(body)[-1].opname == 'JUMP_ABSOLUTE'
+    assert loop in body.next
+    assert len(loop.next) == 2
+
+
+def test_leader_builder_splits_at_branch_target():
+    cfg = LeaderCFGBuilder().build(_instructions(IF_STATEMENT))
+
+    head, then, tail = cfg.blocks
+
+    assert list(head)[-1].opname == 'POP_JUMP_IF_FALSE'
+    assert head.next == [tail, then]
+    assert then.next == [tail]
+
+
+def test_leader_builder_wires_generic_jumps():
+    cfg = LeaderCFGBuilder().build(_instructions(TRY_STATEMENT))
+
+    jumps = {
+        block.instructions[-1].opname: block for block in cfg.blocks if block.target is not None
+    }
+
+    assert {'JUMP_IF_TRUE_OR_POP', 'SETUP_FINALLY'} <= jumps.keys()
+    for block in jumps.values():
+        assert block.target.instructions[0].offset == block.instructions[-1].argval
+        assert block.target in block.next
+
+
+def test_block_numbers_and_adjacency():
+    cfg = LeaderCFGBuilder().build(_instructions(IF_STATEMENT))
+    head, then, tail = cfg.blocks
+
+    assert [block.number for block in cfg.blocks] == [0, 1, 2]
+    assert not hasattr(head, '__dict__')
+
+    blocks, offsets, targets = cfg.adjacency()
+    assert blocks == cfg.blocks
+    assert [list(targets[offsets[index]:offsets[index + 1]]) for index in range(len(blocks))] == [[2, 1], [2], []]
+
+    blocks, offsets, targets = cfg.adjacency(reverse=True)
+    assert [list(targets[offsets[index]:offsets[index + 1]]) for index in range(len(blocks))] == [[], [0], [0, 1]]
+
+    head.add_exit(tail)
+    assert head.next == [tail, then]
@@ -1,9 +1,12 @@
 import dis
+import marshal
 from textwrap import dedent
+from types import CodeType
 
 import pytest
 
-from rigel.code import Code
+from rigel.code import Code, content_key, rebuild
+from rigel.exceptions import UnknownInstructionError
 from rigel.instruction import convert
 from rigel.utils import code_diff
 
@@ -33,6 +36,36 @@ for _ in range(10):
     a += 1
 """
 
+LOOP_THEN_CALL_STATEMENT = """
+a = 0
+for _ in range(10):
+    a += 1
+print(a, a, a, a)
+"""
+
+EXTENDED_ARG_STATEMENT = "a = 0\n" + "".join(f"""
+a = {index}
+if a == {index}:
+    a = 1
+""" for index in range(300))
+
+NESTED_STATEMENT = """
+class Point:
+    def get(self):
+        return self
+
+def double(value):
+    return value + value
+
+squares = [double(index) for index in range(5)]
+"""
+
+GENERATOR_STATEMENT = """
+def produce(values):
+    yield from values
+    return len(values)
+"""
+
 IF_ELSE_STATEMENT = """
 a = 123
 b = 2
@@ -48,6 +81,7 @@ b = 5
     (CALL_BUILTIN_FN, {}),
     (FUNC_PRINT_STATEMENT, {}),
     (LOOP_FOR_STATEMENT, {}),
+    (LOOP_THEN_CALL_STATEMENT, {}),
     (IF_ELSE_STATEMENT, {}),
 ])
 def test_code(test_input, expected):
@@ -57,3 +91,86 @@ def test_code(test_input, expected):
     generated_code = Code(instructions=list(convert(instructions))).code_object()
 
     assert code_diff(native_code, generated_code) == expected
+
+
+@pytest.mark.parametrize('test_input, expected', [
+    (CALL_BUILTIN_FN, {}),
+    (FUNC_PRINT_STATEMENT, {}),
+    (LOOP_FOR_STATEMENT, {}),
+    (LOOP_THEN_CALL_STATEMENT, {}),
+    (IF_ELSE_STATEMENT, {}),
+    (EXTENDED_ARG_STATEMENT, {}),
+])
+def test_code_from_code(test_input, expected):
+    native_code = compile(dedent(test_input), '<string>', 'exec')
+
+    generated_code = Code.from_code(native_code).code_object()
+
+    assert code_diff(native_code, generated_code) == expected
+
+
+def test_code_without_first_line():
+    native_code = compile(dedent(GENERATOR_STATEMENT), '<string>', 'exec').co_consts[0]
+    assert next(native_code.co_lines())[2] is None
+
+    code = Code.from_code(native_code)
+    generated_code = code.code_object()
+
+    assert generated_code.co_linetable == native_code.co_linetable
+    assert list(generated_code.co_lines()) == list(native_code.co_lines())
+    assert [instruction.starts_line for instruction in code.instructions] == [
+        instruction.starts_line for instruction in convert(dis.get_instructions(native_code))
+    ]
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_rebuild_nested(jobs):
+    native_code = compile(dedent(NESTED_STATEMENT), '<string>', 'exec')
+
+    generated_code = rebuild(native_code, jobs=jobs)
+
+    assert code_diff(native_code, generated_code) == {}
+
+    nested = [const for const in generated_code.co_consts if isinstance(const, CodeType)]
+    assert not set(map(id, nested)) & set(map(id, native_code.co_consts))
+
+    namespace = {}
+    exec(generated_code, namespace)  # pylint: disable=exec-used
+    assert namespace['squares'] == [0, 2, 4, 6, 8]
+    assert namespace['Point']().get().__class__ is namespace['Point']
+
+
+def test_rebuild_memo():
+    memo = {}
+    first = rebuild(compile(dedent(NESTED_STATEMENT), '<string>', 'exec'), memo=memo)
+    second = rebuild(compile(dedent(NESTED_STATEMENT), '<string>', 'exec'), memo=memo)
+
+    assert len(memo) == 4
+    assert all(
+        left is right
+        for left, right in zip(first.co_consts, second.co_consts)
+        if isinstance(left, CodeType)
+    )
+
+
+def test_rebuild_keeps_unknown_instructions():
+    native_code = compile(dedent(NESTED_STATEMENT), '<string>', 'exec')
+    unknown = native_code.replace(co_code=bytes([dis.opname.index('<0>'), 0]) + native_code.co_code)
+    with pytest.raises(UnknownInstructionError):
+        Code.from_code(unknown)
+
+    generated_code = rebuild(unknown)
+
+    assert generated_code.co_code == unknown.co_code
+    nested = [const for const in generated_code.co_consts if isinstance(const, CodeType)]
+    assert nested and not set(map(id, nested)) & set(map(id, native_code.co_consts))
+
+
+def test_content_key_ignores_references():
+    native_code = compile(dedent(FUNC_PRINT_STATEMENT) + 'ratio = 1.5\n', '<string>', 'exec')
+    loaded = marshal.loads(marshal.dumps(native_code))
+    references = [const for const in loaded.co_consts if isinstance(const, float)]
+
+    assert loaded == native_code and references
+    assert marshal.dumps(loaded) != marshal.dumps(native_code)
+    assert content_key(loaded) == content_key(native_code)
@@ -0,0 +1,61 @@
+import marshal
+from importlib.util import cache_from_source
+
+import pytest
+
+from rigel.__main__ import main
+from rigel.compiler import Status, compile_paths
+from rigel.loader import PYC_HEADER, load
+
+
+SOURCES = {
+    'pkg/__init__.py': 'a = 1\nb = a\n',
+    'pkg/sub/loop.py': 'x = 3\nfor _ in range(3):\n    x += 1\n',
+    'pkg/sub/broken.py': 'x = (\n',
+}
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for name, source in SOURCES.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source)
+
+    return tmp_path
+
+
+def _statuses(results):
+    return {result.path.rsplit('/', 1)[-1]: result.status for result in results}
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_compile_paths(tree, jobs):
+    assert _statuses(compile_paths([str(tree)], jobs=jobs)) == {
+        '__init__.py': Status.COMPILED,
+        'loop.py': Status.COMPILED,
+        'broken.py': Status.FAILED,
+    }
+
+    source = tree / 'pkg/sub/loop.py'
+    with open(cache_from_source(str(source)), 'rb') as fp:
+        info = load(fp)
+
+    assert info.unpack_source_size() == source.stat().st_size
+    assert info.unpack_code() == compile(source.read_bytes(), str(source), 'exec')
+
+
+def test_compile_paths_skips_up_to_date(tree):
+    list(compile_paths([str(tree)]))
+
+    assert _statuses(compile_paths([str(tree)]))['loop.py'] is Status.SKIPPED
+    assert _statuses(compile_paths([str(tree)], force=True))['loop.py'] is Status.COMPILED
+
+
+def test_compile_command(tree, capsys):
+    assert main(['compile', '-q', str(tree / 'pkg/__init__.py')]) == 0
+    assert main(['compile', '-q', str(tree)]) == 1
+
+    assert capsys.readouterr().out.splitlines()[-1] == '1 compiled, 1 skipped, 1 failed'
+    with open(cache_from_source(str(tree / 'pkg/__init__.py')), 'rb') as fp:
+        assert marshal.loads(fp.read()[PYC_HEADER:]) == compile('a = 1\nb = a\n', '', 'exec')
@@ -0,0 +1,77 @@
+from textwrap import dedent
+
+from rigel.code import Code
+from rigel.dataflow import available_constants, liveness, reaching_definitions
+from rigel.instruction import make_instruction
+
+
+BRANCH_STATEMENT = """
+def function(a):
+    x = 1
+    y = 2
+    if a:
+        x = 3
+    return x + a
+"""
+
+LOOP_STATEMENT = """
+def function(items):
+    total = 0
+    unused = 0
+    for item in items:
+        total = total + item
+        unused = 1
+    return total
+"""
+
+
+def _cfg(source):
+    module = compile(dedent(source), '<string>', 'exec')
+    return Code.from_code(module.co_consts[0]).cfg
+
+
+def test_liveness_branch():
+    cfg = _cfg(BRANCH_STATEMENT)
+    result = liveness(cfg)
+
+    assert result.live_in(cfg.start_block) == [('fast', 'a')]
+    assert ('fast', 'y') not in result.live_out(cfg.start_block)
+    assert ('fast', 'x') in result.live_out(cfg.start_block)
+
+
+def test_liveness_loop():
+    cfg = _cfg(LOOP_STATEMENT)
+    result = liveness(cfg)
+
+    loop_blocks = [block for block in cfg.blocks if block.instructions[0].opname == 'FOR_ITER']
+    assert ('fast', 'total') in result.live_in(loop_blocks[0])
+    assert all(('fast', 'unused') not in result.live_in(block) for block in cfg.blocks)
+
+
+def test_analysis_follows_instruction_edits():
+    cfg = _cfg(BRANCH_STATEMENT)
+    assert cfg.analysis(liveness).live_in(cfg.start_block) == [('fast', 'a')]
+
+    cfg.start_block.insert(0, make_instruction('POP_TOP'))
+    cfg.start_block.insert(0, make_instruction('LOAD_FAST', 1, 'y'))
+
+    assert cfg.analysis(liveness).live_in(cfg.start_block) == [('fast', 'y'), ('fast', 'a')]
+
+
+def test_reaching_definitions():
+    cfg = _cfg(BRANCH_STATEMENT)
+    result = reaching_definitions(cfg)
+
+    last = cfg.blocks[-1]
+    stores = [instruction.argval for _, _, instruction in result.reaching(last)]
+    assert sorted(stores) == ['x', 'x', 'y']
+    assert [block for block, _, _ in result.reaching(cfg.start_block)] == []
+
+
+def test_available_constants():
+    cfg = _cfg(BRANCH_STATEMENT)
+    result = available_constants(cfg)
+
+    last = cfg.blocks[-1]
+    assert result.constants(last) == {('fast', 'y'): 2}
+    assert result.constants(cfg.start_block) == {}
@@ -0,0 +1,76 @@
+from textwrap import dedent
+
+from rigel.diff import diff_code, identical
+from rigel.utils import code_diff
+from tests.test_code import IF_ELSE_STATEMENT, NESTED_STATEMENT
+
+
+def _compile(source, filename='<string>'):
+    return compile(dedent(source), filename, 'exec')
+
+
+def test_identical_codes():
+    code_a, code_b = _compile(NESTED_STATEMENT), _compile(NESTED_STATEMENT)
+
+    assert code_a is not code_b
+    assert identical(code_a, code_b)
+    assert not diff_code(code_a, code_b)
+    assert code_diff(code_a, code_b) == {}
+
+
+def test_locations_are_compared():
+    code_a, code_b = _compile(NESTED_STATEMENT), _compile(NESTED_STATEMENT, 'other.py')
+
+    assert code_a == code_b
+    assert not identical(code_a, code_b)
+
+    diff = diff_code(code_a, code_b)
+    assert diff.fields == {'co_filename': ('<string>', 'other.py')}
+    assert not diff.instructions
+    assert all(nested.fields == diff.fields for nested in diff.nested.values())
+
+
+def test_minimal_instruction_changes():
+    code_a = _compile(IF_ELSE_STATEMENT)
+    code_b = _compile(IF_ELSE_STATEMENT.replace('print', 'display', 1))
+
+    changes = diff_code(code_a, code_b).instructions
+
+    assert len(changes) == 1
+    assert changes[0].tag == 'replace'
+    assert [instruction.argval for instruction in changes[0].a] == ['print']
+    assert [instruction.argval for instruction in changes[0].b] == ['display']
+
+
+def test_jump_shift_is_not_a_change():
+    code_a = _compile('if a:\n    b = 1\nelse:\n    b = 2\n')
+    code_b = _compile('c = 0\nif a:\n    b = 1\nelse:\n    b = 2\n')
+
+    changes = diff_code(code_a, code_b).instructions
+
+    assert [(change.tag, len(change.a), len(change.b)) for change in changes] == [('insert', 0, 2)]
+
+
+def test_nested_diff():
+    code_a = _compile('def f():\n    return 1\n')
+    code_b = _compile('def f():\n    return 2\n')
+
+    diff = diff_code(code_a, code_b)
+
+    assert not diff.instructions
+    change, = diff.nested['f'].instructions
+    assert (change.a[0].argval, change.b[0].argval) == (1, 2)
+
+
+def test_constants_keep_their_type():
+    changes = diff_code(_compile('a = 1\n'), _compile('a = True\n')).instructions
+
+    assert [(change.a[0].argval, change.b[0].argval) for change in changes] == [(1, True)]
+
+
+def test_arguments_decoded_like_decode():
+    changes = diff_code(_compile("a = f'{b!r}'\n"), _compile("a = f'{b!s}'\n")).instructions
+
+    assert [(change.a[0].argval, change.b[0].argval) for change in changes] == [
+        ((repr, False), (str, False)),
+    ]
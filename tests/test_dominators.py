@@ -0,0 +1,62 @@
+from textwrap import dedent
+
+from rigel.cfg import For
+from rigel.code import Code
+from rigel.dominators import dominator_tree, loop_forest, reverse_postorder
+
+
+NESTED_LOOPS_STATEMENT = """
+total = 0
+for row in rows:
+    for column in row:
+        if column:
+            total = total + column
+while total:
+    total = total - 1
+print(total)
+"""
+
+
+def _cfg(source):
+    return Code.from_code(compile(dedent(source), '<string>', 'exec')).cfg
+
+
+def test_dominators():
+    cfg = _cfg(NESTED_LOOPS_STATEMENT)
+    dominators = dominator_tree(cfg)
+    start = cfg.start_block
+
+    assert reverse_postorder(cfg)[0] is start
+    assert dominators.idom(start) is None
+    for block in dominators.order[1:]:
+        assert dominators.dominates(start, block)
+        assert dominators.dominates(dominators.idom(block), block)
+        assert block in dominators.children(dominators.idom(block))
+        assert not dominators.dominates(block, start)
+
+
+def test_loop_forest():
+    cfg = _cfg(NESTED_LOOPS_STATEMENT)
+    loops = loop_forest(cfg)
+
+    outer, inner = [block for block in cfg.blocks if isinstance(block, For)]
+    assert loops.is_header(outer) and loops.is_header(inner)
+    assert (loops.depth(outer), loops.depth(inner)) == (1, 2)
+    assert loops.loop(inner).parent is loops.loop(outer)
+    assert len(loops.roots) == 2
+
+    assert loops.depth(cfg.start_block) == 0
+    assert not loops.in_loop(cfg.blocks[-1])
+
+
+def test_analyses_follow_edits():
+    cfg = _cfg(NESTED_LOOPS_STATEMENT)
+    loops = loop_forest(cfg)
+    assert loop_forest(cfg) is loops
+
+    outer = next(block for block in cfg.blocks if isinstance(block, For))
+    for back_edge in [block for block in outer.prev if loops.depth(block)]:
+        back_edge.remove_exit(outer)
+
+    assert loop_forest(cfg) is not loops
+    assert loop_forest(cfg).depth(outer) == 0
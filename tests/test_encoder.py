@@ -0,0 +1,103 @@
+from copy import copy
+from textwrap import dedent
+
+import pytest
+
+from rigel.assembler import assemble, label_jumps
+from rigel.cfg import LeaderCFGBuilder, calculate_stack_size
+from rigel.code import Code
+from rigel.encoder import IncrementalEncoder
+from rigel.exceptions import AssemblerError
+from rigel.instruction import make_instruction
+from rigel.lnotab import assemble_lnotab
+from tests.test_code import EXTENDED_ARG_STATEMENT, LOOP_THEN_CALL_STATEMENT
+
+
+def _full_encoding(instructions, firstlineno):
+    instructions = [copy(instruction) for instruction in instructions]
+    stack_size = calculate_stack_size(LeaderCFGBuilder().build(instructions))
+    code = bytes(assemble(label_jumps(instructions)))
+    lnotab = assemble_lnotab(instructions, starts_line=firstlineno, code_size=len(code))
+    return code, lnotab, stack_size
+
+
+def _probe(line):
+    return [make_instruction('LOAD_NAME', 0, 'print', starts_line=line), make_instruction('POP_TOP', starts_line=line)]
+
+
+def test_incremental_encoding_after_edit():
+    code = Code.from_code(compile(dedent(LOOP_THEN_CALL_STATEMENT), '<string>', 'exec'))
+    code.code_object()
+    encoded = dict(code._encoder._encoded)  # pylint: disable=protected-access
+
+    body = code.cfg.blocks[3]
+    for instruction in reversed(_probe(body.instructions[0].starts_line)):
+        body.insert(0, instruction)
+
+    generated = code.code_object()
+
+    assert (generated.co_code, generated.co_linetable, generated.co_stacksize) == _full_encoding(
+        code.instructions, generated.co_firstlineno,
+    )
+    assert [
+        block for block in code.cfg.blocks
+        if code._encoder._encoded[block] is not encoded[block]  # pylint: disable=protected-access
+    ] == [body]
+
+    namespace = {}
+    exec(generated, namespace)  # pylint: disable=exec-used
+    assert namespace['a'] == 10
+
+
+def test_incremental_encoding_grows_jumps():
+    code = Code.from_code(compile(dedent(EXTENDED_ARG_STATEMENT), '<string>', 'exec'))
+    code.code_object()
+
+    block = code.cfg.blocks[1]
+    for _ in range(200):
+        block.add(make_instruction('LOAD_CONST', 0, 0, starts_line=block.instructions[-1].starts_line))
+        block.add(make_instruction('POP_TOP', starts_line=block.instructions[-1].starts_line))
+
+    generated = code.code_object()
+
+    assert (generated.co_code, generated.co_linetable, generated.co_stacksize) == _full_encoding(
+        code.instructions, generated.co_firstlineno,
+    )
+
+
+def test_incremental_encoding_rejects_code_after_jump():
+    code = Code.from_code(compile(dedent(LOOP_THEN_CALL_STATEMENT), '<string>', 'exec'))
+    block = next(block for block in code.cfg.blocks if block.target is not None)
+    block.add(make_instruction('NOP'))
+
+    with pytest.raises(AssemblerError, match='does not end with a jump'):
+        code.code_object()
+
+
+def test_incremental_encoding_rejects_jump_without_target():
+    code = Code.from_code(compile(dedent(LOOP_THEN_CALL_STATEMENT), '<string>', 'exec'))
+    code.code_object()
+    block = next(block for block in code.cfg.blocks if block.target is not None)
+    block.target = None
+
+    with pytest.raises(AssemblerError, match='has no target'):
+        code.code_object()
+
+
+def test_incremental_encoding_rejects_backward_relative_jump():
+    code = Code.from_code(compile(dedent(LOOP_THEN_CALL_STATEMENT), '<string>', 'exec'))
+    code.code_object()
+    block = next(block for block in code.cfg.blocks if block.instructions[-1].opname == 'FOR_ITER')
+    block.target = code.cfg.start_block
+
+    with pytest.raises(AssemblerError, match='Relative jump backwards'):
+        code.code_object()
+
+
+def test_incremental_encoding_of_empty_graph():
+    code = Code.from_code(compile('a = 1\n', '<string>', 'exec'))
+    encoder = IncrementalEncoder(code.cfg)
+    encoder.encode(1)
+    code.cfg.remove_blocks(set(code.cfg.blocks))
+
+    assert encoder.encode(1) == (b'', b'', 0)
@@ -0,0 +1,136 @@
+from textwrap import dedent
+
+import pytest
+
+from rigel.code import Code
+from rigel.hoisting import Assumption, hoist_code, hoist_invariants
+
+
+SOURCE = dedent('''
+    class Collector:
+        def __init__(self):
+            self.items = []
+
+        def collect(self, rows):
+            for row in rows:
+                for value in row:
+                    self.items.append(len(value) + abs(len(row)))
+            return self.items
+
+    def rebinds(values):
+        out = []
+        for value in values:
+            out.append(value)
+            out = [value]
+        return out
+
+    def stores_attribute(counter, values):
+        for value in values:
+            counter.total.add(value)
+            counter.total = {value}
+        return counter.total
+
+    class Counter:
+        def __init__(self):
+            self.total = set()
+
+    def guarded(item, values):
+        out = []
+        for value in values:
+            out.append(value)
+            if item is not None:
+                out.append(item.value)
+        return out
+
+    def produce(values):
+        for value in values:
+            yield LIMIT
+''')
+
+
+def _namespace():
+    namespace = {}
+    exec(compile(SOURCE, '<hoisting>', 'exec'), namespace)  # pylint: disable=exec-used
+    return namespace
+
+
+def _hoisted(function, assumption):
+    return function.__class__(hoist_code(function.__code__, assumption), function.__globals__)
+
+
+def _loop_opnames(code):
+    """Opnames after the first `FOR_ITER`."""
+    opnames = [instruction.opname for instruction in Code.from_code(code).instructions]
+    return opnames[opnames.index('FOR_ITER'):]
+
+
+@pytest.mark.parametrize('assumption', list(Assumption))
+def test_hoisted_results(assumption):
+    namespace = _namespace()
+    collect, rebinds, stores_attribute = (
+        namespace['Collector'].collect, namespace['rebinds'], namespace['stores_attribute'],
+    )
+    rows = [['a', 'bc'], ['def']]
+
+    assert _hoisted(collect, assumption)(namespace['Collector'](), rows) == collect(namespace['Collector'](), rows)
+    assert _hoisted(rebinds, assumption)([1, 2, 3]) == rebinds([1, 2, 3])
+    assert (
+        _hoisted(stores_attribute, assumption)(namespace['Counter'](), [1, 2])
+        == stores_attribute(namespace['Counter'](), [1, 2])
+    )
+
+
+def test_globals_leave_the_loop():
+    collect = _namespace()['Collector'].collect
+    code = hoist_code(collect.__code__, Assumption.GLOBALS)
+
+    assert 'LOAD_GLOBAL' not in _loop_opnames(code)
+    assert {'.len', '.abs'} <= set(code.co_varnames)
+    assert 'LOAD_METHOD' in _loop_opnames(code)
+
+
+def test_method_chain_becomes_a_call():
+    collect = _namespace()['Collector'].collect
+    code = hoist_code(collect.__code__, Assumption.ATTRIBUTES)
+    loop = _loop_opnames(code)
+
+    assert '.self.items.append' in code.co_varnames
+    assert 'LOAD_METHOD' not in loop
+    assert 'CALL_METHOD' not in loop
+    assert 'LOAD_ATTR' not in loop[:-len(['LOAD_FAST', 'LOAD_ATTR', 'RETURN_VALUE'])]
+
+
+def test_stored_names_stay():
+    namespace = _namespace()
+
+    assert '.out.append' not in hoist_code(namespace['rebinds'].__code__, Assumption.ATTRIBUTES).co_varnames
+    assert '.counter.total.add' not in hoist_code(
+        namespace['stores_attribute'].__code__, Assumption.ATTRIBUTES,
+    ).co_varnames
+
+
+def test_module_code_unchanged():
+    code = Code.from_code(compile('for value in values:\n    print(value)\n', '<module>', 'exec'))
+
+    assert hoist_invariants(code) is code
+
+
+def test_guarded_chains_stay():
+    guarded = _namespace()['guarded']
+    code = hoist_code(guarded.__code__, Assumption.ATTRIBUTES)
+
+    assert _hoisted(guarded, Assumption.ATTRIBUTES)(None, [1, 2]) == [1, 2]
+    assert '.item.value' not in code.co_varnames
+    assert '.out.append' in code.co_varnames
+
+
+def test_yielding_loops_stay():
+    namespace = _namespace()
+    namespace['LIMIT'] = 1
+
+    seen = []
+    for value in _hoisted(namespace['produce'], Assumption.GLOBALS)([1, 2, 3]):
+        seen.append(value)
+        namespace['LIMIT'] += 1
+
+    assert seen == [1, 2, 3]
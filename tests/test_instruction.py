@@ -0,0 +1,86 @@
+import dis
+import subprocess
+import sys
+from textwrap import dedent
+
+import pytest
+
+from rigel.code import Code
+from rigel.decoder import decode
+from rigel.instruction import PYTHON_OPCODE_INSTRUCTION_MAP, BaseInstruction, IFlag, LoadName, convert
+from tests.test_code import EXTENDED_ARG_STATEMENT
+
+
+TRY_STATEMENT = """
+def parse(values):
+    result = []
+    for value in values:
+        try:
+            result.append(int(value.strip()))
+        except ValueError:
+            continue
+        finally:
+            result.sort()
+    return {'result': result, 'count': len(result)}
+"""
+
+
+@pytest.mark.parametrize('opname', ['LOAD_ATTR', 'SETUP_FINALLY', 'LOAD_DEREF', 'JUMP_IF_TRUE_OR_POP', 'RERAISE'])
+def test_generated_instruction_class(opname):
+    instruction_class = PYTHON_OPCODE_INSTRUCTION_MAP[dis.opmap[opname]]
+
+    assert instruction_class is PYTHON_OPCODE_INSTRUCTION_MAP[dis.opmap[opname]]
+    assert issubclass(instruction_class, BaseInstruction)
+    assert bool(instruction_class.FLAG & IFlag.HAS_NAME) == (dis.opmap[opname] in dis.hasname)
+    assert bool(instruction_class.FLAG & IFlag.HAS_JREL) == (dis.opmap[opname] in dis.hasjrel)
+    assert bool(instruction_class.FLAG & IFlag.HAS_JABS) == (dis.opmap[opname] in dis.hasjabs)
+    assert bool(instruction_class.FLAG & IFlag.HAS_FREE) == (dis.opmap[opname] in dis.hasfree)
+
+
+def test_unknown_opcode():
+    unknown = dis.opname.index('<0>')
+
+    assert unknown not in PYTHON_OPCODE_INSTRUCTION_MAP
+    assert PYTHON_OPCODE_INSTRUCTION_MAP.get(unknown) is None
+    with pytest.raises(KeyError):
+        PYTHON_OPCODE_INSTRUCTION_MAP[unknown]  # pylint: disable=pointless-statement
+
+
+def test_properties_only_on_root():
+    assert 'has_const' in BaseInstruction.__dict__
+    assert 'has_const' not in LoadName.__dict__
+    assert PYTHON_OPCODE_INSTRUCTION_MAP[dis.opmap['LOAD_NAME']] is LoadName
+
+
+def test_generic_instructions_round_trip():
+    native_code = compile(dedent(TRY_STATEMENT), '<string>', 'exec')
+    native_parse = native_code.co_consts[0]
+
+    generated_parse = Code.from_code(native_parse).code_object()
+
+    assert generated_parse.co_code == native_parse.co_code
+    assert generated_parse.co_stacksize == native_parse.co_stacksize
+
+    namespace = {}
+    exec(native_code.replace(co_consts=(generated_parse, *native_code.co_consts[1:])), namespace)  # pylint: disable=exec-used
+    assert namespace['parse'](['3', ' 1', 'x']) == {'result': [1, 3], 'count': 2}
+
+
+def test_convert_folds_extended_arg():
+    native_code = compile(EXTENDED_ARG_STATEMENT, '<string>', 'exec')
+
+    converted = list(convert(dis.get_instructions(native_code)))
+
+    assert 'EXTENDED_ARG' not in {instruction.opname for instruction in converted}
+    assert [
+        (instruction.offset, instruction.arg, instruction.is_jump_target) for instruction in converted
+    ] == [
+        (instruction.offset, instruction.arg, instruction.is_jump_target) for instruction in decode(native_code)
+    ]
+
+
+def test_import_is_lazy():
+    script = 'import sys, rigel; print(sorted(name for name in sys.modules if name.startswith("rigel")))'
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+
+    assert output.strip() == "['rigel']"
@@ -0,0 +1,168 @@
+import importlib
+import marshal
+import os
+import sys
+
+import pytest
+
+from rigel.instrumentation.cache import CodeCache
+from rigel.instrumentation.loader import RigelSourceFileLoader, instrument_imports
+from rigel.interning import Interner
+
+
+MODULE = 'rigel_instrumented_module'
+
+
+class ReplaceConst:
+    fingerprint = 'replace-const-1'
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, code):
+        self.calls += 1
+        return code.replace(co_consts=tuple(2 if const == 1 else const for const in code.co_consts))
+
+
+@pytest.fixture
+def module_path(tmp_path, monkeypatch):
+    (tmp_path / f'{MODULE}.py').write_text('VALUE = 1\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    importlib.invalidate_caches()
+
+    yield tmp_path
+
+    sys.modules.pop(MODULE, None)
+
+
+def _import():
+    sys.modules.pop(MODULE, None)
+    return importlib.import_module(MODULE)
+
+
+def test_import_hook_transform(module_path):
+    transform = ReplaceConst()
+
+    with instrument_imports(transform=transform):
+        module = _import()
+
+    assert module.VALUE == 2
+    assert isinstance(module.__loader__, RigelSourceFileLoader)
+    assert transform.calls == 1
+
+
+def test_import_hook_cache(module_path, tmp_path):
+    transform = ReplaceConst()
+    cache = CodeCache(str(tmp_path / 'cache'))
+
+    with instrument_imports(transform=transform, cache=cache):
+        assert _import().VALUE == 2
+        assert _import().VALUE == 2
+
+    assert transform.calls == 1
+
+    (module_path / f'{MODULE}.py').write_text('VALUE = 1\nOTHER = 1\n')
+    with instrument_imports(transform=transform, cache=cache):
+        assert _import().OTHER == 2
+
+    assert transform.calls == 2
+
+
+def test_import_hook_cache_identical_modules(tmp_path, monkeypatch):
+    names = []
+    for directory, name in (('a', 'rigel_identical_first'), ('b', 'rigel_identical_second')):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / f'{name}.py').write_text('VALUE = 1\n\n\ndef get():\n    return VALUE\n')
+        monkeypatch.syspath_prepend(str(tmp_path / directory))
+        names.append(name)
+    importlib.invalidate_caches()
+
+    transform = ReplaceConst()
+    cache = CodeCache(str(tmp_path / 'cache'))
+    try:
+        for _ in range(2):
+            with instrument_imports(transform=transform, cache=cache):
+                modules = [importlib.import_module(name) for name in names]
+
+            for module in modules:
+                assert module.get() == 2
+                assert module.get.__code__.co_filename == module.__file__
+                sys.modules.pop(module.__name__)
+    finally:
+        for name in names:
+            sys.modules.pop(name, None)
+
+    assert transform.calls == 2
+
+
+def test_import_hook_interner(module_path):
+    (module_path / f'{MODULE}.py').write_text('def get(self):\n    return self\n')
+    interner = Interner()
+
+    with instrument_imports(interner=interner):
+        first = _import()
+        second = _import()
+
+    assert first is not second
+    assert first.get.__code__ is second.get.__code__
+    assert interner.stats.code_hits == 2
+
+
+def test_code_cache_evicts_least_recently_used(tmp_path):
+    code = compile('VALUE = 1', '<string>', 'exec')
+    cache = CodeCache(str(tmp_path), max_size=len(marshal.dumps(code)) * 5 // 2)
+
+    cache.put('aa01', code)
+    cache.put('aa02', code)
+    os.utime(tmp_path / 'aa' / '01', (100, 100))
+    os.utime(tmp_path / 'aa' / '02', (200, 200))
+
+    assert cache.get('aa01') == code
+
+    cache.put('aa03', code)
+
+    assert cache.get('aa02') is None
+    assert cache.get('aa01') == cache.get('aa03') == code
+
+
+def test_import_hook_profile(module_path):
+    package = module_path / 'rigel_profiled'
+    package.mkdir()
+    (package / '__init__.py').write_text('from . import child\n')
+    (package / 'child.py').write_text('VALUE = 1\n')
+
+    try:
+        with instrument_imports(profile=True) as hook:
+            importlib.import_module('rigel_profiled')
+    finally:
+        for name in ('rigel_profiled', 'rigel_profiled.child'):
+            sys.modules.pop(name, None)
+
+    profiler = hook.profiler
+    root, = [record for record in profiler.roots if record.name == 'rigel_profiled']
+    child, = root.children
+
+    assert (child.name, child.parent) == ('rigel_profiled.child', 'rigel_profiled')
+    assert child.bytecode_size > 0
+    assert root.exec_ns >= child.total_ns
+    assert root.self_ns == root.total_ns - child.total_ns
+    assert profiler.top(1, key='total_ns') == [root]
+    assert 'rigel_profiled.child' in profiler.format_tree()
+    assert {event['cat'] for event in profiler.chrome_trace()['traceEvents']} == {'find', 'load', 'exec'}
+
+
+def test_import_hook_profile_reimport(module_path):
+    with instrument_imports(profile=True) as hook:
+        _import()
+        _import()
+
+    profiler = hook.profiler
+    first, second = [record for record in profiler.roots if record.name == MODULE]
+
+    assert first is not second
+    assert [record for record in profiler.records if record.name == MODULE] == [first, second]
+    assert first.exec_start < second.find_start
+    assert profiler.format_tree().count(MODULE) == 2
+    assert sum(
+        event['name'] == MODULE and event['cat'] == 'exec' for event in profiler.chrome_trace()['traceEvents']
+    ) == 2
@@ -0,0 +1,54 @@
+from types import CodeType
+
+from rigel.interning import Interner
+
+
+SOURCE = """
+TABLE = tuple(range(100))
+PAIRS = ((1, 2.0), (1.0, 2), (True, 2))
+
+def get(self):
+    return self._value
+
+handler = lambda event: event.kind
+"""
+
+
+def _nested(code):
+    return {const.co_name: const for const in code.co_consts if isinstance(const, CodeType)}
+
+
+def test_intern_across_modules():
+    interner = Interner()
+
+    first = interner.intern_code(compile(SOURCE, 'first.py', 'exec'))
+    second = interner.intern_code(compile(SOURCE + '\nEXTRA = 1\n', 'second.py', 'exec'))
+
+    assert first is not second
+    assert _nested(first)['get'] is _nested(second)['get']
+    assert _nested(first)['<lambda>'] is _nested(second)['<lambda>']
+    assert interner.stats.code_hits == 2
+    assert interner.stats.bytes_saved > 0
+
+    namespace = {}
+    exec(second, namespace)  # pylint: disable=exec-used
+    assert namespace['get'].__code__.co_filename == 'first.py'
+
+
+def test_intern_keeps_types_apart():
+    interner = Interner()
+
+    pairs = interner.intern(((1, 2.0), (1.0, 2), (True, 2)))
+
+    assert [tuple(map(type, pair)) for pair in pairs] == [(int, float), (float, int), (bool, int)]
+    assert interner.intern((1, 2.0)) is pairs[0]
+
+
+def test_intern_with_locations():
+    interner = Interner(locations=True)
+
+    first = interner.intern_code(compile(SOURCE, 'first.py', 'exec'))
+    second = interner.intern_code(compile(SOURCE, 'second.py', 'exec'))
+
+    assert _nested(first)['get'] is not _nested(second)['get']
+    assert interner.stats.code_hits == 0
@@ -0,0 +1,95 @@
+import importlib
+import sys
+from textwrap import dedent
+from types import CodeType
+
+import pytest
+
+from rigel.instrumentation.loader import instrument_imports
+from rigel.lifting import LOOP_NAME, lift_module_loops
+
+
+MODULE = 'rigel_lifted_module'
+
+SOURCE = dedent('''
+    total = 0
+    squares = []
+
+    def scaled(value):
+        return value * factor
+
+    factor = 2
+    for index in range(10):
+        square = index * index
+        squares.append(square)
+        total += scaled(square)
+        if total > 100:
+            break
+
+    count = 0
+    while count < 3:
+        count += 1
+        factor += 1
+''')
+
+
+def _run(code):
+    namespace = {}
+    exec(code, namespace)  # pylint: disable=exec-used
+    namespace.pop('__builtins__')
+    return {name: value for name, value in namespace.items() if not callable(value)}
+
+
+def _loops(code):
+    return [const for const in code.co_consts if isinstance(const, CodeType) and const.co_name == LOOP_NAME]
+
+
+def test_lifted_results():
+    code = compile(SOURCE, '<lifting>', 'exec')
+    lifted = lift_module_loops(code)
+    original, result = _run(code), _run(lifted)
+
+    assert len(_loops(lifted)) == 2
+    assert result == {name: value for name, value in original.items() if name not in ('index', 'square')}
+
+
+def test_fast_locals():
+    for_loop, while_loop = _loops(lift_module_loops(compile(SOURCE, '<lifting>', 'exec')))
+
+    assert for_loop.co_varnames == ('.0', 'index', 'square', 'total')
+    assert while_loop.co_varnames == ('count',)
+    assert 'factor' in while_loop.co_names
+
+
+def test_unbound_escaping_name_stays_global():
+    code = compile('for value in values:\n    last = value\nprint(last)\n', '<lifting>', 'exec')
+    loop, = _loops(lift_module_loops(code))
+
+    assert loop.co_varnames == ('.0', 'value')
+    assert 'last' in loop.co_names
+
+
+@pytest.mark.parametrize('source', [
+    'try:\n    for value in values:\n        pass\nexcept ValueError:\n    pass\n',
+    'for value in values:\n    print(locals())\n',
+    'def f():\n    for value in values:\n        pass\n',
+])
+def test_not_lifted(source):
+    code = compile(source, '<lifting>', 'exec')
+
+    assert lift_module_loops(code) is code
+
+
+def test_import_hook(tmp_path, monkeypatch):
+    (tmp_path / f'{MODULE}.py').write_text(SOURCE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    importlib.invalidate_caches()
+
+    try:
+        with instrument_imports(transform=lift_module_loops):
+            module = importlib.import_module(MODULE)
+    finally:
+        sys.modules.pop(MODULE, None)
+
+    assert (module.total, module.count, module.factor) == (110, 3, 5)
+    assert not hasattr(module, 'square')
@@ -0,0 +1,66 @@
+import gc
+from textwrap import dedent
+
+import pytest
+
+from rigel.code import Code
+from rigel.lnotab import LineTable, _line_tables, assemble_lnotab, line_table
+from tests.test_code import EXTENDED_ARG_STATEMENT, IF_ELSE_STATEMENT, LOOP_THEN_CALL_STATEMENT
+
+
+LONG_LINE_STATEMENT = 'a = 1\n' + '\n' * 300 + '; '.join(f'b_{index} = {index}' for index in range(100)) + '\nc = 2\n'
+
+
+def _merged_lines(code):
+    merged = []
+    for start, end, line in code.co_lines():
+        if merged and merged[-1][2] == line and merged[-1][1] == start:
+            merged[-1] = (merged[-1][0], end, line)
+        elif start != end:
+            merged.append((start, end, line))
+
+    return merged
+
+
+@pytest.mark.parametrize('statement', [
+    LOOP_THEN_CALL_STATEMENT, EXTENDED_ARG_STATEMENT, IF_ELSE_STATEMENT, LONG_LINE_STATEMENT,
+])
+def test_line_table_matches_co_lines(statement):
+    code = compile(dedent(statement), '<string>', 'exec')
+    table = LineTable.from_code(code)
+
+    assert list(table) == _merged_lines(code)
+    for start, end, line in code.co_lines():
+        for offset in range(start, end, 2):
+            assert table.line(offset) == line
+
+    for line in table.lines():
+        assert table.ranges(line) == [(start, end) for start, end, current in table if current == line]
+
+
+def test_line_table_out_of_code():
+    code = compile('a = 1\nb = 2\n', '<string>', 'exec')
+    table = LineTable.from_code(code)
+
+    assert table.line(-2) is None
+    assert table.line(len(code.co_code)) is None
+    assert table.ranges(100) == []
+
+
+def test_assemble_lnotab_round_trip():
+    code = compile(LONG_LINE_STATEMENT, '<string>', 'exec')
+    instructions = Code.from_code(code).instructions
+
+    assert assemble_lnotab(instructions, code.co_firstlineno, len(code.co_code)) == code.co_linetable
+
+
+def test_line_table_cached_per_code_object():
+    code = compile('a = 1\n', '<string>', 'exec')
+    key = id(code)
+
+    assert line_table(code) is line_table(code)
+    assert key in _line_tables
+
+    del code
+    gc.collect()
+    assert key not in _line_tables
@@ -0,0 +1,54 @@
+import py_compile
+
+import pytest
+
+from rigel.exceptions import PycError
+from rigel.loader import PYTHON_VERSION, HeaderIndex, PycFile, dump, read_header
+
+
+CODE = compile('a = 1\nb = a\n', '<string>', 'exec')
+
+
+@pytest.fixture
+def pyc(tmp_path):
+    path = tmp_path / 'module.pyc'
+    with open(path, 'wb') as fp:
+        dump(CODE, fp, version=PYTHON_VERSION, modified=1_700_000_000, source_size=12)
+
+    return path
+
+
+def test_pyc_file(pyc):
+    with PycFile(pyc) as pyc_file:
+        assert pyc_file.header.python_version == PYTHON_VERSION
+        assert (pyc_file.header.modified, pyc_file.header.source_size) == (1_700_000_000, 12)
+        assert not pyc_file.header.hash_based
+        assert pyc_file.code == CODE
+
+
+def test_pyc_file_rejects_garbage(tmp_path):
+    (tmp_path / 'empty.pyc').write_bytes(b'')
+    (tmp_path / 'short.pyc').write_bytes(b'\x6f\x0d')
+
+    for name in ('empty.pyc', 'short.pyc'):
+        with pytest.raises(PycError):
+            PycFile(tmp_path / name)
+
+
+def test_header_index(tmp_path, pyc):
+    source = tmp_path / 'pkg' / 'hashed.py'
+    source.parent.mkdir()
+    source.write_text('x = 1\n')
+    hashed = py_compile.compile(
+        str(source),
+        cfile=str(source.with_suffix('.pyc')),
+        invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH,
+    )
+    (tmp_path / 'pkg' / 'junk.pyc').write_bytes(b'junk')
+
+    index = HeaderIndex.build(tmp_path)
+
+    assert sorted(path for path, _ in index) == sorted([str(pyc), hashed])
+    assert dict(index)[str(pyc)] == read_header(pyc)
+    assert dict(index)[hashed].hash_based
+    assert dict(index)[hashed].source_hash == read_header(hashed).source_hash != b''
@@ -0,0 +1,171 @@
+import contextlib
+import dis
+import io
+from textwrap import dedent
+from types import CodeType
+
+import pytest
+
+from rigel.code import Code
+from rigel.instruction import make_instruction
+from rigel.optimizer import PASSES, fold_constants, optimize, optimize_code, remove_dead_const_loads
+from rigel.pool import Pool
+from tests.test_code import (
+    CALL_BUILTIN_FN,
+    EXTENDED_ARG_STATEMENT,
+    FUNC_PRINT_STATEMENT,
+    IF_ELSE_STATEMENT,
+    LOOP_FOR_STATEMENT,
+    LOOP_THEN_CALL_STATEMENT,
+)
+
+
+def _code(*specs):
+    """Assemble `(opname, argval)` pairs, jump argvals are target offsets."""
+    consts, names, instructions = [], [], []
+
+    for position, (opname, argval) in enumerate(specs):
+        offset = position * 2
+        instruction = make_instruction(opname, argval=argval, offset=offset, starts_line=1)
+
+        if instruction.has_const or instruction.has_name:
+            table = consts if instruction.has_const else names
+            if argval not in table:
+                table.append(argval)
+            instruction.arg = table.index(argval)
+        elif instruction.has_jabs:
+            instruction.arg = argval // 2
+        elif instruction.has_jrel:
+            instruction.arg = (argval - offset - 2) // 2
+
+        instructions.append(instruction)
+
+    return Code(instructions=instructions)
+
+
+def _run(code, **namespace):
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        exec(code, namespace)  # pylint: disable=exec-used
+
+    namespace.pop('__builtins__')
+    return {name: getattr(value, '__qualname__', value) for name, value in namespace.items()}, stdout.getvalue()
+
+
+def _opnames(code):
+    return [instruction.opname for instruction in code.instructions]
+
+
+def test_fold_constants():
+    code = _code(
+        ('LOAD_CONST', 2),
+        ('LOAD_CONST', 3),
+        ('BINARY_MULTIPLY', None),
+        ('LOAD_CONST', 1),
+        ('BINARY_ADD', None),
+        ('STORE_NAME', 'x'),
+        ('LOAD_CONST', 1),
+        ('LOAD_CONST', 0),
+        ('BINARY_TRUE_DIVIDE', None),
+        ('STORE_NAME', 'y'),
+        ('LOAD_CONST', None),
+        ('RETURN_VALUE', None),
+    )
+
+    optimized = optimize(code)
+
+    assert _opnames(optimized)[:2] == ['LOAD_CONST', 'STORE_NAME']
+    assert optimized.instructions[0].argval == 7
+    assert optimized.code_object().co_consts[optimized.instructions[0].arg] == 7
+    assert _opnames(optimized).count('BINARY_TRUE_DIVIDE') == 1
+    with pytest.raises(ZeroDivisionError):
+        exec(optimized.code_object(), {})  # pylint: disable=exec-used
+
+
+def test_remove_dead_const_loads():
+    code = _code(
+        ('LOAD_CONST', 'docstring'),
+        ('POP_TOP', None),
+        ('LOAD_CONST', 4),
+        ('LOAD_CONST', 5),
+        ('BINARY_ADD', None),
+        ('POP_TOP', None),
+        ('LOAD_CONST', None),
+        ('RETURN_VALUE', None),
+    )
+
+    optimized = optimize(code)
+
+    assert _opnames(optimized) == ['LOAD_CONST', 'RETURN_VALUE']
+    assert _run(optimized.code_object()) == ({}, '')
+
+
+def test_thread_jumps_and_remove_unreachable():
+    code = _code(
+        ('LOAD_NAME', 'flag'),
+        ('POP_JUMP_IF_FALSE', 10),
+        ('LOAD_CONST', 'yes'),
+        ('STORE_NAME', 'result'),
+        ('JUMP_FORWARD', 12),
+        ('JUMP_ABSOLUTE', 14),
+        ('JUMP_ABSOLUTE', 18),
+        ('LOAD_CONST', 'no'),
+        ('STORE_NAME', 'result'),
+        ('LOAD_CONST', None),
+        ('RETURN_VALUE', None),
+        ('LOAD_CONST', 'dead'),
+        ('RETURN_VALUE', None),
+    )
+
+    optimized = optimize(code)
+
+    assert _opnames(optimized).count('JUMP_ABSOLUTE') == 0
+    assert 'dead' not in [instruction.argval for instruction in optimized.instructions]
+    for flag in (True, False):
+        assert _run(optimized.code_object(), flag=flag) == _run(code.code_object(), flag=flag)
+
+
+@pytest.mark.parametrize('pass_', [fold_constants, remove_dead_const_loads])
+def test_unchanged_blocks_stay_clean(pass_):
+    code = Code.from_code(compile(dedent(LOOP_THEN_CALL_STATEMENT), '<string>', 'exec'))
+    code.code_object()
+    version = code.cfg.version
+
+    assert not pass_(code.cfg, Pool(code.consts))
+    assert code.cfg.version == version
+    assert not any(block.dirty for block in code.cfg.blocks)
+
+
+def test_optimize_nested_code():
+    inner = _code(
+        ('LOAD_CONST', 6),
+        ('LOAD_CONST', 7),
+        ('BINARY_MULTIPLY', None),
+        ('RETURN_VALUE', None),
+    ).code_object().replace(co_name='answer')
+    native_code = compile('def answer():\n    pass\n', '<string>', 'exec')
+    native_code = native_code.replace(co_consts=tuple(
+        inner if isinstance(const, CodeType) else const for const in native_code.co_consts
+    ))
+
+    optimized = optimize_code(native_code, PASSES)
+    nested = next(const for const in optimized.co_consts if isinstance(const, CodeType))
+
+    assert 'BINARY_MULTIPLY' not in [instruction.opname for instruction in dis.get_instructions(nested)]
+    namespace = {}
+    exec(optimized, namespace)  # pylint: disable=exec-used
+    assert namespace['answer']() == 42
+
+
+@pytest.mark.parametrize('test_input', [
+    CALL_BUILTIN_FN,
+    FUNC_PRINT_STATEMENT,
+    LOOP_FOR_STATEMENT,
+    LOOP_THEN_CALL_STATEMENT,
+    IF_ELSE_STATEMENT,
+    EXTENDED_ARG_STATEMENT,
+])
+def test_optimized_code_behaves_the_same(test_input):
+    native_code = compile(dedent(test_input), '<string>', 'exec')
+
+    assert _run(optimize_code(native_code)) == _run(native_code)
@@ -0,0 +1,74 @@
+import dis
+
+import pytest
+
+from rigel.cfg import LeaderCFGBuilder
+from rigel.code import Code, make_code_object
+from rigel.instruction import convert, make_instruction
+from rigel.pool import Pool, const_key
+
+
+@pytest.mark.parametrize('left, right', [
+    (1, 1.0),
+    (1, True),
+    (0, False),
+    (0.0, -0.0),
+    (0j, -0j),
+    ((1, (2,)), (1, (2.0,))),
+    (frozenset({1}), frozenset({True})),
+    (compile('1', '<a>', 'eval'), compile('1', '<b>', 'eval')),
+])
+def test_const_key_tells_equal_values_apart(left, right):
+    assert const_key(left) != const_key(right)
+    assert const_key(left) == const_key(left)
+
+
+def test_pool():
+    pool = Pool([None, 1])
+
+    assert pool.index(1) == 1
+    assert pool.index(1.0) == 2
+    assert pool.index(True) == 3
+    assert pool.index(1.0) == 2
+    assert pool.as_tuple() == (None, 1, 1.0, True)
+    assert pool.as_tuple() is pool.as_tuple()
+    assert -0.0 not in pool
+    assert pool[2].__class__ is float
+
+
+SOURCE = 'a = 1\nb = 1.0\nc = True\nd = 0\ne = -0.0\nf = 0.0\ng = (1, (1.0, False))\nh = b\n'
+
+
+def test_cfg_pools():
+    cfg = LeaderCFGBuilder().build(list(convert(dis.get_instructions(compile(SOURCE, '<pool>', 'exec')))))
+
+    assert [const_key(const) for const in cfg.co_consts] == [
+        const_key(const) for const in (1, 1.0, True, 0, -0.0, 0.0, (1, (1.0, False)), None)
+    ]
+    assert cfg.co_consts is cfg.co_consts
+    assert cfg.co_names == ('a', 'b', 'c', 'd', 'e', 'f', 'g', 'h')
+
+
+def test_cfg_pools_follow_instruction_edits():
+    code = Code(list(convert(dis.get_instructions(compile('a = 1', '<pool>', 'exec')))))
+    assert code.consts == (1, None)
+
+    block = code.cfg.blocks[0]
+    block.insert(0, make_instruction('POP_TOP'))
+    block.insert(0, make_instruction('LOAD_CONST', 0, 2))
+
+    assert code.consts == (2, 1, None)
+    assert code.code_object().co_consts == code.consts
+
+
+def test_arguments_are_remapped():
+    code = make_code_object(list(dis.get_instructions(compile(SOURCE, '<pool>', 'exec'))))
+
+    namespace = {}
+    exec(code, namespace)  # pylint: disable=exec-used
+    namespace.pop('__builtins__')
+
+    assert {name: const_key(value) for name, value in namespace.items()} == {
+        'a': const_key(1), 'b': const_key(1.0), 'c': const_key(True), 'd': const_key(0),
+        'e': const_key(-0.0), 'f': const_key(0.0), 'g': const_key((1, (1.0, False))), 'h': const_key(1.0),
+    }
@@ -0,0 +1,35 @@
+import dis
+
+import pytest
+
+from rigel import stack
+from rigel.stack import CLOSED_FORMS, JUMP_STACK_EFFECTS, STACK_EFFECTS, stack_effect
+
+
+ARGS = (0, 1, 2, 3, 5, 7, 0x0f, 0xff, 0x100, 0x1234)
+
+
+@pytest.mark.parametrize('opcode_', [opcode_ for opcode_ in range(256) if STACK_EFFECTS[opcode_] is not None])
+@pytest.mark.parametrize('jump', [False, True])
+def test_stack_effect_matches_dis(opcode_, jump):
+    for arg in ARGS if opcode_ >= dis.HAVE_ARGUMENT else (None,):
+        assert stack_effect(opcode_, arg, jump=jump) == dis.stack_effect(opcode_, arg, jump=jump)
+
+
+def test_stack_effect_unknown_opcode():
+    unknown = next(opcode_ for opcode_ in range(256) if JUMP_STACK_EFFECTS[opcode_] is None)
+
+    with pytest.raises(ValueError):
+        stack_effect(unknown)
+
+
+@pytest.mark.parametrize('opname', sorted(CLOSED_FORMS.keys() & dis.opmap.keys()))
+def test_closed_forms_checked_against_dis(opname, monkeypatch):
+    opcode_ = dis.opmap[opname]
+
+    monkeypatch.setitem(CLOSED_FORMS, opname, lambda arg: arg + 100)
+    effect = stack._stack_effect(opcode_, jump=False)  # pylint: disable=protected-access
+
+    assert effect is not CLOSED_FORMS[opname]
+    for arg in ARGS:
+        assert effect(arg) == dis.stack_effect(opcode_, arg, jump=False)
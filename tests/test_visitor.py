@@ -0,0 +1,90 @@
+import pytest
+
+from rigel.exceptions import UnknownInstructionError
+from rigel.instruction import make_instruction
+from rigel.visitor import BlockVisitor, InstructionVisitor
+
+
+class Base(InstructionVisitor):
+    def visit_load_const(self, instruction, block):
+        return 'base', instruction.argval, block
+
+    def visit_pop_top(self, instruction, block):
+        return 'base', instruction.opname, block
+
+
+class Override(Base):
+    def visit_load_const(self, instruction, block):
+        return 'override', instruction.argval, block
+
+
+class Intermediate(Base):
+    def visit_return_value(self, instruction, block):
+        return 'intermediate', instruction.opname, block
+
+
+class Leaf(Intermediate):
+    pass
+
+
+class Recording(Base):
+    def _unknown_instruction(self, instruction, block):
+        return 'unknown', instruction.opname, block
+
+
+def test_instruction_visitor_override():
+    instruction = make_instruction('LOAD_CONST', 0, 1)
+
+    assert Base().visit(instruction, None) == ('base', 1, None)
+    assert Override().visit(instruction, None) == ('override', 1, None)
+    assert Override().visit(make_instruction('POP_TOP'), None) == ('base', 'POP_TOP', None)
+
+
+def test_instruction_visitor_intermediate_handler():
+    instruction = make_instruction('RETURN_VALUE')
+
+    assert Leaf().visit(instruction, 'block') == ('intermediate', 'RETURN_VALUE', 'block')
+    with pytest.raises(UnknownInstructionError):
+        Base().visit(instruction, 'block')
+
+
+def test_instruction_visitor_unknown_instruction():
+    with pytest.raises(UnknownInstructionError):
+        Leaf().visit(make_instruction('NOP'), None)
+
+    assert Recording().visit(make_instruction('NOP'), None) == ('unknown', 'NOP', None)
+    assert Recording().visit(make_instruction('POP_TOP'), None) == ('base', 'POP_TOP', None)
+
+
+class Block(list):
+    pass
+
+
+class Loop(Block):
+    pass
+
+
+class Counting(BlockVisitor):
+    def __init__(self):
+        self.visited = []
+
+    def visit_block(self, block):
+        self.visited.append(('block', len(block)))
+        self.generic_visit(block)
+
+
+class CountingLoops(Counting):
+    def visit_loop(self, block):
+        self.visited.append(('loop', len(block)))
+
+
+def test_block_visitor_dispatch():
+    tree = [Block([Block(), Loop([Block()])]), [Loop()]]
+
+    visitor = Counting()
+    visitor.visit(tree)
+    assert visitor.visited == [('block', 2), ('block', 0), ('block', 0)]
+
+    visitor = CountingLoops()
+    visitor.visit(tree)
+    assert visitor.visited == [('block', 2), ('block', 0), ('loop', 1), ('loop', 0)]